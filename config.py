@@ -2,6 +2,12 @@ class Config:
     FPS = 60
     INITIAL_SCREEN_SIZE = (1024, 576)
 
+    # Anzahl der Ticks (feste Zeitschritte der Spiellogik) pro Sekunde
+    TICK_RATE = 60
+    # Maximale Anzahl an Ticks, die bei Spielgeschwindigkeit 1 in einem Frame nachgeholt werden
+    MAX_CATCH_UP_TICKS = 5
+
+    # Vielfache der Tickrate; höhere Geschwindigkeiten führen mehr Ticks pro Frame aus
     SPEED_OPTIONS = [1, 2, 4]
 
     GAME_OVER_QUOTES = ("TJA...", "HMMMMMMMMMMM", "CLOSE", "NEVER GIVE UP", "YOU DID GREAT!", "YOU'VE GOT THIS")
@@ -9,4 +15,8 @@ class Config:
 
     ENEMY_SPEED = 50
 
+    # Wenn True, werden die Ebenen der Karte als Befehlsliste direkt auf die Karte gezeichnet (DrawListMapSurface),
+    #  sonst über je eine Oberfläche pro Ebene (LayeredMapSurface)
+    MAP_DRAW_LIST = True
+
     SKIP_INTRO = False
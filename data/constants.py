@@ -87,12 +87,14 @@ class TurretType:
 
 class AimMode(Enum):
     """
-    Zielmodi eines Turmes (erster, kürzeste Distanz, größte Distanz, zufälliger oder stärkster Gegner)
+    Zielmodi eines Turmes (am weitesten vorne auf dem Pfad, kürzeste Distanz, am weitesten hinten auf dem Pfad,
+    zufälliger oder stärkster Gegner)
     """
     First = 0
     Nearest = 1
     Last = 2
     Random = 3
+    Strongest = 4
 # </editor-fold>
 
 
@@ -1,10 +1,11 @@
-from typing import Tuple, List
+from typing import Tuple, List, Dict
 
 import pygame
 import pygame.gfxdraw
 
 from data.constants import UI, Sprite, Font, Direction, TurretType, Icon, IconManager, FontManager, Color
 from data.lib import sprites
+from data.lib.map_objects import DirtyGrid
 from data import gui_elements
 from data.lib.vfx import ButtonHighlightEffect, GradientLineEffect, GradientLineEffectData, VFXManager, \
     TextParticleEffect, TextParticleEffectData, OverlayFadeOutEffect, OverlayFadeOutEffectData, InGameBlendInEffect, \
@@ -19,8 +20,8 @@ class ShopItemButton(gui_elements.Box, gui_elements.Button):
 
         self.cost_image = sprites.Spritesheet(pygame.image.load(UI.ICONS).convert_alpha()).image_at((16, 0, 16, 16))
         self.font = FontManager.get_font(Font.PIXEL, 10)
+        self._affordable = False
         self.text = ""
-        self.affordable = False
         self.__affordable_animation_played = self.affordable
 
         self.box_size = (self.image.get_width() * 1.5,
@@ -34,8 +35,21 @@ class ShopItemButton(gui_elements.Box, gui_elements.Button):
     def text(self, value: str):
         self._text = value
         self.__text_rendered = self.font.render(f"{self.text}", False, (255, 180, 100))
+        self.__outdated = True
+        self.mark_dirty()
         return
 
+    @property
+    def affordable(self):
+        return self._affordable
+
+    @affordable.setter
+    def affordable(self, value: bool):
+        if value != self._affordable:
+            self._affordable = value
+            self.__outdated = True
+            self.mark_dirty()
+
     @property
     def pos(self):
         return self._pos
@@ -43,6 +57,7 @@ class ShopItemButton(gui_elements.Box, gui_elements.Button):
     @pos.setter
     def pos(self, value: Tuple[float, float]):
         self._pos = value
+        self.mark_dirty()
         try:
             self.rect = self.box.get_rect(topleft=self.pos)
         except AttributeError:
@@ -54,6 +69,24 @@ class ShopItemButton(gui_elements.Box, gui_elements.Button):
     def update(self, click: bool, mouse_pos: Tuple[int, int] = None):
         super().update(click, mouse_pos)
 
+        if self.__outdated:
+            self.__compose()
+
+        if self.affordable and not self.__affordable_animation_played:
+            self.vfx_manager.add_effect(self, GradientLineEffect(GradientLineEffectData(
+                path=[(4 / 48, -1 / 48), (44 / 48, -1 / 48),
+                      (1, 4 / 48), (1, 44 / 48),
+                      (44 / 48, 1), (4 / 48, 1),
+                      (-1 / 48, 44 / 48), (-1 / 48, 4 / 48),
+                      (4 / 48, -1 / 48)],
+                line_length=1, loop_duration=1.5, loop_count=1)))
+
+        self.__affordable_animation_played = self.affordable
+
+    def __compose(self):
+        """
+        Setzt das Bild des Buttons neu zusammen, nur nötig, wenn sich Text oder Bezahlbarkeit geändert haben
+        """
         # redrawing self.box
         self.box_size = self.box_size
 
@@ -75,22 +108,13 @@ class ShopItemButton(gui_elements.Box, gui_elements.Button):
                                              self.cost_image.get_width() / 2,
                                              self.image.get_height() * 1.5 - self.__text_rendered.get_height() / 2 + 1))
 
-        if self.affordable and not self.__affordable_animation_played:
-            self.vfx_manager.add_effect(self, GradientLineEffect(GradientLineEffectData(
-                path=[(4 / 48, -1 / 48), (44 / 48, -1 / 48),
-                      (1, 4 / 48), (1, 44 / 48),
-                      (44 / 48, 1), (4 / 48, 1),
-                      (-1 / 48, 44 / 48), (-1 / 48, 4 / 48),
-                      (4 / 48, -1 / 48)],
-                line_length=1, loop_duration=1.5, loop_count=1)))
-
-        self.__affordable_animation_played = self.affordable
+        self.__outline = get_outline(self.box, (255, 255, 64), True)
+        self.__outdated = False
 
     def render(self, dest: pygame.Surface):
         self.vfx_manager.render(self, dest)
         if self.hovered:
-            dest.blit(get_outline(self.box, (255, 255, 64), True),
-                      (self.pos[0] - 1, self.pos[1] - 1))
+            dest.blit(self.__outline, (self.pos[0] - 1, self.pos[1] - 1))
         else:
             dest.blit(self.box, self.pos)
         return
@@ -136,6 +160,9 @@ class Shop(gui_elements.Box):
         any_clicked = any((any_clicked, self.__blue_turret_button.clicked, self.__red_turret_button.clicked))
         return any_hovered, any_clicked
 
+    def get_children(self) -> List[gui_elements.Widget]:
+        return [self.__blue_turret_button, self.__red_turret_button]
+
     def render(self, dest: pygame.Surface):
         dest.blit(self.box, self.pos)
 
@@ -230,6 +257,9 @@ class SpeedBar(gui_elements.Box):
                            self.__double_speed_button.clicked, self.__triple_speed_button.clicked))
         return any_hovered, any_clicked
 
+    def get_children(self) -> List[gui_elements.Widget]:
+        return self.__speed_button_list
+
     def render(self, dest: pygame.Surface):
         dest.blit(self.box, self.pos)
 
@@ -265,6 +295,7 @@ class InfoBar(gui_elements.Box):
         self.direction = expansion_direction
 
         self.default_text = default_text or ""
+        self._text = None
         self.text = self.default_text
 
         self.__last_text_len = len(self.text)
@@ -278,8 +309,11 @@ class InfoBar(gui_elements.Box):
 
     @text.setter
     def text(self, value: str):
+        if value == self._text:
+            return
         self._text = value
         self.__text_surf = self.font.render(self.text, False, self.text_color)
+        self.__outdated = True
 
     def resize(self, pos: Tuple[int, int]):
         self.box_size = (
@@ -291,28 +325,33 @@ class InfoBar(gui_elements.Box):
             self.offset_pos = (self.pos[0], self.pos[1])
         elif self.direction == Direction.LEFT:
             self.offset_pos = (self.pos[0] - self.box.get_width(), self.pos[1])
+        self.__compose()
+
+    def __compose(self):
+        """
+        Setzt Box, Symbol und Text zu einem Bild zusammen, nur nötig, wenn sich der Text geändert hat
+        """
+        self.box_size = self.box_size
         self.box.blit(self.image, (4, 4))
+        self.box.blit(self.__text_surf, (self.box.get_width() - self.__text_surf.get_width() - 8,
+                                         12 - self.__text_surf.get_height() / 2))
+        self.__outdated = False
 
     def update(self):
         if len(self.text) != self.__last_text_len:
             self.resize(self.pos)
+        elif self.__outdated:
+            self.__compose()
         self.__last_text_len = len(self.text)
 
         self.vfx_manager.transform_object(self, self.offset_pos, self.box_size)
 
-    def render(self, dest: pygame.Surface):
-        surf = pygame.Surface(dest.get_size(), pygame.SRCALPHA)
-
-        real_pos = self.pos
-        self.pos = self.offset_pos
-        super().render(surf)
-        self.pos = real_pos
-
-        surf.blit(self.__text_surf, (self.offset_pos[0] + self.box.get_width() - self.__text_surf.get_width() - 8,
-                                     self.offset_pos[1] + 12 - self.__text_surf.get_height() / 2))
-        self.vfx_manager.render(self, surf)
+    def get_box_rect(self) -> pygame.Rect:
+        return self.box.get_rect(topleft=self.offset_pos)
 
-        dest.blit(surf, (0, 0))
+    def render(self, dest: pygame.Surface):
+        dest.blit(self.box, self.offset_pos)
+        self.vfx_manager.render(self, dest)
 
 
 class BalanceInfoBar(InfoBar):
@@ -430,6 +469,8 @@ class NextWaveButton(gui_elements.ButtonBox):
 
         self.game_data.vfx_manager.transform_object(self, self.pos, self.box_size)
 
+        position_change = self.__position_change
+
         if self.game_data.wave_active or self.game_data.start_next_wave:
             if not self.lock:
                 self.game_data.vfx_manager.clear_effects(self)
@@ -457,11 +498,18 @@ class NextWaveButton(gui_elements.ButtonBox):
                     ))
                 )
 
+        if self.__position_change != position_change:
+            self.mark_dirty()
+
+    def get_box_rect(self) -> pygame.Rect:
+        return self.box.get_rect(topleft=(self.pos[0] + self.__position_change[0],
+                                          self.pos[1] + self.__position_change[1]))
+
     def render(self, dest: pygame.Surface):
         self.game_data.vfx_manager.render(self, dest)
 
         if self.hovered:
-            dest.blit(get_outline(self.box, (255, 255, 64), True),
+            dest.blit(self.__outline,
                       (self.pos[0] + self.__position_change[0] - 1, self.pos[1] + self.__position_change[1] - 1))
         else:
             dest.blit(self.box, (self.pos[0] + self.__position_change[0], self.pos[1] + self.__position_change[1]))
@@ -473,6 +521,7 @@ class NextWaveButton(gui_elements.ButtonBox):
         self.box.blit(self.warning_image, (4, 4))
         self.box.blit(self.text, (24, 12 - (self.text.get_height() / 2)))
         self.box.blit(self.warning_image, (self.rect.w - 20, 4))
+        self.__outline = get_outline(self.box, (255, 255, 64), True)
 
 
 class SettingsMenu(gui_elements.Box):
@@ -494,31 +543,59 @@ class SettingsMenu(gui_elements.Box):
         def _():
             self.game_data.quit = True
 
+        # Abgedunkelte GUI hinter dem Menü
+        self.__backdrop = pygame.Surface((0, 0), pygame.SRCALPHA)
+
     def update(self, click: bool, mouse_pos: Tuple[int, int]):
         self.quit_button.update(click, mouse_pos)
         return self.quit_button.hovered, self.quit_button.clicked
 
+    def get_children(self) -> List[gui_elements.Widget]:
+        return [self.quit_button]
+
+    def get_rects(self) -> List[pygame.Rect] | None:
+        rects = super().get_rects()
+        if rects is not None:
+            rects.append(self.__backdrop.get_rect())
+        return rects
+
     def render(self, dest: pygame.Surface):
-        surf = pygame.Surface(self.box.get_size(), pygame.SRCALPHA)
-        super().render(surf)
-        dest.blit(surf, (dest.get_width() / 2 - surf.get_width() / 2,
-                         dest.get_height() / 2 - surf.get_height() / 2))
-        self.quit_button.pos = (dest.get_width() / 2 - self.quit_button.image.get_width() / 2,
-                                dest.get_height() / 2 - self.quit_button.image.get_height() / 2)
+        dest.blit(self.__backdrop, (0, 0))
+        super().render(dest)
         self.quit_button.render(dest)
 
-    def resize(self):
+    def resize(self, size: Tuple[int, int]):
+        if self.__backdrop.get_size() != size:
+            self.__backdrop = pygame.Surface(size, pygame.SRCALPHA)
+            self.__backdrop.fill((0, 0, 0, 159))
+            self.mark_dirty()
         self.box_size = (140, 30)
-        self.pos = (0, 0)
+        self.pos = (size[0] / 2 - self.box.get_width() / 2, size[1] / 2 - self.box.get_height() / 2)
+        self.quit_button.pos = (size[0] / 2 - self.quit_button.image.get_width() / 2,
+                                size[1] / 2 - self.quit_button.image.get_height() / 2)
 
 
 class GUI:
+    # Kantenlänge der Kacheln (in Pixeln der ungeskalierten GUI), in welchen veränderte Bereiche vermerkt werden
+    tile_size: int = 8
+    # Ist der zu erneuernde Anteil der GUI größer, wird die ganze GUI in einem Schritt neu gezeichnet
+    full_redraw_ratio: float = 0.5
+
     def __init__(self, game_data):
         self.__gui_size_multiplier = 2
 
         self.rect = pygame.Rect((0, 0, 0, 0))
 
         self.surface = pygame.Surface((0, 0), pygame.SRCALPHA)
+        # Auf Fenstergröße skalierte GUI, bleibt zwischen den Frames erhalten
+        self.__scaled_surface = pygame.Surface((0, 0), pygame.SRCALPHA)
+
+        # Bereiche, welche die Widgets bzw. die Effekte der GUI im vorigen Frame bedeckt haben
+        self.__previous_rects: Dict[object, List[pygame.Rect]] = {}
+        self.__dirty = DirtyGrid((0, 0), self.tile_size)
+        # Bereiche der skalierten GUI, in welchen etwas zu sehen ist
+        self.__visible_rects: List[pygame.Rect] = []
+        self.__full_redraw = True
 
         self.game_data = game_data
 
@@ -555,8 +632,10 @@ class GUI:
         def _():
             self.game_data.lock = not self.game_data.lock
             self.display_settings_menu = not self.display_settings_menu
+            # Die Hintergrundpartikel der Karte sind hinter dem Menü kaum zu sehen und werden solange ausgesetzt
+            self.game_data.vfx_manager.set_hidden(self.game_data.map.background_vfx, self.display_settings_menu)
             if self.display_settings_menu:
-                self.settings_menu.resize()
+                self.settings_menu.resize(self.surface.get_size())
 
     def translate_vector(self, vector: Tuple[int, int]) -> Tuple[int, int]:
         return vector[0] // self.__gui_size_multiplier, vector[1] // self.__gui_size_multiplier
@@ -591,8 +670,13 @@ class GUI:
     def resize(self, size: Tuple[int, int]):
         self.rect = pygame.Rect((0, 0, size[0], size[1]))
 
-        self.surface = pygame.transform.scale(self.surface, (int(self.rect.w / self.__gui_size_multiplier),
-                                                             int(self.rect.h / self.__gui_size_multiplier)))
+        self.surface = pygame.Surface((int(self.rect.w / self.__gui_size_multiplier),
+                                       int(self.rect.h / self.__gui_size_multiplier)), pygame.SRCALPHA)
+        self.__scaled_surface = pygame.Surface((self.surface.get_width() * self.__gui_size_multiplier,
+                                                self.surface.get_height() * self.__gui_size_multiplier),
+                                               pygame.SRCALPHA)
+        self.__dirty = DirtyGrid(self.surface.get_size(), self.tile_size)
+        self.__full_redraw = True
 
         self.shop.resize((64, self.surface.get_height()), (self.surface.get_width() - 64, 0))
         self.balance_info_bar.resize((self.surface.get_width() - 64, 24 - 1))
@@ -602,23 +686,102 @@ class GUI:
         self.next_wave_button.resize(((self.surface.get_width() - 64) // 2 - 55, self.surface.get_height() - 24))
         self.settings_button.pos = (0, 0)
         if self.display_settings_menu:
-            self.settings_menu.resize()
+            self.settings_menu.resize(self.surface.get_size())
 
         self.game_data.vfx_manager.transform_object(self, (0, 0), self.surface.get_size())
 
-    def render(self, surface: pygame.Surface):
-        self.surface.fill((0, 0, 0, 0))
-        self.shop.render(self.surface)
-        self.balance_info_bar.render(self.surface)
-        self.speed_bar.render(self.surface)
-        self.LP_info_bar.render(self.surface)
-        self.wave_info_bar.render(self.surface)
-        self.next_wave_button.render(self.surface)
+    def __get_widgets(self) -> List[gui_elements.Widget]:
+        """
+        Alle sichtbaren Widgets in der Reihenfolge, in welcher sie gezeichnet werden
+        """
+        widgets = [self.shop, self.balance_info_bar, self.speed_bar, self.LP_info_bar, self.wave_info_bar,
+                   self.next_wave_button]
         if self.display_settings_menu:
-            surf = pygame.Surface(surface.get_size(), pygame.SRCALPHA)
-            surf.fill((0, 0, 0, 159))
-            self.surface.blit(surf, (0, 0))
-            self.settings_menu.render(self.surface)
-        self.settings_button.render(self.surface)
-        self.game_data.vfx_manager.render(self, self.surface)
-        surface.blit(pygame.transform.scale(self.surface, self.rect.size), (0, 0))
+            widgets.append(self.settings_menu)
+        widgets.append(self.settings_button)
+        return widgets
+
+    def __get_rects(self, widget: gui_elements.Widget | None) -> List[pygame.Rect] | None:
+        # Ohne Widget die Bereiche der Effekte der GUI selbst
+        rects = self.game_data.vfx_manager.get_dirty_rects(self) if widget is None else widget.get_rects()
+        if rects is None:
+            return None
+        # Umrandungen (z.B. beim Hovern) und Rundung
+        return [rect.inflate(4, 4) for rect in rects]
+
+    def render(self, surface: pygame.Surface):
+        """
+        Zeichnet die GUI im Retained-Mode: Die Widgets halten ihre zusammengesetzten Bilder vor, neu gezeichnet und
+        skaliert werden nur die Bereiche, welche veränderte Widgets (siehe gui_elements.Widget) oder Effekte in diesem
+        oder im vorigen Frame bedeckt haben. Die übrige skalierte GUI bleibt vom vorigen Frame erhalten
+        """
+        vfx_manager = self.game_data.vfx_manager
+        widgets = self.__get_widgets()
+        full_redraw = self.__full_redraw
+        dirty = self.__dirty
+
+        current_rects: Dict[object, List[pygame.Rect]] = {}
+        for widget in widgets + [None]:
+            key = self if widget is None else widget
+            rects = self.__get_rects(widget)
+            previous_rects = self.__previous_rects.pop(key, None)
+            if rects is None:
+                full_redraw = True
+                rects = [self.surface.get_rect()]
+            elif full_redraw:
+                pass
+            elif (previous_rects is None or rects != previous_rects
+                  or (vfx_manager.get_effects(self) if widget is None else widget.is_dirty())):
+                for rect in (previous_rects or []) + rects:
+                    dirty.mark(rect)
+            current_rects[key] = rects
+        # Nicht mehr sichtbare Widgets (z.B. das geschlossene Menü)
+        for previous_rects in self.__previous_rects.values():
+            for rect in previous_rects:
+                dirty.mark(rect)
+        changed = full_redraw or not dirty.empty or self.__previous_rects
+        self.__previous_rects = current_rects
+
+        if not full_redraw and not dirty.empty and dirty.tiles.mean() > self.full_redraw_ratio:
+            full_redraw = True
+
+        multiplier = self.__gui_size_multiplier
+        if full_redraw:
+            self.surface.fill((0, 0, 0, 0))
+            for widget in widgets:
+                widget.render(self.surface)
+            vfx_manager.render(self, self.surface)
+            pygame.transform.scale(self.surface, self.__scaled_surface.get_size(), self.__scaled_surface)
+        elif not dirty.empty:
+            for rect in dirty.get_rects():
+                self.surface.set_clip(rect)
+                self.surface.fill((0, 0, 0, 0), rect)
+                for widget in widgets:
+                    if rect.collidelist(current_rects[widget]) != -1:
+                        widget.render(self.surface)
+                if rect.collidelist(current_rects[self]) != -1:
+                    vfx_manager.render(self, self.surface)
+                scaled_rect = pygame.Rect(rect.x * multiplier, rect.y * multiplier,
+                                          rect.w * multiplier, rect.h * multiplier)
+                pygame.transform.scale(self.surface.subsurface(rect), scaled_rect.size,
+                                       self.__scaled_surface.subsurface(scaled_rect))
+            self.surface.set_clip(None)
+        dirty.clear()
+        self.__full_redraw = False
+
+        for widget in widgets:
+            widget.clean()
+
+        if changed:
+            # Übertragen werden nur die Bereiche, in welchen Widgets oder Effekte liegen
+            visible = DirtyGrid(self.surface.get_size(), self.tile_size)
+            for rects in current_rects.values():
+                for rect in rects:
+                    visible.mark(rect)
+            if visible.tiles.mean() > self.full_redraw_ratio:
+                self.__visible_rects = [self.__scaled_surface.get_rect()]
+            else:
+                self.__visible_rects = [pygame.Rect(rect.x * multiplier, rect.y * multiplier,
+                                                    rect.w * multiplier, rect.h * multiplier)
+                                        for rect in visible.get_rects()]
+        surface.blits([(self.__scaled_surface, rect, rect) for rect in self.__visible_rects], doreturn=False)
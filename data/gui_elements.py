@@ -27,7 +27,54 @@ class PreprocessedBoxImage:
         self.corners = [self.top_left, self.top_right, self.bot_left, self.bot_right]
 
 
-class BoxBase:
+class Widget:
+    # Wenn True, hat sich das Bild des Widgets seit dem letzten Zeichnen geändert (Text, Hover-Zustand, ...)
+    dirty: bool = True
+    # Widgets mit VFXManager gelten als verändert, solange sie Effekte haben
+    vfx_manager: VFXManager | None = None
+
+    def mark_dirty(self):
+        self.dirty = True
+
+    def get_children(self) -> List["Widget"]:
+        """
+        Widgets, welche dieses Widget mit seinem Bild zeichnet
+        """
+        return []
+
+    def is_dirty(self) -> bool:
+        if self.dirty or (self.vfx_manager is not None and self.vfx_manager.get_effects(self)):
+            return True
+        return any(child.is_dirty() for child in self.get_children())
+
+    def clean(self):
+        """
+        Wird von der GUI aufgerufen, nachdem das Widget neu gezeichnet wurde
+        """
+        self.dirty = False
+        for child in self.get_children():
+            child.clean()
+
+    def get_rects(self) -> List[pygame.Rect] | None:
+        """
+        Bereiche, welche das Widget einschließlich seiner Kinder und Effekte derzeit bedeckt.
+        None, wenn sie sich nicht bestimmen lassen
+        """
+        rects = []
+        if self.vfx_manager is not None:
+            effect_rects = self.vfx_manager.get_dirty_rects(self)
+            if effect_rects is None:
+                return None
+            rects += effect_rects
+        for child in self.get_children():
+            child_rects = child.get_rects()
+            if child_rects is None:
+                return None
+            rects += child_rects
+        return rects
+
+
+class BoxBase(Widget):
     def __init__(self, preprocessed: PreprocessedBoxImage,
                  *, pos: Tuple[float, float] = (0, 0), box_size: Tuple[float, float] = (0, 0)):
         self.__raw = preprocessed
@@ -45,6 +92,7 @@ class BoxBase:
     @pos.setter
     def pos(self, value: Tuple[float, float]):
         self._pos = value
+        self.mark_dirty()
 
     @property
     def box_size(self):
@@ -53,6 +101,7 @@ class BoxBase:
     @box_size.setter
     def box_size(self, value: Tuple[float, float]):
         self._box_size = (max(16., value[0]), max(16., value[1]))
+        self.mark_dirty()
 
         self.box = pygame.transform.scale(self.box, self.box_size)
         self.box.fill((0, 0, 0, 0))
@@ -78,6 +127,18 @@ class BoxBase:
         self.box.blit(self.__raw.bot_left, (0, border_corner_height + box_height))
         self.box.blit(self.__raw.bot_right, (border_corner_width + box_width, border_corner_height + box_height))
 
+    def get_box_rect(self) -> pygame.Rect:
+        """
+        Bereich, in welchen render die Box zeichnet
+        """
+        return self.box.get_rect(topleft=self.pos)
+
+    def get_rects(self) -> List[pygame.Rect] | None:
+        rects = super().get_rects()
+        if rects is not None:
+            rects.append(self.get_box_rect())
+        return rects
+
     def render(self, dest: pygame.Surface):
         dest.blit(self.box, self.pos)
 
@@ -92,7 +153,7 @@ class Box(BoxBase):
         super().__init__(Box.image, pos=pos, box_size=box_size)
 
 
-class Button:
+class Button(Widget):
     rect: pygame.Rect
 
     def __init__(self, image: pygame.Surface, vfx_manager: VFXManager):
@@ -115,6 +176,15 @@ class Button:
 
         self.rect = pygame.Rect((0, 0, 0, 0))
 
+    @property
+    def image(self):
+        return self._image
+
+    @image.setter
+    def image(self, value: pygame.Surface):
+        self._image = value
+        self.mark_dirty()
+
     @property
     def rect(self):
         return self._rect
@@ -130,6 +200,7 @@ class Button:
     @pos.setter
     def pos(self, value: Tuple[float, float]):
         self._pos = value
+        self.mark_dirty()
 
     def on_toggle(self, func: Callable[[], None]) -> Callable[[], None]:
         self.__on_toggle_funcs.append(func)
@@ -156,6 +227,7 @@ class Button:
     def update(self, click: bool, mouse_pos: Tuple[int, int] = None):
         if mouse_pos is None:
             mouse_pos = pygame.mouse.get_pos()
+        hovered = self.hovered
         if self.rect.collidepoint(*mouse_pos) and not self.lock:
             if not self.hovered:
                 for func in self.__on_hover_funcs:
@@ -171,9 +243,17 @@ class Button:
         else:
             self.clicked = False
             self.hovered = False
+        if self.hovered != hovered:
+            self.mark_dirty()
 
         self.vfx_manager.transform_object(self, self.rect.topleft, self.rect.size)
 
+    def get_rects(self) -> List[pygame.Rect] | None:
+        rects = super().get_rects()
+        if rects is not None:
+            rects.append(self.rect)
+        return rects
+
     def render(self, dest: pygame.Surface):
         self.vfx_manager.render(self, dest)
         dest.blit(self.image, self.pos)
@@ -187,6 +267,7 @@ class ButtonImage(Button):
     @Button.pos.setter
     def pos(self, value: Tuple[float, float]):
         self._pos = value
+        self.mark_dirty()
         self.rect = self.image.get_rect(topleft=self.pos)
 
 
@@ -202,6 +283,7 @@ class ButtonBox(Box, Button):
     @pos.setter
     def pos(self, value: Tuple[float, float]):
         self._pos = value
+        self.mark_dirty()
         try:
             self.rect = self.box.get_rect(topleft=self.pos)
             self.box.blit(self.image, (self.rect.width / 2 - self.image.get_width() / 2,
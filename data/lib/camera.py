@@ -1,3 +1,4 @@
+import math
 from typing import Tuple, List
 
 import pygame
@@ -6,15 +7,13 @@ from data.constants import Color
 
 
 class Canvas:
-    surface: pygame.Surface
     rect: pygame.Rect
     view_rect: pygame.Rect
     last_mouse_position: Tuple[int, int]
     static: List[Tuple[pygame.Surface, Tuple[int, int]]]
 
     def __init__(self, size: Tuple[int, int]):
-        self.surface = pygame.Surface(size, pygame.SRCALPHA)
-        self.rect = self.surface.get_rect()
+        self.rect = pygame.Rect((0, 0), size)
 
         self.view_rect = pygame.Rect(0, 0, self.rect.width, self.rect.height)
 
@@ -26,12 +25,14 @@ class Canvas:
         self.static.append((surface, (position or (0, 0))))
         return
 
-    def render(self, surface: pygame.Surface):
-        self.surface.fill((0, 0, 0, 0))
-        for item in self.static:
-            self.surface.blit(item[0], item[1])
-
-        surface.blit(self.surface, (0, 0))
+    def render(self, surface: pygame.Surface, area: pygame.Rect | None = None):
+        """
+        :param area: Zu übertragender Bereich, ohne Angabe die ganze Leinwand
+        """
+        if area is None:
+            area = self.rect
+        for image, position in self.static:
+            surface.blit(image, area.topleft, area.move(-position[0], -position[1]))
         return
 
     def translate_vector(self, viewed_coordinate: Tuple[float, float]) -> Tuple[float, float]:
@@ -42,14 +43,28 @@ class Canvas:
 
 
 class Overlay:
-    surface: pygame.Surface
-
     def __init__(self, canvas: Canvas):
-        self.surface = pygame.Surface(canvas.rect.size, pygame.SRCALPHA)
+        self.__surface = pygame.Surface(canvas.rect.size, pygame.SRCALPHA)
+        # Wird beim Zugriff auf surface gesetzt, nur dann muss das Overlay übertragen und geleert werden
+        self.__used = False
 
-    def render(self, surface: pygame.Surface):
-        surface.blit(self.surface, (0, 0))
-        self.surface.fill((0, 0, 0, 0))
+    @property
+    def surface(self) -> pygame.Surface:
+        self.__used = True
+        return self.__surface
+
+    def render(self, surface: pygame.Surface, area: pygame.Rect | None = None):
+        """
+        :param area: Zu übertragender Bereich, ohne Angabe das ganze Overlay
+        """
+        if not self.__used:
+            return
+        if area is None:
+            surface.blit(self.__surface, (0, 0))
+        else:
+            surface.blit(self.__surface, area.topleft, area)
+        self.__surface.fill((0, 0, 0, 0))
+        self.__used = False
         return
 
 
@@ -62,6 +77,7 @@ class Camera:
     scroll_speed: float
     scroll_max: float
     scroll_min: float
+    snap_distance: float
     moving: bool
     last_mouse_position: Tuple[int, int]
 
@@ -80,6 +96,8 @@ class Camera:
         self.__screen_size = (0, 0)
 
         self.__captured_surface = pygame.Surface(self.canvas.rect.size, pygame.SRCALPHA)
+        # Skaliertes Bild des sichtbaren Bereichs, wird wiederverwendet, solange sich seine Größe nicht ändert
+        self.__scaled_surface: pygame.Surface | None = None
 
         self.initial_offset = pygame.math.Vector2(initial_offset)
 
@@ -89,6 +107,9 @@ class Camera:
         self.scroll_speed = 0.05
         self.scroll_max = 2
         self.scroll_min = 0.5
+        # Zoomstufen, die näher als dieser Abstand an einem ganzzahligen Maßstab liegen, werden auf diesen gerundet,
+        #  bei Maßstab 1 entfällt das Skalieren
+        self.snap_distance = self.scroll_speed / 2
 
         self.moving = False
         self.last_mouse_position = pygame.mouse.get_pos()
@@ -128,6 +149,8 @@ class Camera:
                     self.scrolling += self.scroll_speed
                 elif event.button == 5 and self.scrolling > self.default_scrolling * self.scroll_min:
                     self.scrolling -= self.scroll_speed
+                if abs(self.scrolling - round(self.scrolling)) < self.snap_distance:
+                    self.scrolling = float(round(self.scrolling))
 
                 mouse_position = pygame.mouse.get_pos()
                 mouse_x, mouse_y = self.canvas.translate_vector(mouse_position)
@@ -156,10 +179,31 @@ class Camera:
         self.last_mouse_position = mouse_position
         return
 
+    def get_visible_rect(self) -> pygame.Rect | None:
+        """
+        Gibt den Bereich der aufgezeichneten Oberfläche (in deren Koordinaten) zurück, welcher beim letzten Aufruf von
+        render auf dem Bildschirm zu sehen war. Vor dem ersten Aufruf wird None zurückgegeben
+        """
+        view_rect = self.canvas.view_rect
+        if not (self.__screen_size[0] and self.__screen_size[1] and view_rect.w and view_rect.h):
+            return None
+        screen_rect = pygame.Rect((0, 0), self.__screen_size).clip(view_rect)
+        if not (screen_rect.w and screen_rect.h):
+            return pygame.Rect(0, 0, 0, 0)
+        scale_x = self.canvas.rect.w / view_rect.w
+        scale_y = self.canvas.rect.h / view_rect.h
+        left = math.floor((screen_rect.left - view_rect.x) * scale_x)
+        top = math.floor((screen_rect.top - view_rect.y) * scale_y)
+        right = math.ceil((screen_rect.right - view_rect.x) * scale_x)
+        bottom = math.ceil((screen_rect.bottom - view_rect.y) * scale_y)
+        return pygame.Rect(left, top, right - left, bottom - top).clip(self.canvas.rect)
+
     def render(self, surface: pygame.Surface):
         """
         Aktualisiert das Bild der Kamera.
-        Als neues Bild wird die momentane Oberfläche der aufzunehmenden Karte verwendet
+        Als neues Bild wird die momentane Oberfläche der aufzunehmenden Karte verwendet. Übertragen und skaliert wird
+        nur der Bereich, der auf dem Bildschirm zu sehen ist, der Aufwand hängt daher von der Fenster- und nicht
+        von der Kartengröße ab
         """
         if surface.get_size() != self.__screen_size:
             self.__screen_size = surface.get_size()
@@ -167,11 +211,31 @@ class Camera:
 
         surface.fill(Color.BACKGROUND)
 
-        self.canvas.render(self.__captured_surface)
-        self.overlay.render(self.__captured_surface)
-
-        surface.blit(pygame.transform.scale(self.__captured_surface, self.canvas.view_rect.size),
-                     (self.canvas.view_rect.x, self.canvas.view_rect.y))
-
-        self.__captured_surface.fill(Color.BACKGROUND)
+        source_rect = self.get_visible_rect()
+        if source_rect is None or not (source_rect.w and source_rect.h):
+            self.overlay.render(self.__captured_surface, pygame.Rect(0, 0, 0, 0))
+            return
+
+        self.__captured_surface.fill(Color.BACKGROUND, source_rect)
+        self.canvas.render(self.__captured_surface, source_rect)
+        self.overlay.render(self.__captured_surface, source_rect)
+        source = self.__captured_surface.subsurface(source_rect)
+
+        # Zielbereich auf dem Bildschirm, gerundet wie beim Skalieren der gesamten Leinwand auf view_rect
+        view_rect = self.canvas.view_rect
+        scale_x = view_rect.w / self.canvas.rect.w
+        scale_y = view_rect.h / self.canvas.rect.h
+        left = view_rect.x + round(source_rect.left * scale_x)
+        top = view_rect.y + round(source_rect.top * scale_y)
+        target_size = (view_rect.x + round(source_rect.right * scale_x) - left,
+                       view_rect.y + round(source_rect.bottom * scale_y) - top)
+
+        if target_size == source_rect.size:
+            surface.blit(source, (left, top))
+            return
+
+        if self.__scaled_surface is None or self.__scaled_surface.get_size() != target_size:
+            self.__scaled_surface = pygame.Surface(target_size, 0, source)
+        pygame.transform.scale(source, target_size, self.__scaled_surface)
+        surface.blit(self.__scaled_surface, (left, top))
         return
@@ -0,0 +1,178 @@
+from dataclasses import dataclass
+from typing import List, Dict, Any, Iterator
+
+
+@dataclass(frozen=True)
+class EntityHandle:
+    """
+    Stabiler Verweis auf ein Objekt eines EntityContainer. Ein Handle bleibt gültig, auch wenn das Objekt
+    innerhalb des Containers verschoben wird, und wird ungültig, sobald das Objekt entfernt wurde
+    """
+    index: int
+    generation: int
+
+
+class EntityContainer:
+    def __init__(self):
+        """
+        Lückenlose Liste von Objekten mit Entfernen in konstanter Zeit.
+        Entfernte Objekte werden nur markiert und erst mit flush (am Ende des Ticks) tatsächlich entfernt,
+        indem das letzte Objekt an ihre Stelle rückt. Dadurch darf während einer Iteration beliebig entfernt und
+        hinzugefügt werden, ohne dass Objekte übersprungen werden. Neu hinzugefügte Objekte werden von einer bereits
+        laufenden Iteration nicht mehr erfasst
+        """
+        self.__items: List[Any] = []
+        # Position im Container → Index des Handles
+        self.__handle_indices: List[int] = []
+
+        # Index des Handles → Position im Container (-1 wenn frei), Generation und Markierung zum Entfernen
+        self.__slots: List[int] = []
+        self.__generations: List[int] = []
+        self.__pending: List[bool] = []
+        self.__free_indices: List[int] = []
+
+        self.__handle_index_of: Dict[Any, int] = {}
+        self.__removed: List[int] = []
+
+    def __len__(self):
+        return len(self.__items) - len(self.__removed)
+
+    def __bool__(self):
+        return len(self.__items) > len(self.__removed)
+
+    def __iter__(self) -> Iterator[Any]:
+        # Objekte, die erst während der Iteration hinzukommen, werden nicht mehr erfasst
+        for slot in range(len(self.__items)):
+            if not self.__pending[self.__handle_indices[slot]]:
+                yield self.__items[slot]
+
+    def __contains__(self, item: Any):
+        handle_index = self.__handle_index_of.get(item)
+        return handle_index is not None and not self.__pending[handle_index]
+
+    def __getitem__(self, slot: int) -> Any:
+        """
+        Gibt das Objekt an der gegebenen Position zurück. Zum Entfernen markierte Objekte werden mitgezählt
+        """
+        return self.__items[slot]
+
+    @property
+    def slot_count(self) -> int:
+        """
+        Anzahl der belegten Positionen inklusive der zum Entfernen markierten Objekte
+        """
+        return len(self.__items)
+
+    def append(self, item: Any) -> EntityHandle:
+        """
+        Fügt ein Objekt am Ende hinzu
+        :return: Handle des Objekts
+        """
+        if item in self.__handle_index_of:
+            raise ValueError("item already in EntityContainer")
+
+        if self.__free_indices:
+            handle_index = self.__free_indices.pop()
+        else:
+            handle_index = len(self.__slots)
+            self.__slots.append(-1)
+            self.__generations.append(0)
+            self.__pending.append(False)
+
+        slot = len(self.__items)
+        self.__items.append(item)
+        self.__handle_indices.append(handle_index)
+        self.__slots[handle_index] = slot
+        self.__handle_index_of[item] = handle_index
+
+        self.slot_assigned(item, slot)
+        return EntityHandle(handle_index, self.__generations[handle_index])
+
+    def remove(self, item: Any):
+        """
+        Markiert ein Objekt zum Entfernen. Es wird bis zum nächsten Aufruf von flush bei Iterationen übersprungen
+        """
+        handle_index = self.__handle_index_of.get(item)
+        if handle_index is None:
+            raise ValueError("item not in EntityContainer")
+        if self.__pending[handle_index]:
+            return
+        self.__pending[handle_index] = True
+        self.__removed.append(handle_index)
+
+    def discard(self, item: Any):
+        """
+        Wie remove, ignoriert aber Objekte, die sich nicht im Container befinden
+        """
+        if item in self.__handle_index_of:
+            self.remove(item)
+
+    def handle(self, item: Any) -> EntityHandle:
+        handle_index = self.__handle_index_of[item]
+        return EntityHandle(handle_index, self.__generations[handle_index])
+
+    def get(self, handle: EntityHandle) -> Any | None:
+        """
+        Gibt das Objekt des Handles zurück oder None, falls es bereits entfernt wurde
+        """
+        if handle.index >= len(self.__slots) or self.__generations[handle.index] != handle.generation:
+            return None
+        if self.__pending[handle.index]:
+            return None
+        return self.__items[self.__slots[handle.index]]
+
+    def flush(self):
+        """
+        Entfernt alle markierten Objekte endgültig. Darf nicht während einer Iteration aufgerufen werden
+        """
+        for handle_index in self.__removed:
+            slot = self.__slots[handle_index]
+            item = self.__items[slot]
+            last = len(self.__items) - 1
+
+            self.slot_released(item, slot)
+
+            if slot != last:
+                moved = self.__items[last]
+                moved_handle_index = self.__handle_indices[last]
+                self.__items[slot] = moved
+                self.__handle_indices[slot] = moved_handle_index
+                self.__slots[moved_handle_index] = slot
+                self.slot_moved(moved, last, slot)
+
+            self.__items.pop()
+            self.__handle_indices.pop()
+
+            self.__slots[handle_index] = -1
+            self.__generations[handle_index] += 1
+            self.__pending[handle_index] = False
+            self.__free_indices.append(handle_index)
+            del self.__handle_index_of[item]
+        self.__removed = []
+
+    def clear(self):
+        """
+        Entfernt sofort alle Objekte
+        """
+        for item in self.__items:
+            self.remove(item)
+        self.flush()
+
+    def slot_assigned(self, item: Any, slot: int):
+        """
+        Wird aufgerufen, nachdem ein Objekt an der gegebenen Position hinzugefügt wurde. Für Unterklassen
+        """
+        pass
+
+    def slot_moved(self, item: Any, source: int, destination: int):
+        """
+        Wird aufgerufen, nachdem ein Objekt beim Entfernen eines anderen Objekts verschoben wurde. Für Unterklassen
+        """
+        pass
+
+    def slot_released(self, item: Any, slot: int):
+        """
+        Wird aufgerufen, bevor ein Objekt endgültig entfernt und seine Position durch das letzte Objekt belegt wird.
+        Für Unterklassen
+        """
+        pass
@@ -2,13 +2,18 @@ import abc
 import math
 import random
 from dataclasses import dataclass
-from typing import Tuple, List, Type, Callable, Any
+from typing import Tuple, List, Type, Callable, Any, Dict, FrozenSet
 
+import numpy as np
 import pygame
 
 from data.constants import MapLayer, AimMode, Color, TurretType
 from data.lib.map_objects import MapSurface
-from data.lib.sprites import SpriteData
+from data.lib.containers import EntityContainer, EntityHandle
+from data.lib.events import GameEventBus, GameEventType
+from data.lib.pools import PoolManager
+from data.lib.spatial import SpatialHashGrid, PathProgressIndex, PathTable, segment_rect_mask
+from data.lib.sprites import SpriteData, RotationCache
 from data.lib.vfx import VFXManager
 from data.lib.vfx_utils import get_outline
 
@@ -45,37 +50,71 @@ class Entity:
         return
 
 
-class Enemy(Entity):
-    position: Tuple[float, float]
+class StoreField:
+    def __init__(self, array_name: str):
+        """
+        Attribut eines Gegners, dessen Wert im Array array_name des EnemyStore liegt, solange sich der Gegner
+        darin befindet. Danach (bzw. davor) wird der Wert im Gegner selbst gespeichert
+        """
+        self.array_name = array_name
+        self.name = ""
+
+    def __set_name__(self, owner: type, name: str):
+        self.name = "_detached_" + name
+
+    def __get__(self, enemy: "Enemy", owner: type = None) -> Any:
+        if enemy is None:
+            return self
+        if enemy.slot < 0:
+            return enemy.__dict__[self.name]
+        return getattr(enemy.enemy_list, self.array_name)[enemy.slot].item()
+
+    def __set__(self, enemy: "Enemy", value: Any):
+        if enemy.slot < 0:
+            enemy.__dict__[self.name] = value
+        else:
+            getattr(enemy.enemy_list, self.array_name)[enemy.slot] = value
 
-    speed: float
+
+class Enemy(Entity):
+    speed = StoreField("speed")
 
     spawn: Tuple[float, float]
     path: List[Tuple[float, float]]
 
     # derzeitiger Zielpunkt als Index auf dem gegebenen Pfad
-    target: int
+    target = StoreField("target")
+    # auf dem Pfad zurückgelegter Weg in Pixeln
+    progress = StoreField("progress")
 
-    enemy_list: List[Entity]
+    enemy_list: "EnemyStore"
+    # Index des Gegners in den Arrays des EnemyStore, -1 wenn er sich nicht (mehr) darin befindet
+    slot: int
 
     level: int
 
     max_live_points: float
-    live_points: float
+    live_points = StoreField("live_points")
     damage_buffer: float
 
+    alive = StoreField("alive")
+
     def __init__(self, sprite_data: SpriteData, position: Tuple[float, float],
-                 /, speed: float, path: List[Tuple[float, float]], enemy_list: List[Entity], live_points: float,
+                 /, speed: float, path: List[Tuple[float, float]], enemy_list: "EnemyStore", live_points: float,
                  *, level: int = 0):
         """
-        Subklasse von Entity zum Erzeugen eines Gegners
-        :param position: Position an welcher der Gegner starten soll.
+        Subklasse von Entity zum Erzeugen eines Gegners.
+        Die Bewegung aller Gegner wird gesammelt vom EnemyStore berechnet, das Objekt selbst dient nur noch
+        als Ansicht auf die Daten des Gegners für Darstellung und Callbacks
+        :param position: Position an welcher der Gegner starten soll. Muss dem ersten Punkt des Pfades entsprechen.
         :param path: Pfad, welchem der Gegner auf der Karte folgen soll.
         :param sprite_data: Bilder, welche für die Animation des Gegners verwendet werden sollen.
         :param live_points: Anzahl der Lebenspunkte, die der Gegner zu Beginn haben soll.
         :param speed: Geschwindigkeit in Pixel pro Sekunde, mit welcher sich der Gegner fortbewegen soll.
         :param level: Position des Bildes, welches verwendet werden soll, in der Liste aller Bilder der Sprite-Daten.
         """
+        self.slot = -1
+
         super().__init__(sprite_data, position)
 
         self.speed = speed
@@ -83,12 +122,10 @@ class Enemy(Entity):
         self.path = path
         self.spawn = self.rect.topleft
         self.target = 0
+        self.progress = 0.
 
         self.position = self.spawn
 
-        self.enemy_list = enemy_list
-        self.enemy_list.append(self)
-
         self.level = level
 
         self.image = self.sprite_data.images[self.level]
@@ -101,21 +138,52 @@ class Enemy(Entity):
 
         self.alive = True
 
-        self.__on_kill_funcs = []
-        self.__on_success_funcs = []
-        self.__on_unbuffering_damage_funcs = []
+        self.enemy_list = enemy_list
+        self.enemy_list.append(self)
 
-    def on_kill(self, func: Callable[[], None]) -> Callable[[], None]:
-        self.__on_kill_funcs.append(func)
-        return func
+    @property
+    def position(self) -> Tuple[float, float]:
+        if self.slot < 0:
+            return self.__position
+        return self.enemy_list.x[self.slot].item(), self.enemy_list.y[self.slot].item()
 
-    def on_success(self, func: Callable[[], None]) -> Callable[[], None]:
-        self.__on_success_funcs.append(func)
-        return func
+    @position.setter
+    def position(self, position: Tuple[float, float]):
+        if self.slot < 0:
+            self.__position = position
+        else:
+            self.enemy_list.x[self.slot], self.enemy_list.y[self.slot] = position
+
+    @property
+    def rect(self) -> pygame.Rect:
+        # Das Rechteck wird erst bei Bedarf an die vom EnemyStore berechnete Position angepasst
+        if self.slot >= 0 and self.__rect_version != self.enemy_list.version:
+            self.__rect.topleft = self.position
+            self.__rect_version = self.enemy_list.version
+        return self.__rect
+
+    @rect.setter
+    def rect(self, rect: pygame.Rect):
+        self.__rect = rect
+        self.__rect_version = -1
+
+    def detach(self):
+        """
+        Übernimmt die Werte des Gegners aus dem EnemyStore, bevor er daraus entfernt wird
+        """
+        rect = self.rect
+        values = self.position, self.target, self.progress, self.speed, self.live_points, self.alive
+        self.slot = -1
+        self.position, self.target, self.progress, self.speed, self.live_points, self.alive = values
+        self.rect = rect
 
-    def on_unbuffering_damage(self, func: Callable[[], None]) -> Callable[[], None]:
-        self.__on_unbuffering_damage_funcs.append(func)
-        return func
+    def publish(self, event_type: GameEventType, amount: float = 0.):
+        """
+        Veröffentlicht ein Ereignis dieses Gegners auf dem GameEventBus des EnemyStore (falls vorhanden)
+        """
+        events = self.enemy_list.events
+        if events is not None:
+            events.publish(event_type, self.level, self.position, amount, self.max_live_points)
 
     def damage(self, damage_points: float):
         if self.live_points is None:
@@ -127,8 +195,7 @@ class Enemy(Entity):
         if self.live_points <= 0:
             self.unbuffer_damage(True)
             if self.alive:
-                for func in self.__on_kill_funcs:
-                    func()
+                self.publish(GameEventType.KILL)
             self.alive = False
             self.remove()
         return
@@ -136,71 +203,339 @@ class Enemy(Entity):
     def unbuffer_damage(self, ignore_damage_buffer_boundary: bool = False):
         self.damage_buffer = min(self.max_live_points, self.damage_buffer)
         if self.__damage_buffer_boundary < self.damage_buffer or ignore_damage_buffer_boundary:
-            for func in self.__on_unbuffering_damage_funcs:
-                func()
+            self.publish(GameEventType.DAMAGE_FLUSH, self.damage_buffer)
             self.damage_buffer = 0
         return
 
+    def succeed(self):
+        """
+        Wird vom EnemyStore aufgerufen, sobald der Gegner das Ende seines Pfades erreicht hat
+        """
+        self.publish(GameEventType.LEAK)
+        self.remove()
+
     def remove(self):
         """
         Entfernt den Gegner aus der Liste der aktiven Gegner und löscht alle Geschosse, die diesen Gegner treffen sollen
         """
+        # Auch Gegner, die das Ende des Pfades erreicht haben, dürfen nicht mehr anvisiert werden
+        self.alive = False
         if self in self.enemy_list:
             self.enemy_list.remove(self)
         return
 
-    def update(self, timedelta: float) -> bool:
+    def render(self, surface: MapSurface):
+        surface.blit(MapLayer.Enemy, self.image, self.rect.topleft)
+        return
+
+
+class EnemyStore(EntityContainer):
+    grid: SpatialHashGrid
+    progress_index: PathProgressIndex
+    events: GameEventBus | None
+
+    # Zähler, der bei jeder Bewegung der Gegner erhöht wird
+    version: int
+
+    # Daten aller Gegner als zusammenhängende Arrays, gültig sind jeweils die ersten slot_count Einträge
+    x: np.ndarray
+    y: np.ndarray
+    path_index: np.ndarray
+    target: np.ndarray
+    progress: np.ndarray
+    speed: np.ndarray
+    live_points: np.ndarray
+    level: np.ndarray
+    alive: np.ndarray
+    width: np.ndarray
+    height: np.ndarray
+    center_x: np.ndarray
+    center_y: np.ndarray
+    cell_x: np.ndarray
+    cell_y: np.ndarray
+
+    __fields = (
+        ("x", np.float64), ("y", np.float64), ("path_index", np.int32), ("target", np.int32),
+        ("progress", np.float64), ("speed", np.float64), ("live_points", np.float64), ("level", np.int32),
+        ("alive", np.bool_), ("width", np.int32), ("height", np.int32), ("center_x", np.int64), ("center_y", np.int64),
+        ("cell_x", np.int64), ("cell_y", np.int64),
+    )
+
+    def __init__(self, cell_size: float = 64, enemy_size: Tuple[int, int] = (32, 32), capacity: int = 256,
+                 event_bus: GameEventBus | None = None):
         """
-        Berechnet die nächste Position des Gegners
-        :return: True, wenn der Gegner einen anderen Startpunkt erreicht. Ansonsten wird False zurückgegeben.
+        Verwaltet alle aktiven Gegner. Position, Pfad, zurückgelegter Weg, Geschwindigkeit, Lebenspunkte und Level
+        aller Gegner liegen in zusammenhängenden NumPy-Arrays, sodass alle Gegner in einem einzigen vektorisierten
+        Schritt entlang ihrer Pfade bewegt werden können (siehe update).
+        Die Mittelpunkte der Gegner werden zusätzlich in einem Raster verwaltet, damit Reichweitenabfragen nur die
+        Gegner in der Nähe prüfen müssen. Außerdem werden die Gegner einmal pro Tick nach ihrem zurückgelegten Weg
+        sortiert (siehe rebuild_index).
+        Entfernte Gegner bleiben bis zum Aufruf von flush am Ende des Ticks in den Arrays, werden aber bei allen
+        Abfragen übersprungen
+        :param cell_size: Kantenlänge einer Rasterzelle in Pixeln
+        :param enemy_size: Größe der Gegner in Pixeln
+        :param capacity: Anfängliche Größe der Arrays, diese wird bei Bedarf verdoppelt
+        :param event_bus: Empfänger der Ereignisse (besiegt, durchgelaufen, Schaden) aller Gegner
         """
-        next_position = self.position
-        remaining_speed = self.speed * timedelta
+        super().__init__()
 
-        while remaining_speed:
-            if next_position == self.path[self.target]:
-                self.target += 1
-            if self.target > len(self.path) - 1:
-                for func in self.__on_success_funcs:
-                    func()
-                self.remove()
-                return True
+        self.events = event_bus
+
+        self.grid = SpatialHashGrid(cell_size)
+        self.progress_index = PathProgressIndex(offset=(enemy_size[0] / 2, enemy_size[1] / 2))
+
+        self.version = 0
+
+        self.__paths: List[PathTable] = []
+        self.__path_ids: Dict[int, int] = {}
+
+        for name, dtype in self.__fields:
+            setattr(self, name, np.zeros(max(capacity, 1), dtype=dtype))
+        self.__enemies = np.empty(max(capacity, 1), dtype=object)
+
+    def __grow(self):
+        # Verdoppelt die Größe aller Arrays
+        for name, _ in self.__fields:
+            array = getattr(self, name)
+            setattr(self, name, np.concatenate((array, np.zeros_like(array))))
+        self.__enemies = np.concatenate((self.__enemies, np.empty(len(self.__enemies), dtype=object)))
+
+    def __path_id(self, path: List[Tuple[float, float]]) -> int:
+        if id(path) not in self.__path_ids:
+            self.__path_ids[id(path)] = len(self.__paths)
+            self.__paths.append(PathTable(path))
+        return self.__path_ids[id(path)]
+
+    def slot_assigned(self, enemy: Enemy, slot: int):
+        if slot == len(self.x):
+            self.__grow()
+
+        self.x[slot], self.y[slot] = enemy.position
+        self.path_index[slot] = self.__path_id(enemy.path)
+        self.target[slot] = enemy.target
+        self.progress[slot] = enemy.progress
+        self.speed[slot] = enemy.speed
+        self.live_points[slot] = enemy.live_points
+        self.level[slot] = enemy.level
+        self.alive[slot] = enemy.alive
+
+        rect = enemy.rect
+        self.width[slot], self.height[slot] = rect.size
+        self.center_x[slot], self.center_y[slot] = rect.center
+        self.cell_x[slot] = math.floor(rect.centerx / self.grid.cell_size)
+        self.cell_y[slot] = math.floor(rect.centery / self.grid.cell_size)
+
+        self.__enemies[slot] = enemy
+        enemy.slot = slot
+
+        self.grid.insert(enemy, rect.center)
+
+    def slot_released(self, enemy: Enemy, slot: int):
+        enemy.detach()
+        self.__enemies[slot] = None
+        self.grid.remove(enemy)
+
+    def slot_moved(self, enemy: Enemy, source: int, destination: int):
+        # Der letzte Gegner rückt an die frei gewordene Stelle, damit die Arrays lückenlos bleiben
+        for name, _ in self.__fields:
+            array = getattr(self, name)
+            array[destination] = array[source]
+        self.__enemies[destination] = enemy
+        self.__enemies[source] = None
+        enemy.slot = destination
+
+    def remove(self, enemy: Enemy):
+        """
+        Markiert den Gegner als entfernt. Er wird ab sofort bei allen Abfragen übersprungen und mit flush
+        endgültig aus den Arrays entfernt
+        """
+        super().remove(enemy)
+        self.alive[enemy.slot] = False
+
+    def clear(self):
+        super().clear()
+        self.rebuild_index()
+
+    def update(self, timedelta: float):
+        """
+        Bewegt alle Gegner in einem vektorisierten Schritt entlang ihrer Pfade. Gegner, welche das Ende ihres
+        Pfades erreicht haben, werden benachrichtigt und entfernt. Anschließend wird der Index neu aufgebaut
+        :param timedelta: Zeit in Sekunden, die seit dem letzten Funktionsaufruf verstrichen ist
+        """
+        count = self.slot_count
+        self.version += 1
+        if not count:
+            self.rebuild_index()
+            return
 
-            dx = self.path[self.target][0] - next_position[0]
-            dy = self.path[self.target][1] - next_position[1]
-            distance = (dx ** 2 + dy ** 2) ** 0.5
+        progress = self.progress[:count]
+        progress += self.speed[:count] * timedelta
 
-            if remaining_speed >= distance:
-                next_position = self.path[self.target]
-                remaining_speed -= distance
+        finished = []
+        for path_id, path in enumerate(self.__paths):
+            if len(self.__paths) == 1:
+                members = slice(0, count)
+                path_progress = progress
             else:
-                next_position = (
-                    next_position[0] + dx * remaining_speed / distance,
-                    next_position[1] + dy * remaining_speed / distance
-                )
-                remaining_speed = 0
+                members = np.flatnonzero(self.path_index[:count] == path_id)
+                if not len(members):
+                    continue
+                path_progress = progress[members]
+
+            self.x[members], self.y[members], self.target[members] = path.locate(path_progress)
+
+            done = path_progress >= path.total_length
+            done &= self.alive[members]
+            if done.any():
+                finished.append(np.arange(count)[members][done])
+
+        center_x = self.center_x[:count]
+        center_y = self.center_y[:count]
+        # Wie bei pygame.Rect werden die Koordinaten abgeschnitten
+        np.add(self.x[:count].astype(np.int64), self.width[:count] // 2, out=center_x)
+        np.add(self.y[:count].astype(np.int64), self.height[:count] // 2, out=center_y)
+
+        # Im Raster werden nur die Gegner verschoben, welche die Zelle gewechselt haben
+        cell_x = center_x // self.grid.cell_size
+        cell_y = center_y // self.grid.cell_size
+        changed = ((cell_x != self.cell_x[:count]) | (cell_y != self.cell_y[:count])).nonzero()[0]
+        self.cell_x[:count] = cell_x
+        self.cell_y[:count] = cell_y
+        for slot in changed.tolist():
+            self.grid.move(self.__enemies[slot], (center_x[slot].item(), center_y[slot].item()))
+
+        if finished:
+            for enemy in self.__enemies[np.concatenate(finished)].tolist():
+                enemy.succeed()
+
+        self.rebuild_index()
 
-        self.position = next_position
-        self.rect.topleft = next_position
+    def render(self, surface: MapSurface):
+        """
+        Gibt alle Gegner gesammelt auf der Ebene MapLayer.Enemy aus
+        """
+        count = self.slot_count
+        if not count:
+            return
+        alive = self.alive[:count]
+        positions = zip(self.x[:count][alive].astype(np.int64).tolist(),
+                        self.y[:count][alive].astype(np.int64).tolist())
+        surface.blits(MapLayer.Enemy, [(enemy.image, position)
+                                       for enemy, position in zip(self.__enemies[:count][alive].tolist(), positions)])
+
+    def in_range(self, position: Tuple[float, float], radius: float) -> List[Enemy]:
+        """
+        Gibt alle Gegner zurück, deren Mittelpunkt höchstens radius von der gegebenen Position entfernt ist.
+        Sollte von allen Reichweiten- und Flächenabfragen verwendet werden
+        """
+        return self.__enemies[self.__slots_in_range(position, radius)].tolist()
+
+    def __slots_in_range(self, position: Tuple[float, float], radius: float) -> np.ndarray:
+        # Positionen der lebenden Gegner innerhalb der Reichweite, in der Reihenfolge des Rasters
+        candidates = self.grid.query_candidates(position, radius)
+        slots = np.fromiter((enemy.slot for enemy in candidates), dtype=np.intp, count=len(candidates))
+        if not len(slots):
+            return slots
+        inside = ((self.center_x[slots] - position[0]) ** 2
+                  + (self.center_y[slots] - position[1]) ** 2) <= radius ** 2
+        inside &= self.alive[slots]
+        return slots[inside]
+
+    def on_segment(self, start: Tuple[float, float], end: Tuple[float, float]) -> List[Enemy]:
+        """
+        Gibt alle Gegner zurück, deren Rechteck von der Strecke start → end geschnitten wird
+        """
+        count = self.slot_count
+        if not count:
+            return []
+
+        left = self.center_x[:count] - self.width[:count] // 2
+        top = self.center_y[:count] - self.height[:count] // 2
+        hits = segment_rect_mask(start, end, left, top, left + self.width[:count], top + self.height[:count])
+        hits &= self.alive[:count]
+        return self.__enemies[:count][hits].tolist()
+
+    def any_in_range(self, position: Tuple[float, float], radius: float,
+                     cells: FrozenSet[Tuple[int, int]] | None = None) -> bool:
+        """
+        Prüft, ob sich mindestens ein Gegner in der Reichweite befindet, ohne alle Gegner darin zu ermitteln
+        :param cells: Zuvor mit grid.cells_in_radius ermittelte Zellen des Suchkreises (z.B. einer festen Reichweite)
+        """
+        squared_radius = radius ** 2
+        candidates = (self.grid.query_candidates(position, radius) if cells is None
+                      else self.grid.query_cells(cells))
+        for enemy in candidates:
+            if not self.alive[enemy.slot]:
+                continue
+            if ((self.center_x[enemy.slot].item() - position[0]) ** 2
+                    + (self.center_y[enemy.slot].item() - position[1]) ** 2) <= squared_radius:
+                return True
         return False
 
-    def render(self, surface: MapSurface):
-        surface.blit(MapLayer.Enemy, self.image, self.rect.topleft)
-        return
+    def rebuild_index(self):
+        """
+        Sortiert alle Gegner nach ihrem zurückgelegten Weg. Wird am Ende von update aufgerufen
+        """
+        count = self.slot_count
+        self.progress_index.rebuild(self.__paths, self.path_index[:count], self.progress[:count],
+                                    self.__enemies[:count])
+
+    def first_in_range(self, position: Tuple[float, float], radius: float) -> Enemy | None:
+        """
+        Gibt den lebenden Gegner innerhalb der Reichweite zurück, der auf seinem Pfad am weitesten gekommen ist
+        """
+        return self.progress_index.first((position[0], position[1]), radius,
+                                         lambda enemy: self.__accept(enemy, position, radius))
+
+    def last_in_range(self, position: Tuple[float, float], radius: float) -> Enemy | None:
+        """
+        Gibt den lebenden Gegner innerhalb der Reichweite zurück, der auf seinem Pfad am wenigsten weit gekommen ist
+        """
+        return self.progress_index.last((position[0], position[1]), radius,
+                                        lambda enemy: self.__accept(enemy, position, radius))
+
+    def strongest_in_range(self, position: Tuple[float, float], radius: float) -> Enemy | None:
+        """
+        Gibt den lebenden Gegner innerhalb der Reichweite mit den meisten Lebenspunkten zurück, bei Gleichstand den
+        am weitesten gekommenen.
+        Anders als für first_in_range und last_in_range gibt es hierfür keine vorsortierte Reihenfolge, da sich die
+        Lebenspunkte mit jedem Treffer innerhalb eines Ticks ändern. Stattdessen werden nur die Gegner aus den
+        Rasterzellen der Reichweite in einem vektorisierten Schritt verglichen
+        """
+        slots = self.__slots_in_range(position, radius)
+        if not len(slots):
+            return None
+        # Der letzte Schlüssel von lexsort ist der wichtigste
+        strongest = np.lexsort((self.progress[slots], self.live_points[slots]))[-1]
+        return self.__enemies[slots[strongest]]
+
+    def __accept(self, enemy: Enemy, position: Tuple[float, float], radius: float) -> bool:
+        if not enemy.alive:
+            return False
+        return ((self.center_x[enemy.slot].item() - position[0]) ** 2
+                + (self.center_y[enemy.slot].item() - position[1]) ** 2) <= radius ** 2
+
+
+class ProjectileContainer(EntityContainer):
+    def slot_released(self, projectile: "Projectile", slot: int):
+        """
+        Endgültig entfernte Geschosse werden samt ihrer Effekte freigegeben und an ihren Pool zurückgegeben
+        """
+        projectile.vfx_manager.release(projectile)
+        PoolManager.release(projectile)
 
 
 class Projectile(Entity):
     origin: pygame.math.Vector2
-    enemy_list: List[Enemy]
-    target: Enemy | Tuple[float, float] | None
+    enemy_list: EnemyStore
 
-    projectile_list: List[Entity]
+    projectile_list: EntityContainer
 
     turret_aim_mode: AimMode
     turret_range: float
 
     def __init__(self, sprite_data: SpriteData, position: Tuple[float, float],
-                 /, enemy_list: List[Enemy], projectile_list: List[Entity],
+                 /, enemy_list: EnemyStore, projectile_list: EntityContainer,
                  turret_aim_mode: AimMode, turret_range: float, vfx_manager: VFXManager):
         super().__init__(sprite_data, position)
 
@@ -209,7 +544,34 @@ class Projectile(Entity):
         self.origin = pygame.math.Vector2(self.rect.topleft)
 
         self.enemy_list = enemy_list
-        self.target = None
+        self.__target_handle: EntityHandle | None = None
+
+        self.projectile_list = projectile_list
+        self.projectile_list.append(self)
+
+        self.turret_aim_mode = turret_aim_mode
+        self.turret_range = turret_range
+
+        self.retarget()
+
+    def reset(self, sprite_data: SpriteData, position: Tuple[float, float],
+              /, enemy_list: EnemyStore, projectile_list: EntityContainer,
+              turret_aim_mode: AimMode, turret_range: float, vfx_manager: VFXManager):
+        """
+        Versetzt das Geschoss in den Zustand eines neu abgefeuerten Geschosses, damit es vom PoolManager
+        wiederverwendet werden kann. Nimmt dieselben Parameter wie die Initialisierungsfunktion an, Bild und Rechteck
+        werden jedoch weiterverwendet. Unterklassen müssen ihren eigenen Zustand zurücksetzen
+        """
+        self.sprite_data = sprite_data
+        self.image = self.sprite_data.images[0]
+        self.rect.update(position, self.image.get_size())
+
+        self.vfx_manager = vfx_manager
+
+        self.origin.update(self.rect.topleft)
+
+        self.enemy_list = enemy_list
+        self.__target_handle = None
 
         self.projectile_list = projectile_list
         self.projectile_list.append(self)
@@ -219,47 +581,55 @@ class Projectile(Entity):
 
         self.retarget()
 
+    @property
+    def target(self) -> Enemy | None:
+        """
+        Ziel des Geschosses oder None, sobald es aus dem EnemyStore entfernt wurde
+        """
+        if self.__target_handle is None:
+            return None
+        return self.enemy_list.get(self.__target_handle)
+
+    @target.setter
+    def target(self, enemy: Enemy | None):
+        self.__target_handle = None if enemy is None else self.enemy_list.handle(enemy)
+
     def retarget(self):
-        if self.enemy_list:
-            enemies_in_range = [
-                enemy for enemy in self.enemy_list
+        if not self.enemy_list:
+            self.remove()
+            return
+
+        if self.turret_aim_mode == AimMode.First:
+            target = self.enemy_list.first_in_range(self.origin, self.turret_range)
+
+        elif self.turret_aim_mode == AimMode.Last:
+            target = self.enemy_list.last_in_range(self.origin, self.turret_range)
 
-                if ((enemy.rect.centerx - self.origin.x) ** 2 + (enemy.rect.centery - self.origin.y) ** 2) ** 0.5
-                <= self.turret_range and enemy.alive
+        elif self.turret_aim_mode == AimMode.Strongest:
+            target = self.enemy_list.strongest_in_range(self.origin, self.turret_range)
+
+        else:
+            enemies_in_range = [
+                enemy for enemy in self.enemy_list.in_range(self.origin, self.turret_range) if enemy.alive
             ]
-            if enemies_in_range:
-                possible_enemies = {}
-                if self.turret_aim_mode == AimMode.First:
-                    for enemy in enemies_in_range:
-                        possible_enemies[
-                            (enemy.target, abs(sum(enemy.path[enemy.target]) - sum(enemy.rect.topleft)))
-                        ] = enemy
-                    self.target = possible_enemies[max([
-                        e_target for e_target in possible_enemies.keys() if e_target == max(possible_enemies.keys())
-                    ], key=lambda x: x[1])]
-
-                elif self.turret_aim_mode == AimMode.Nearest:
-                    self.target = min(
-                        enemies_in_range, key=lambda enemy: (
-                                ((enemy.rect.x - self.rect.x) ** 2 + (enemy.rect.y - self.rect.y) ** 2) ** 0.5
-                        )
-                    )
+            if not enemies_in_range:
+                target = None
 
-                elif self.turret_aim_mode == AimMode.Last:
-                    self.target = max(
-                        enemies_in_range, key=lambda enemy: (
-                                ((enemy.rect.x - self.rect.x) ** 2 + (enemy.rect.y - self.rect.y) ** 2) ** 0.5
-                        )
+            elif self.turret_aim_mode == AimMode.Nearest:
+                target = min(
+                    enemies_in_range, key=lambda enemy: (
+                            ((enemy.rect.x - self.rect.x) ** 2 + (enemy.rect.y - self.rect.y) ** 2) ** 0.5
                     )
+                )
 
-                elif self.turret_aim_mode == AimMode.Random:
-                    self.target = random.choice(enemies_in_range)
+            elif self.turret_aim_mode == AimMode.Random:
+                target = random.choice(enemies_in_range)
 
-                else:
-                    raise ValueError("self.aiming not in AimModes")
             else:
-                self.remove()
-        else:
+                raise ValueError("self.aiming not in AimModes")
+
+        self.target = target
+        if target is None:
             self.remove()
 
     @abc.abstractmethod
@@ -301,21 +671,22 @@ class DefenseEntity(Entity):
 class Turret(DefenseEntity):
     default_sprite_data: SpriteData = None
     default_projectile_sprite_data: SpriteData = None
+    default_turret_image: pygame.Surface = None
 
     turret_list: List[DefenseEntity]
-    enemy_list: List[Enemy]
+    enemy_list: EnemyStore
 
     aim_mode: AimMode
     projectile_data: ProjectileData
     projectiles_per_second: float
-    projectiles: List[Projectile]
+    projectiles: ProjectileContainer
     time_since_last_shot: float
 
     overlay: bool
 
     def __init__(self, position: Tuple[float, float],
                  /, defense_range: float,
-                 turret_list: List[DefenseEntity], enemy_list: List[Enemy],
+                 turret_list: List[DefenseEntity], enemy_list: EnemyStore,
                  projectile_data: ProjectileData, projectiles_per_second: float, turret_image: pygame.Surface,
                  vfx_manager: VFXManager,
                  *, sprite_data: SpriteData = None, aim_mode: AimMode = AimMode.First, level: int = 1):
@@ -347,8 +718,11 @@ class Turret(DefenseEntity):
         self.aim_mode = aim_mode
         self.projectile_data = projectile_data
         self.projectiles_per_second = projectiles_per_second
-        self.projectiles = []
+        self.projectiles = ProjectileContainer()
+        self.__last_projectile: EntityHandle | None = None
         self.time_since_last_shot = 1 / projectiles_per_second
+        # Rasterzellen der Reichweite, Position und Reichweite eines Turmes ändern sich nicht
+        self.__range_cells = None
 
         self.overlay = False
 
@@ -357,18 +731,28 @@ class Turret(DefenseEntity):
         Errechnet, ob ein weiteres Geschoss abgefeuert werden soll. Wenn ja, wird dieses Objekt erzeugt.
         """
         self.time_since_last_shot += timedelta
-        if self.enemy_list and self.time_since_last_shot >= (1 / self.projectiles_per_second):
-            self.projectile_data.type(self.projectile_data.sprite_data, self.rect.center,
-                                      self.enemy_list, self.projectiles, self.aim_mode, self.range, self.vfx_manager)
+        if (self.time_since_last_shot >= (1 / self.projectiles_per_second)
+                and self.enemy_list and self.__any_in_range()):
+            # Geschosse werden über ihren Pool wiederverwendet, das Handle erkennt daher auch ein bereits
+            #  entferntes und neu vergebenes Geschoss
+            self.__last_projectile = self.projectiles.handle(PoolManager.acquire(
+                self.projectile_data.type, self.projectile_data.sprite_data, self.rect.center,
+                self.enemy_list, self.projectiles, self.aim_mode, self.range, self.vfx_manager
+            ))
             self.time_since_last_shot -= 1 / self.projectiles_per_second
         elif self.time_since_last_shot > (1 / self.projectiles_per_second):
             self.time_since_last_shot = 1 / self.projectiles_per_second
+        if not self.projectiles.slot_count:
+            return
         for projectile in self.projectiles:
             projectile.update(timedelta)
-        if self.projectiles:
-            if self.projectiles[-1].target:
-                self.turret_target_pos = self.projectiles[-1].target.position
-                self.__current_turret_image = pygame.transform.rotate(
+        self.projectiles.flush()
+        last_projectile = None if self.__last_projectile is None else self.projectiles.get(self.__last_projectile)
+        if last_projectile is not None:
+            target = last_projectile.target
+            if target is not None:
+                self.turret_target_pos = target.position
+                self.__current_turret_image = RotationCache.get_rotated(
                     self.turret_image, 450 - math.degrees(
                         math.atan2((self.rect.center[1] - self.turret_target_pos[1]),
                                    (self.rect.center[0] - self.turret_target_pos[0]))
@@ -376,6 +760,11 @@ class Turret(DefenseEntity):
                 )
         return
 
+    def __any_in_range(self) -> bool:
+        if self.__range_cells is None:
+            self.__range_cells = self.enemy_list.grid.cells_in_radius(self.rect.center, self.range)
+        return self.enemy_list.any_in_range(self.rect.center, self.range, self.__range_cells)
+
     def render(self, surface: MapSurface):
         """
         Gibt den Turm, sowie ggf. eine grafische Darstellung der Reichweite dieses Turmes auf dem Bildschirm aus
@@ -461,7 +850,7 @@ class PreviewTurret(DefenseEntity):
 
         surface.blit(self.image, self.rect.topleft)
 
-    def place(self, enemy_list: List[Enemy], vfx_manager: VFXManager,
+    def place(self, enemy_list: EnemyStore, vfx_manager: VFXManager,
               *, aim_mode: AimMode = AimMode.First):
         """
         Erstellt einen neuen Turm an der derzeitigen Position, sofern er nicht mit anderen Objekten kollidiert.
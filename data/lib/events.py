@@ -0,0 +1,89 @@
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, List, Callable, Tuple
+
+import numpy as np
+
+
+class GameEventType(Enum):
+    # Ein Gegner wurde besiegt
+    KILL = 0
+    # Ein Gegner hat das Ende seines Pfades erreicht
+    LEAK = 1
+    # Der gesammelte Schaden eines Gegners soll angezeigt werden
+    DAMAGE_FLUSH = 2
+
+
+@dataclass
+class GameEventBatch:
+    """
+    Alle Ereignisse eines Typs, die seit dem letzten Leeren des GameEventBus veröffentlicht wurden,
+    spaltenweise in der Reihenfolge ihres Auftretens
+    """
+    levels: np.ndarray
+    x: np.ndarray
+    y: np.ndarray
+    # Zusätzlicher Wert des Ereignisses (z.B. Schaden), sonst 0
+    amounts: np.ndarray
+    max_live_points: np.ndarray
+
+    def __len__(self):
+        return len(self.levels)
+
+
+class GameEventBus:
+    def __init__(self):
+        """
+        Sammelt die Ereignisse der Gegner während eines Ticks und gibt sie beim Aufruf von drain gebündelt
+        an die Empfänger ihres Typs weiter
+        """
+        self.__handlers: Dict[GameEventType, List[Callable[[GameEventBatch], None]]] = {
+            event_type: [] for event_type in GameEventType
+        }
+        # Ereignistyp → [Level, x, y, Wert, maximale Lebenspunkte]
+        self.__columns: Dict[GameEventType, List[list]] = {
+            event_type: [[], [], [], [], []] for event_type in GameEventType
+        }
+
+    def subscribe(self, event_type: GameEventType,
+                  handler: Callable[[GameEventBatch], None]) -> Callable[[GameEventBatch], None]:
+        self.__handlers[event_type].append(handler)
+        return handler
+
+    def publish(self, event_type: GameEventType, level: int, position: Tuple[float, float],
+                amount: float = 0., max_live_points: float = 0.):
+        # Ereignisse ohne Empfänger werden gar nicht erst gesammelt
+        if not self.__handlers[event_type]:
+            return
+        levels, x, y, amounts, max_live_points_column = self.__columns[event_type]
+        levels.append(level)
+        x.append(position[0])
+        y.append(position[1])
+        amounts.append(amount)
+        max_live_points_column.append(max_live_points)
+
+    def drain(self):
+        """
+        Gibt alle gesammelten Ereignisse an ihre Empfänger weiter und leert den Bus. Einmal pro Tick aufzurufen
+        """
+        for event_type, columns in self.__columns.items():
+            if not columns[0]:
+                continue
+            levels, x, y, amounts, max_live_points = columns
+            batch = GameEventBatch(
+                levels=np.array(levels, dtype=np.int32),
+                x=np.array(x, dtype=np.float64),
+                y=np.array(y, dtype=np.float64),
+                amounts=np.array(amounts, dtype=np.float64),
+                max_live_points=np.array(max_live_points, dtype=np.float64),
+            )
+            self.__columns[event_type] = [[], [], [], [], []]
+            for handler in self.__handlers[event_type]:
+                handler(batch)
+
+    def clear(self):
+        """
+        Verwirft alle gesammelten Ereignisse, ohne sie weiterzugeben
+        """
+        for event_type in GameEventType:
+            self.__columns[event_type] = [[], [], [], [], []]
@@ -6,30 +6,44 @@ import pytmx
 
 from data import constants
 from data.constants import MapLayer
-from data.lib.map_objects import MapSurface
+from data.lib.map_objects import MapSurface, LayeredMapSurface, DrawListMapSurface
+from data.lib.sprites import convert
 from data.lib.vfx import VFXManager, InGameBackgroundEffect
 
 
 class Map:
     adjacent_tile_coordinates = [(1, 0), (-1, 0), (0, 1), (0, -1)]
 
-    def __init__(self, path_to_tilemap: str, vfx_manager: VFXManager):
+    map_surface: MapSurface | None
+
+    def __init__(self, path_to_tilemap: str, vfx_manager: VFXManager,
+                 *, headless: bool = False, draw_list: bool = True):
         """
         Hiermit lassen sich Karten erstellen, die eine Tilemap darstellen und
         ein pygame.Surface Objekt zur Verfügung stellen
         :param path_to_tilemap: Dateipfad der gewünschten Tilemap
+        :param headless: Wenn True, werden nur die Spieldaten der Tilemap (Pfade, Bauzonen) geladen.
+                         Es werden weder Bilder geladen noch Oberflächen erzeugt
+        :param draw_list: Wenn True, wird DrawListMapSurface verwendet, sonst LayeredMapSurface
         """
 
         self.vfx_manager = vfx_manager
+        self.headless = headless
 
-        self.data = pytmx.load_pygame(path_to_tilemap)
+        if self.headless:
+            self.data = pytmx.TiledMap(path_to_tilemap)
+        else:
+            self.data = pytmx.load_pygame(path_to_tilemap)
         self.rect = (self.data.tilewidth * self.data.width, self.data.tileheight * self.data.height)
         self.center = (self.rect[0] / 2, self.rect[1] / 2)
-        self.map_surface = MapSurface(pygame.Surface(self.rect, pygame.SRCALPHA))
+        self.map_surface = None
+        if not self.headless:
+            map_surface_type = DrawListMapSurface if draw_list else LayeredMapSurface
+            self.map_surface = map_surface_type(convert(pygame.Surface(self.rect)))
 
         self.tilemap_image = None
         self.background_vfx = InGameBackgroundEffect()
-        self.vfx_manager.add_effect(self.background_vfx, self.background_vfx)
+        self.vfx_manager.add_effect(self.background_vfx, self.background_vfx, layer=MapLayer.Base)
 
         self.construction_zones: List[pygame.Rect] = []
         self.spawnpoints: List[Tuple[int, int]] = []
@@ -61,18 +75,16 @@ class Map:
                         )
         self.tilemap_image = surface
 
-    def render(self):
+    def render(self, view_rect: pygame.Rect | None = None):
         """
-        Setzt die Oberfläche auf ihren Ursprungszustand zurück
+        Zeichnet alle Effekte der Karte, setzt die Ebenen der Karte zusammen und leert sie anschließend
+        :param view_rect: Sichtbarer Bereich der Karte, Effekte außerhalb dieses Bereichs werden nicht gezeichnet
         """
-        self.vfx_manager.transform_object(self, (0, 0), self.map_surface.get_surface(MapLayer.Base).get_size())
-        self.vfx_manager.transform_object(self.background_vfx, (0, 0),
-                                          self.map_surface.get_surface(MapLayer.Base).get_size())
+        self.vfx_manager.transform_object(self, (0, 0), self.map_surface.get_size())
+        self.vfx_manager.transform_object(self.background_vfx, (0, 0), self.map_surface.get_size())
 
-        self.map_surface.blit(MapLayer.Base, self.tilemap_image, (0, 0))
-        self.vfx_manager.render(self.background_vfx, self.map_surface.get_surface(MapLayer.Base))
+        self.vfx_manager.render_layers(self.map_surface, view_rect)
         self.map_surface.render()
-        self.vfx_manager.render(self, self.map_surface.get_surface(MapLayer.VFX))
 
     def __calculate_paths_from_spawn(self, spawn_coords: Tuple[int, int], path: List[Tuple[int, int]] = None):
         """
@@ -139,5 +151,19 @@ class Map:
                 self.paths[path][-1][0] + (self.paths[path][-1][0] - self.paths[path][-2][0]),
                 self.paths[path][-1][1] + (self.paths[path][-1][1] - self.paths[path][-2][1])
             ))
-        self.__render_tilemap()
+        if not self.headless:
+            self.__render_tilemap()
+            # Die Tilemap wird einmalig als undurchsichtiger Hintergrund der MapSurface gespeichert
+            self.map_surface.set_base(self.tilemap_image)
         return
+
+    def invalidate_tiles(self, rect: pygame.Rect | None = None):
+        """
+        Zeichnet die Tilemap neu und überträgt den geänderten Bereich in den Hintergrund der MapSurface.
+        Muss nach jeder Änderung an den Kacheln (z.B. zerstörbare oder animierte Kacheln) aufgerufen werden
+        :param rect: Geänderter Bereich in Pixeln, ohne Angabe die gesamte Karte
+        """
+        if self.headless:
+            return
+        self.__render_tilemap()
+        self.map_surface.update_base(self.tilemap_image, rect)
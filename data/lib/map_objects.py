@@ -1,52 +1,385 @@
-from typing import Dict, Tuple, Any
+import abc
+import math
+from typing import Dict, Tuple, Any, Iterable, List, Callable
 
+import numpy as np
 import pygame
 
 from data.constants import MapLayer, Color
+from data.lib.sprites import convert
+
+
+class DirtyGrid:
+    def __init__(self, surface_size: Tuple[int, int], tile_size: int):
+        """
+        Vermerkt bemalte Bereiche einer Oberfläche in einem Raster aus Kacheln der Größe tile_size. Anders als eine
+        Liste von Rechtecken überlappen sich die daraus erzeugten Bereiche nie, sodass halbtransparente Pixel beim
+        Zusammensetzen nicht doppelt geblendet werden
+        """
+        self.size = surface_size
+        self.tile_size = tile_size
+        self.tiles = np.zeros((-(-surface_size[1] // tile_size), -(-surface_size[0] // tile_size)), dtype=bool)
+        self.empty = True
+
+    def mark(self, rect: pygame.Rect):
+        if rect.w <= 0 or rect.h <= 0:
+            return
+        tile_size = self.tile_size
+        self.tiles[max(0, rect.top // tile_size):max(0, -(-rect.bottom // tile_size)),
+                   max(0, rect.left // tile_size):max(0, -(-rect.right // tile_size))] = True
+        self.empty = False
+
+    def mark_all(self):
+        self.tiles[:] = True
+        self.empty = False
+
+    def clear(self):
+        if not self.empty:
+            self.tiles[:] = False
+            self.empty = True
+
+    def take(self) -> np.ndarray:
+        """
+        Gibt das Raster zurück und beginnt ein neues, leeres
+        """
+        tiles = self.tiles
+        self.tiles = np.zeros_like(tiles)
+        self.empty = True
+        return tiles
+
+    def get_rects(self, tiles: np.ndarray | None = None) -> List[pygame.Rect]:
+        """
+        Fasst die markierten Kacheln jeder Zeile zu möglichst wenigen, sich nicht überlappenden Rechtecken zusammen.
+        Gleich breite Abschnitte aufeinanderfolgender Zeilen werden zu einem Rechteck vereint
+        :param tiles: Anderes Raster derselben Größe, ohne Angabe das eigene
+        """
+        tiles = self.tiles if tiles is None else tiles
+        rows, columns = tiles.shape
+        padded = np.zeros((rows, columns + 2), dtype=np.int8)
+        padded[:, 1:-1] = tiles
+        edges = np.diff(padded, axis=1)
+        start_rows, start_columns = np.nonzero(edges == 1)
+        _, end_columns = np.nonzero(edges == -1)
+        tile_size = self.tile_size
+        rects = []
+        # Zuletzt begonnenes Rechteck je Abschnitt (erste und letzte Spalte)
+        runs: Dict[Tuple[int, int], pygame.Rect] = {}
+        for row, start, end in zip(start_rows.tolist(), start_columns.tolist(), end_columns.tolist()):
+            rect = runs.get((start, end))
+            if rect is not None and rect.bottom == row * tile_size:
+                rect.h += tile_size
+                continue
+            rect = pygame.Rect(start * tile_size, row * tile_size, (end - start) * tile_size, tile_size)
+            runs[(start, end)] = rect
+            rects.append(rect)
+        return [rect.clip(0, 0, *self.size) for rect in rects]
 
 
 class MapSurfaceLayer:
-    def __init__(self, surface_size: Tuple[int, int], layer: int):
+    def __init__(self, surface_size: Tuple[int, int], layer: int, tile_size: int):
         self.surface = pygame.Surface(surface_size, pygame.SRCALPHA)
         self.layer = layer
 
+        # Bereiche, in welche seit dem letzten Zusammensetzen gezeichnet wurde
+        self.dirty = DirtyGrid(surface_size, tile_size)
+
     def render(self, surface: pygame.Surface):
-        surface.blit(self.surface, (0, 0))
-        self.surface.fill((0, 0, 0, 0))
+        """
+        Überträgt die bemalten Bereiche der Ebene auf die Oberfläche und leert sie anschließend
+        """
+        if self.dirty.empty:
+            return
+        rects = self.dirty.get_rects()
+        surface.blits([(self.surface, rect, rect) for rect in rects], doreturn=False)
+        for rect in rects:
+            self.surface.fill((0, 0, 0, 0), rect)
+        self.dirty.clear()
+
 
+class MapSurface(abc.ABC):
+    # Kantenlänge der Kacheln, in welchen bemalte Bereiche vermerkt werden
+    tile_size: int = 32
+    # Ist der zu erneuernde Anteil der Karte größer, wird die ganze Karte in einem Schritt erneuert
+    full_redraw_ratio: float = 0.5
 
-class MapSurface:
     def __init__(self, surface: pygame.Surface):
+        """
+        Sammelt alle Zeichenvorgänge auf der Karte in Ebenen (siehe MapLayer) und setzt sie einmal pro Frame
+        zusammen. Dabei werden nur die Bereiche erneuert, in welche in diesem oder im vorigen Frame gezeichnet wurde:
+        Sie werden aus dem unveränderlichen Hintergrund (siehe set_base) wiederhergestellt, bevor die Ebenen darüber
+        gelegt werden. Die übrige Oberfläche bleibt vom vorigen Frame erhalten.
+        Umsetzungen: LayeredMapSurface und DrawListMapSurface
+        """
         self.surface = surface
+        self.rect = self.surface.get_rect()
+
+        # Undurchsichtig und im Pixelformat des Bildschirms, damit das Wiederherstellen ein einfaches Kopieren ist
+        self._base = convert(pygame.Surface(self.surface.get_size()))
+        self._base.fill(Color.BACKGROUND)
+        # Im vorigen Frame bemalte Bereiche aller Ebenen
+        self._previous_dirty = DirtyGrid(self.surface.get_size(), self.tile_size)
+        self._previous_dirty.mark_all()
+
+    def set_base(self, image: pygame.Surface):
+        """
+        Legt den unveränderlichen Hintergrund der Karte (z.B. die Tilemap) fest. Das Bild wird einmalig auf die
+        Hintergrundfarbe in eine undurchsichtige Oberfläche übertragen, spätere Änderungen am Bild werden erst mit
+        update_base übernommen
+        """
+        self.update_base(image)
+
+    def update_base(self, image: pygame.Surface, rect: pygame.Rect | None = None):
+        """
+        Überträgt einen geänderten Bereich des Hintergrunds (z.B. zerstörbare oder animierte Kacheln) erneut
+        :param image: Bild des gesamten Hintergrunds
+        :param rect: Geänderter Bereich, ohne Angabe der gesamte Hintergrund
+        """
+        rect = self.rect if rect is None else self.rect.clip(rect)
+        self._base.fill(Color.BACKGROUND, rect)
+        self._base.blit(image, rect, rect)
+        self._previous_dirty.mark(rect)
+
+    @abc.abstractmethod
+    def blit(self, layer: MapLayer, source: pygame.Surface, dest: Any, special_flags: int = 0):
+        pass
+
+    @abc.abstractmethod
+    def blits(self, layer: MapLayer, blit_sequence: Iterable[Tuple[pygame.Surface, Any]]):
+        pass
+
+    @abc.abstractmethod
+    def draw(self, layer: MapLayer, render: Callable[[pygame.Surface], None],
+             dirty_rects: Iterable[pygame.Rect] | None = None):
+        """
+        Lässt render auf der Ebene zeichnen, z.B. Effekte, die selbst auf eine Oberfläche zeichnen
+        :param dirty_rects: Bereiche, in welche render zeichnet. Ohne Angabe gilt die ganze Ebene als bemalt
+        """
+
+    @abc.abstractmethod
+    def get_surface(self, layer: MapLayer, dirty_rect: pygame.Rect | None = None) -> pygame.Surface:
+        """
+        Gibt eine Oberfläche zum direkten Zeichnen auf der Ebene zurück
+        :param dirty_rect: Bereich, in welchen gezeichnet wird. Ohne Angabe gilt die ganze Ebene als bemalt
+        """
+
+    @abc.abstractmethod
+    def mark_dirty(self, layer: MapLayer, rect: pygame.Rect | None = None):
+        """
+        Vermerkt, dass auf der Oberfläche aus get_surface in den Bereich einer Ebene gezeichnet wurde
+        :param rect: Bereich, ohne Angabe die ganze Ebene
+        """
+
+    @abc.abstractmethod
+    def set_layer_alpha(self, layer: MapLayer, alpha: int | None):
+        """
+        Legt eine Transparenz fest, mit welcher die Ebene als Ganzes über die darunterliegenden gelegt wird
+        :param alpha: 0 bis 255, None: keine
+        """
+
+    @abc.abstractmethod
+    def render(self, surface: pygame.Surface = None):
+        pass
+
+    def _restore(self, dirty: np.ndarray):
+        """
+        Stellt die in diesem (dirty) oder im vorigen Frame bemalten Bereiche aus dem Hintergrund wieder her.
+        dirty wird für den nächsten Frame übernommen und darf danach nicht mehr verändert werden
+        """
+        # Bereiche des vorigen Frames werden ebenfalls erneuert, damit dort Gezeichnetes wieder verschwindet
+        restore = dirty | self._previous_dirty.tiles
+        self._previous_dirty.tiles = dirty
+        self._previous_dirty.empty = not dirty.any()
+
+        if np.count_nonzero(restore) > restore.size * self.full_redraw_ratio:
+            self.surface.blit(self._base, (0, 0))
+        else:
+            self.surface.blits([(self._base, rect, rect) for rect in self._previous_dirty.get_rects(restore)],
+                               doreturn=False)
+
+    def get_width(self):
+        return self.surface.get_width()
+
+    def get_height(self):
+        return self.surface.get_height()
+
+    def get_size(self):
+        return self.surface.get_size()
+
+
+class LayeredMapSurface(MapSurface):
+    def __init__(self, surface: pygame.Surface):
+        """
+        Zeichnet jede Ebene auf eine eigene Oberfläche in Kartengröße und legt deren bemalte Bereiche beim
+        Zusammensetzen übereinander
+        """
+        super().__init__(surface)
 
         self.__blit_list = {}
 
         self.surfaces: Dict[MapLayer, MapSurfaceLayer] = {}
         for element in MapLayer:
-            self.surfaces[element] = MapSurfaceLayer(self.surface.get_size(), element.value)
+            self.surfaces[element] = MapSurfaceLayer(self.surface.get_size(), element.value, self.tile_size)
             self.__blit_list[element.value] = self.surfaces[element]
         self.__blit_list = dict(sorted(self.__blit_list.items())).values()
 
-    def blit(self, layer: MapLayer, source: pygame.Surface, dest: Any):
-        self.surfaces[layer].surface.blit(source, dest)
+    def blit(self, layer: MapLayer, source: pygame.Surface, dest: Any, special_flags: int = 0):
+        map_layer = self.surfaces[layer]
+        map_layer.dirty.mark(map_layer.surface.blit(source, dest, special_flags=special_flags))
         return
 
-    def get_surface(self, layer: MapLayer):
+    def blits(self, layer: MapLayer, blit_sequence: Iterable[Tuple[pygame.Surface, Any]]):
+        map_layer = self.surfaces[layer]
+        for rect in map_layer.surface.blits(blit_sequence):
+            map_layer.dirty.mark(rect)
+        return
+
+    def draw(self, layer: MapLayer, render: Callable[[pygame.Surface], None],
+             dirty_rects: Iterable[pygame.Rect] | None = None):
+        if dirty_rects is None:
+            self.mark_dirty(layer)
+        else:
+            for rect in dirty_rects:
+                self.mark_dirty(layer, rect)
+        render(self.surfaces[layer].surface)
+
+    def get_surface(self, layer: MapLayer, dirty_rect: pygame.Rect | None = None) -> pygame.Surface:
+        self.mark_dirty(layer, dirty_rect)
         return self.surfaces[layer].surface
 
+    def mark_dirty(self, layer: MapLayer, rect: pygame.Rect | None = None):
+        if rect is None:
+            self.surfaces[layer].dirty.mark_all()
+        else:
+            self.surfaces[layer].dirty.mark(pygame.Rect(rect))
+
+    def set_layer_alpha(self, layer: MapLayer, alpha: int | None):
+        self.surfaces[layer].surface.set_alpha(alpha)
+
     def render(self, surface: pygame.Surface = None):
-        self.surface.fill(Color.BACKGROUND)
+        dirty = np.zeros_like(self._previous_dirty.tiles)
+        for map_layer in self.__blit_list:
+            if not map_layer.dirty.empty:
+                dirty |= map_layer.dirty.tiles
+        self._restore(dirty)
+
         for surf in self.__blit_list:
             surf.render(self.surface)
         if surface:
             surface.blit(self.surface, (0, 0))
         return
 
-    def get_width(self):
-        return self.surface.get_width()
 
-    def get_height(self):
-        return self.surface.get_height()
+class DrawListMapSurface(MapSurface):
+    def __init__(self, surface: pygame.Surface):
+        """
+        Zeichnet nicht sofort, sondern sammelt alle Zeichenvorgänge als Befehle je Ebene. Beim Zusammensetzen werden
+        die Befehle nach Ebenen geordnet (innerhalb einer Ebene in der Reihenfolge ihres Aufrufs) mit möglichst
+        wenigen Aufrufen von fblits bzw. blits direkt auf der Karte ausgeführt. Oberflächen in Kartengröße werden
+        nur für Ebenen mit eigener Transparenz (set_layer_alpha) und für direktes Zeichnen (get_surface) angelegt
+        """
+        super().__init__(surface)
 
-    def get_size(self):
-        return self.surface.get_size()
+        self.__layer_order = sorted(MapLayer, key=lambda map_layer: map_layer.value)
+        # Ebene → Befehle: (Quelle, Ziel, Ausschnitt, Flags) oder eine Funktion, welche auf die Karte zeichnet
+        self.__commands: Dict[MapLayer, List[Tuple[pygame.Surface, Any, Any, int] | Callable]] = {}
+        self.__dirty = DirtyGrid(self.surface.get_size(), self.tile_size)
+
+        self.__buffers: Dict[MapLayer, MapSurfaceLayer] = {}
+        self.__layer_alpha: Dict[MapLayer, int] = {}
+
+    def __get_buffer(self, layer: MapLayer) -> MapSurfaceLayer:
+        buffer = self.__buffers.get(layer)
+        if buffer is None:
+            buffer = self.__buffers[layer] = MapSurfaceLayer(self.surface.get_size(), layer.value, self.tile_size)
+        return buffer
+
+    def __record(self, layer: MapLayer, command: Tuple[pygame.Surface, Any, Any, int] | Callable):
+        commands = self.__commands.get(layer)
+        if commands is None:
+            commands = self.__commands[layer] = []
+        commands.append(command)
+
+    def blit(self, layer: MapLayer, source: pygame.Surface, dest: Any, special_flags: int = 0):
+        self.__record(layer, (source, dest, None, special_flags))
+        self.mark_dirty(layer, self.__target_rect(source, dest))
+        return
+
+    def blits(self, layer: MapLayer, blit_sequence: Iterable[Tuple[pygame.Surface, Any]]):
+        for source, dest in blit_sequence:
+            self.__record(layer, (source, dest, None, 0))
+            self.mark_dirty(layer, self.__target_rect(source, dest))
+        return
+
+    @staticmethod
+    def __target_rect(source: pygame.Surface, dest: Any) -> pygame.Rect:
+        if isinstance(dest, pygame.Rect):
+            return pygame.Rect(dest.topleft, source.get_size())
+        # Ein zusätzlicher Pixel deckt die Rundung von Gleitkomma-Positionen ab
+        return pygame.Rect(math.floor(dest[0]), math.floor(dest[1]), source.get_width() + 1, source.get_height() + 1)
+
+    def draw(self, layer: MapLayer, render: Callable[[pygame.Surface], None],
+             dirty_rects: Iterable[pygame.Rect] | None = None):
+        self.__record(layer, render)
+        if dirty_rects is None:
+            self.mark_dirty(layer)
+        else:
+            for rect in dirty_rects:
+                self.mark_dirty(layer, rect)
+
+    def get_surface(self, layer: MapLayer, dirty_rect: pygame.Rect | None = None) -> pygame.Surface:
+        buffer = self.__get_buffer(layer)
+        if buffer.dirty.empty and layer not in self.__layer_alpha:
+            # Der Inhalt der Oberfläche wird an dieser Stelle der Befehle dieser Ebene übertragen
+            self.__record(layer, buffer.render)
+        self.mark_dirty(layer, dirty_rect)
+        buffer.dirty.mark(self.rect if dirty_rect is None else pygame.Rect(dirty_rect))
+        return buffer.surface
+
+    def mark_dirty(self, layer: MapLayer, rect: pygame.Rect | None = None):
+        rect = self.rect if rect is None else pygame.Rect(rect)
+        self.__dirty.mark(rect)
+        if layer in self.__layer_alpha:
+            self.__buffers[layer].dirty.mark(rect)
+
+    def set_layer_alpha(self, layer: MapLayer, alpha: int | None):
+        if alpha is None:
+            self.__layer_alpha.pop(layer, None)
+            return
+        self.__layer_alpha[layer] = alpha
+        self.__get_buffer(layer).surface.set_alpha(alpha)
+
+    def render(self, surface: pygame.Surface = None):
+        self._restore(self.__dirty.take())
+
+        for layer in self.__layer_order:
+            commands = self.__commands.get(layer, [])
+            if layer in self.__layer_alpha:
+                buffer = self.__buffers[layer]
+                self.__execute(commands, buffer.surface)
+                buffer.render(self.surface)
+            elif commands:
+                self.__execute(commands, self.surface)
+        self.__commands = {}
+
+        if surface:
+            surface.blit(self.surface, (0, 0))
+        return
+
+    @staticmethod
+    def __execute(commands: List[Tuple[pygame.Surface, Any, Any, int] | Callable], target: pygame.Surface):
+        # Aufeinanderfolgende Blits ohne Ausschnitt und Flags werden mit einem Aufruf von fblits ausgeführt
+        plain = []
+        for command in commands:
+            if isinstance(command, tuple) and command[2] is None and not command[3]:
+                plain.append((command[0], command[1]))
+                continue
+            if plain:
+                target.fblits(plain)
+                plain = []
+            if isinstance(command, tuple):
+                source, dest, area, special_flags = command
+                target.blit(source, dest, area, special_flags)
+            else:
+                command(target)
+        if plain:
+            target.fblits(plain)
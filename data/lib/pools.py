@@ -0,0 +1,106 @@
+from dataclasses import dataclass
+from typing import Dict, List, Any, Set
+
+
+@dataclass
+class PoolStats:
+    # Anzahl der Objekte, welche neu erzeugt werden mussten, weil kein freies Objekt vorhanden war
+    misses: int = 0
+    # Anzahl der Objekte, welche wiederverwendet wurden
+    reuses: int = 0
+    # Anzahl der Objekte, welche derzeit verwendet werden
+    in_use: int = 0
+    # Größte Anzahl gleichzeitig verwendeter Objekte
+    high_water_mark: int = 0
+    # Anzahl der freien Objekte im Pool
+    free: int = 0
+
+
+class ObjectPool:
+    object_type: type
+    max_size: int
+    stats: PoolStats
+
+    def __init__(self, object_type: type, max_size: int = 1024):
+        """
+        Verwaltet nicht mehr benötigte Objekte einer Klasse, damit diese wiederverwendet werden können,
+        statt neue Objekte zu erzeugen. Die Klasse muss eine Methode reset besitzen, welche dieselben Parameter wie
+        die Initialisierungsfunktion annimmt und das Objekt in den Zustand eines neu erzeugten Objekts versetzt
+        :param object_type: Klasse der verwalteten Objekte
+        :param max_size: Maximale Anzahl freier Objekte, weitere zurückgegebene Objekte werden verworfen
+        """
+        self.object_type = object_type
+        self.max_size = max_size
+        self.stats = PoolStats()
+
+        self.__free: List[Any] = []
+        self.__in_use: Set[Any] = set()
+
+    def acquire(self, *args, **kwargs) -> Any:
+        """
+        Gibt ein freies Objekt zurück, welches mit den gegebenen Parametern zurückgesetzt wurde.
+        Ist kein freies Objekt vorhanden, wird ein neues erzeugt
+        """
+        if self.__free:
+            obj = self.__free.pop()
+            obj.reset(*args, **kwargs)
+            self.stats.reuses += 1
+        else:
+            obj = self.object_type(*args, **kwargs)
+            self.stats.misses += 1
+
+        self.__in_use.add(obj)
+        self.stats.in_use = len(self.__in_use)
+        self.stats.high_water_mark = max(self.stats.high_water_mark, self.stats.in_use)
+        self.stats.free = len(self.__free)
+        return obj
+
+    def release(self, obj: Any):
+        """
+        Gibt ein Objekt an den Pool zurück. Objekte, die nicht aus diesem Pool stammen oder bereits zurückgegeben
+        wurden, werden ignoriert
+        """
+        if obj not in self.__in_use:
+            return
+        self.__in_use.remove(obj)
+        if len(self.__free) < self.max_size:
+            self.__free.append(obj)
+        self.stats.in_use = len(self.__in_use)
+        self.stats.free = len(self.__free)
+
+    def clear(self):
+        """
+        Verwirft alle freien Objekte
+        """
+        self.__free = []
+        self.stats.free = 0
+
+
+class PoolManager:
+    pools: Dict[type, ObjectPool] = {}
+
+    @staticmethod
+    def get_pool(object_type: type) -> ObjectPool:
+        if object_type not in PoolManager.pools:
+            PoolManager.pools[object_type] = ObjectPool(object_type)
+        return PoolManager.pools[object_type]
+
+    @staticmethod
+    def acquire(object_type: type, *args, **kwargs) -> Any:
+        """
+        Gibt ein (ggf. wiederverwendetes) Objekt der gegebenen Klasse zurück
+        """
+        return PoolManager.get_pool(object_type).acquire(*args, **kwargs)
+
+    @staticmethod
+    def release(obj: Any):
+        """
+        Gibt ein Objekt an den Pool seiner Klasse zurück. Objekte ohne Pool werden ignoriert
+        """
+        pool = PoolManager.pools.get(type(obj))
+        if pool is not None:
+            pool.release(obj)
+
+    @staticmethod
+    def get_stats() -> Dict[str, PoolStats]:
+        return {object_type.__name__: pool.stats for object_type, pool in PoolManager.pools.items()}
@@ -0,0 +1,405 @@
+import bisect
+import math
+from typing import Tuple, Dict, List, Any, Callable, FrozenSet
+
+import numpy as np
+
+
+class SpatialHashGrid:
+    cell_size: float
+
+    def __init__(self, cell_size: float):
+        """
+        Gleichmäßiges Raster, welches Objekte anhand ihrer Position in Zellen einsortiert.
+        Umkreisabfragen müssen so nur die Objekte der Zellen in der Nähe prüfen, statt alle Objekte
+        :param cell_size: Kantenlänge einer Zelle in Pixeln
+        """
+        self.cell_size = cell_size
+
+        # Zelle → {Objekt: Position}
+        self.__cells: Dict[Tuple[int, int], Dict[Any, Tuple[float, float]]] = {}
+        # Objekt → Zelle
+        self.__objects: Dict[Any, Tuple[int, int]] = {}
+
+    def __cell(self, position: Tuple[float, float]) -> Tuple[int, int]:
+        return math.floor(position[0] / self.cell_size), math.floor(position[1] / self.cell_size)
+
+    def __len__(self):
+        return len(self.__objects)
+
+    def __contains__(self, obj: Any):
+        return obj in self.__objects
+
+    def insert(self, obj: Any, position: Tuple[float, float]):
+        """
+        Fügt ein Objekt an der gegebenen Position in das Raster ein
+        """
+        cell = self.__cell(position)
+        self.__objects[obj] = cell
+        if cell not in self.__cells:
+            self.__cells[cell] = {}
+        self.__cells[cell][obj] = position
+
+    def move(self, obj: Any, position: Tuple[float, float]):
+        """
+        Aktualisiert die Position eines Objekts, welches sich bereits im Raster befindet
+        """
+        old_cell = self.__objects[obj]
+        cell = self.__cell(position)
+        if cell == old_cell:
+            self.__cells[cell][obj] = position
+            return
+
+        del self.__cells[old_cell][obj]
+        if not self.__cells[old_cell]:
+            del self.__cells[old_cell]
+
+        self.__objects[obj] = cell
+        if cell not in self.__cells:
+            self.__cells[cell] = {}
+        self.__cells[cell][obj] = position
+
+    def remove(self, obj: Any):
+        """
+        Entfernt ein Objekt aus dem Raster, sofern es sich darin befindet
+        """
+        cell = self.__objects.pop(obj, None)
+        if cell is None:
+            return
+        del self.__cells[cell][obj]
+        if not self.__cells[cell]:
+            del self.__cells[cell]
+
+    def clear(self):
+        self.__cells = {}
+        self.__objects = {}
+
+    def __cells_in_radius(self, position: Tuple[float, float],
+                          radius: float) -> List[Dict[Any, Tuple[float, float]]]:
+        x, y = position
+        squared_radius = radius ** 2
+
+        min_cell_x, min_cell_y = self.__cell((x - radius, y - radius))
+        max_cell_x, max_cell_y = self.__cell((x + radius, y + radius))
+
+        # Bei wenigen belegten Zellen ist es günstiger, diese direkt zu prüfen, statt alle Zellen im Kreis abzufragen
+        if len(self.__cells) < (max_cell_x - min_cell_x + 1) * (max_cell_y - min_cell_y + 1):
+            candidates = [(cell_x, cell_y, cell) for (cell_x, cell_y), cell in self.__cells.items()
+                          if min_cell_x <= cell_x <= max_cell_x and min_cell_y <= cell_y <= max_cell_y]
+        else:
+            candidates = []
+            for cell_x in range(min_cell_x, max_cell_x + 1):
+                for cell_y in range(min_cell_y, max_cell_y + 1):
+                    cell = self.__cells.get((cell_x, cell_y))
+                    if cell is not None:
+                        candidates.append((cell_x, cell_y, cell))
+
+        result = []
+        for cell_x, cell_y, cell in candidates:
+            # Abstand vom Mittelpunkt zum nächstgelegenen Punkt der Zelle
+            dx = max(cell_x * self.cell_size - x, 0, x - (cell_x + 1) * self.cell_size)
+            dy = max(cell_y * self.cell_size - y, 0, y - (cell_y + 1) * self.cell_size)
+            if dx ** 2 + dy ** 2 <= squared_radius:
+                result.append(cell)
+        return result
+
+    def cells_in_radius(self, position: Tuple[float, float], radius: float) -> FrozenSet[Tuple[int, int]]:
+        """
+        Gibt die Koordinaten aller Zellen zurück, die den gegebenen Kreis berühren, unabhängig davon, ob sie belegt
+        sind. Für feste Suchkreise (z.B. die Reichweite eines Turmes) kann das Ergebnis gespeichert und an
+        query_cells übergeben werden
+        """
+        x, y = position
+        squared_radius = radius ** 2
+
+        min_cell_x, min_cell_y = self.__cell((x - radius, y - radius))
+        max_cell_x, max_cell_y = self.__cell((x + radius, y + radius))
+
+        cells = set()
+        for cell_x in range(min_cell_x, max_cell_x + 1):
+            for cell_y in range(min_cell_y, max_cell_y + 1):
+                dx = max(cell_x * self.cell_size - x, 0, x - (cell_x + 1) * self.cell_size)
+                dy = max(cell_y * self.cell_size - y, 0, y - (cell_y + 1) * self.cell_size)
+                if dx ** 2 + dy ** 2 <= squared_radius:
+                    cells.add((cell_x, cell_y))
+        return frozenset(cells)
+
+    def query_cells(self, cells: FrozenSet[Tuple[int, int]]) -> List[Any]:
+        """
+        Wie query_candidates, aber für die zuvor mit cells_in_radius ermittelten Zellen eines Suchkreises
+        """
+        result = []
+        # Bei wenigen belegten Zellen ist es günstiger, diese direkt zu prüfen, statt alle Zellen im Kreis abzufragen
+        if len(self.__cells) < len(cells):
+            for key, cell in self.__cells.items():
+                if key in cells:
+                    result.extend(cell)
+        else:
+            for key in cells:
+                cell = self.__cells.get(key)
+                if cell is not None:
+                    result.extend(cell)
+        return result
+
+    def query_radius(self, position: Tuple[float, float], radius: float) -> List[Any]:
+        """
+        Gibt alle Objekte zurück, deren Position höchstens radius vom gegebenen Punkt entfernt ist
+        :param position: Mittelpunkt des Suchkreises
+        :param radius: Radius des Suchkreises in Pixeln
+        :return: Liste aller Objekte innerhalb des Kreises
+        """
+        x, y = position
+        squared_radius = radius ** 2
+
+        result = []
+        for cell in self.__cells_in_radius(position, radius):
+            for obj, obj_position in cell.items():
+                if (obj_position[0] - x) ** 2 + (obj_position[1] - y) ** 2 <= squared_radius:
+                    result.append(obj)
+        return result
+
+    def query_candidates(self, position: Tuple[float, float], radius: float) -> List[Any]:
+        """
+        Gibt alle Objekte der Zellen zurück, die den gegebenen Kreis berühren, ohne deren Position exakt zu prüfen.
+        Für Objekte, deren genaue Position außerhalb des Rasters verwaltet wird und die nur beim Wechsel
+        der Zelle verschoben werden
+        """
+        result = []
+        for cell in self.__cells_in_radius(position, radius):
+            result.extend(cell)
+        return result
+
+
+class PathTable:
+    points: np.ndarray
+    lengths: np.ndarray
+    segment_lengths: np.ndarray
+    directions: np.ndarray
+    total_length: float
+
+    def __init__(self, path: List[Tuple[float, float]]):
+        """
+        Vorberechnete Tabellen eines Pfades, mit welchen die Position auf dem Pfad direkt aus dem
+        zurückgelegten Weg bestimmt werden kann
+        :param path: Liste der Pfadpunkte
+        """
+        self.points = np.asarray(path, dtype=np.float64).reshape(-1, 2)
+
+        segments = np.diff(self.points, axis=0)
+        segment_lengths = np.hypot(segments[:, 0], segments[:, 1])
+
+        # lengths[p] ist der zurückgelegte Weg am Pfadpunkt p
+        self.lengths = np.concatenate(([0.], np.cumsum(segment_lengths)))
+        self.segment_lengths = segment_lengths
+        # Einheitsvektoren der Abschnitte, Abschnitte der Länge 0 haben den Nullvektor
+        self.directions = np.divide(segments, segment_lengths[:, None],
+                                    out=np.zeros_like(segments), where=segment_lengths[:, None] > 0)
+        self.total_length = float(self.lengths[-1])
+
+    def __len__(self):
+        return len(self.points)
+
+    def locate(self, progress: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Bestimmt für beliebig viele zurückgelegte Wege gleichzeitig die Position auf dem Pfad
+        :param progress: Zurückgelegte Wege in Pixeln
+        :return: x- und y-Koordinaten sowie der Index des jeweils nächsten Pfadpunktes
+        """
+        if len(self.points) < 2:
+            count = len(progress)
+            return (np.full(count, self.points[0, 0]), np.full(count, self.points[0, 1]),
+                    np.ones(count, dtype=np.int32))
+
+        # Da progress nicht negativ ist, muss nur der Index hinter dem letzten Pfadpunkt begrenzt werden
+        segment = self.lengths.searchsorted(progress, side="right") - 1
+        np.minimum(segment, len(self.segment_lengths) - 1, out=segment)
+
+        offset = np.minimum(progress - self.lengths[segment], self.segment_lengths[segment])
+        x = self.points[segment, 0] + self.directions[segment, 0] * offset
+        y = self.points[segment, 1] + self.directions[segment, 1] * offset
+        return x, y, segment + 1
+
+
+class PathProgressIndex:
+    offset: Tuple[float, float]
+    tolerance: float
+    # Höchstzahl zwischengespeicherter Suchkreise, darüber hinaus wird der älteste verworfen
+    coverage_cache_size: int = 256
+
+    def __init__(self, offset: Tuple[float, float] = (0, 0), tolerance: float = 1.5):
+        """
+        Sortiert Objekte, die einem Pfad folgen, einmal pro Tick nach ihrem auf dem Pfad zurückgelegten Weg.
+        Die Objekte müssen das Attribut progress (zurückgelegter Weg) besitzen.
+        Für jeden Suchkreis wird einmalig berechnet, welche Abschnitte des Pfades innerhalb des Kreises liegen,
+        sodass das vorderste bzw. hinterste Objekt im Kreis per binärer Suche gefunden werden kann
+        :param offset: Versatz zwischen dem Pfadpunkt eines Objekts und dem Punkt, der im Suchkreis liegen muss
+        :param tolerance: Vergrößerung des Suchkreises in Pixeln, um Rundungen der Objektpositionen auszugleichen
+        """
+        self.offset = offset
+        self.tolerance = tolerance
+
+        self.__paths: List[PathTable] = []
+        self.__coverage: Dict[Tuple[int, int, int, float], List[Tuple[float, float]]] = {}
+
+        # Pfad → (aufsteigend sortierter zurückgelegter Weg, Objekte in derselben Reihenfolge)
+        self.__orders: Dict[int, Tuple[List[float], List[Any]]] = {}
+
+    def rebuild(self, paths: List[PathTable], path_index: np.ndarray, progress: np.ndarray, objects: np.ndarray):
+        """
+        Sortiert alle gegebenen Objekte neu. Sollte einmal pro Tick aufgerufen werden, nachdem sich alle Objekte
+        bewegt haben
+        :param paths: Alle Pfade, auf welche path_index verweist
+        :param path_index: Index des Pfades jedes Objekts
+        :param progress: Zurückgelegter Weg jedes Objekts
+        :param objects: Array (dtype=object) der Objekte in derselben Reihenfolge
+        """
+        self.__paths = paths
+
+        self.__orders = {}
+        if not len(objects):
+            return
+
+        if len(paths) == 1:
+            groups = {0: progress.argsort(kind="stable")}
+        else:
+            groups = {}
+            for path_id in np.unique(path_index).tolist():
+                members = np.flatnonzero(path_index == path_id)
+                groups[path_id] = members[np.argsort(progress[members], kind="stable")]
+
+        for path_id, order in groups.items():
+            self.__orders[path_id] = (progress[order].tolist(), objects[order].tolist())
+
+    def coverage(self, path_id: int, position: Tuple[float, float], radius: float) -> List[Tuple[float, float]]:
+        """
+        Berechnet (mit Zwischenspeicher) alle Abschnitte des Pfades, welche innerhalb des gegebenen Kreises liegen.
+        Der Mittelpunkt wird auf ganze Pixel gerundet, die Abweichung gleicht tolerance aus
+        :return: Aufsteigend sortierte, disjunkte Intervalle des zurückgelegten Weges
+        """
+        key = (path_id, round(position[0]), round(position[1]), radius)
+        if key in self.__coverage:
+            return self.__coverage[key]
+
+        path = self.__paths[path_id].points.tolist()
+        lengths = self.__paths[path_id].lengths.tolist()
+        center_x = key[1] - self.offset[0]
+        center_y = key[2] - self.offset[1]
+        squared_radius = (radius + self.tolerance) ** 2
+
+        intervals = []
+        for p in range(len(path) - 1):
+            segment_length = lengths[p + 1] - lengths[p]
+            if not segment_length:
+                continue
+            # Schnitt der Strecke path[p] + t * direction (0 <= t <= segment_length) mit dem Kreis
+            direction = ((path[p + 1][0] - path[p][0]) / segment_length,
+                         (path[p + 1][1] - path[p][1]) / segment_length)
+            relative = (path[p][0] - center_x, path[p][1] - center_y)
+            b = direction[0] * relative[0] + direction[1] * relative[1]
+            discriminant = b ** 2 - (relative[0] ** 2 + relative[1] ** 2 - squared_radius)
+            if discriminant < 0:
+                continue
+            t0 = max(0., -b - discriminant ** 0.5)
+            t1 = min(segment_length, -b + discriminant ** 0.5)
+            if t0 > t1:
+                continue
+            start, end = lengths[p] + t0, lengths[p] + t1
+            if intervals and start <= intervals[-1][1]:
+                intervals[-1] = (intervals[-1][0], max(end, intervals[-1][1]))
+            else:
+                intervals.append((start, end))
+
+        if len(self.__coverage) >= self.coverage_cache_size:
+            del self.__coverage[next(iter(self.__coverage))]
+        self.__coverage[key] = intervals
+        return intervals
+
+    def first(self, position: Tuple[float, float], radius: float,
+              accept: Callable[[Any], bool] | None = None) -> Any | None:
+        """
+        Gibt das Objekt mit dem weitesten zurückgelegten Weg innerhalb des gegebenen Kreises zurück
+        :param accept: Optionale Prüfung, welche ein gefundenes Objekt bestehen muss (z.B. exakte Reichweite)
+        """
+        result = None
+        for path_id, (progresses, objects) in self.__orders.items():
+            if result is not None and progresses[-1] <= result.progress:
+                continue
+            for start, end in reversed(self.coverage(path_id, position, radius)):
+                found = None
+                i = bisect.bisect_right(progresses, end) - 1
+                while i >= 0 and progresses[i] >= start:
+                    if accept is None or accept(objects[i]):
+                        found = objects[i]
+                        break
+                    i -= 1
+                if found is not None:
+                    if result is None or found.progress > result.progress:
+                        result = found
+                    break
+        return result
+
+    def last(self, position: Tuple[float, float], radius: float,
+             accept: Callable[[Any], bool] | None = None) -> Any | None:
+        """
+        Gibt das Objekt mit dem kürzesten zurückgelegten Weg innerhalb des gegebenen Kreises zurück
+        :param accept: Optionale Prüfung, welche ein gefundenes Objekt bestehen muss (z.B. exakte Reichweite)
+        """
+        result = None
+        for path_id, (progresses, objects) in self.__orders.items():
+            if result is not None and progresses[0] >= result.progress:
+                continue
+            for start, end in self.coverage(path_id, position, radius):
+                found = None
+                i = bisect.bisect_left(progresses, start)
+                while i < len(progresses) and progresses[i] <= end:
+                    if accept is None or accept(objects[i]):
+                        found = objects[i]
+                        break
+                    i += 1
+                if found is not None:
+                    if result is None or found.progress < result.progress:
+                        result = found
+                    break
+        return result
+
+
+def segment_rect_mask(start: Tuple[float, float], end: Tuple[float, float],
+                      left: np.ndarray, top: np.ndarray, right: np.ndarray, bottom: np.ndarray) -> np.ndarray:
+    """
+    Prüft für beliebig viele achsenparallele Rechtecke gleichzeitig, ob sie von der Strecke start → end
+    geschnitten werden (bzw. diese enthalten). Rechtecke außerhalb der Bounding-Box der Strecke werden vorab
+    aussortiert, nur die übrigen werden exakt geprüft (Slab-Verfahren nach Liang-Barsky)
+    :param start: Startpunkt der Strecke
+    :param end: Endpunkt der Strecke
+    :param left: Linke Kanten der Rechtecke
+    :param top: Obere Kanten der Rechtecke
+    :param right: Rechte Kanten der Rechtecke
+    :param bottom: Untere Kanten der Rechtecke
+    :return: Boolesches Array, True für jedes getroffene Rechteck
+    """
+    x0, y0 = start
+    dx, dy = end[0] - x0, end[1] - y0
+
+    hits = ((right >= min(x0, end[0])) & (left <= max(x0, end[0]))
+            & (bottom >= min(y0, end[1])) & (top <= max(y0, end[1])))
+    candidates = hits.nonzero()[0]
+    if not len(candidates):
+        return hits
+
+    t_min = np.zeros(len(candidates))
+    t_max = np.ones(len(candidates))
+    inside = np.ones(len(candidates), dtype=bool)
+    for origin, delta, low, high in ((x0, dx, left, right), (y0, dy, top, bottom)):
+        low = low[candidates]
+        high = high[candidates]
+        if delta:
+            t_low = (low - origin) / delta
+            t_high = (high - origin) / delta
+            np.maximum(t_min, np.minimum(t_low, t_high), out=t_min)
+            np.minimum(t_max, np.maximum(t_low, t_high), out=t_max)
+        else:
+            # Parallel zu dieser Achse: Die Strecke muss zwischen den beiden Kanten liegen
+            inside &= (low <= origin) & (origin <= high)
+
+    hits[candidates] = inside & (t_min <= t_max)
+    return hits
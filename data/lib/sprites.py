@@ -1,6 +1,6 @@
 import math
 from dataclasses import dataclass, field
-from typing import Tuple, List
+from typing import Tuple, List, Dict
 
 import pygame
 
@@ -17,6 +17,30 @@ class SpriteData:
         return len(self.images)
 
 
+def convert_alpha(surface: pygame.Surface) -> pygame.Surface:
+    """
+    Wandelt die Oberfläche in das Pixelformat des Bildschirms um, sofern bereits ein Bildschirm existiert.
+    Ohne Bildschirm (z.B. in der Headless-Simulation) wird die Oberfläche unverändert zurückgegeben
+    :param surface: Oberfläche, welche umgewandelt werden soll
+    :return: Umgewandelte Oberfläche
+    """
+    if pygame.display.get_init() and pygame.display.get_surface() is not None:
+        return surface.convert_alpha()
+    return surface
+
+
+def convert(surface: pygame.Surface) -> pygame.Surface:
+    """
+    Wandelt die Oberfläche in das Pixelformat des Bildschirms ohne Transparenz um (siehe convert_alpha).
+    Für undurchsichtige Oberflächen, welche mit einfachem Kopieren statt Überblenden übertragen werden können
+    :param surface: Oberfläche, welche umgewandelt werden soll
+    :return: Umgewandelte Oberfläche
+    """
+    if pygame.display.get_init() and pygame.display.get_surface() is not None:
+        return surface.convert()
+    return surface
+
+
 # Folgende Klasse wurde von https://www.pygame.org/wiki/Spritesheet übernommen und leicht bearbeitet
 # This class handles sprite sheets
 # This was taken from www.scriptefun.com/transcript-2-using
@@ -35,7 +59,7 @@ class Spritesheet(object):
             self.sheet = path_or_image
         else:
             try:
-                self.sheet = pygame.image.load(path_or_image).convert_alpha()
+                self.sheet = convert_alpha(pygame.image.load(path_or_image))
             except pygame.error as message:
                 print("Unable to load spritesheet image: ", path_or_image)
                 raise SystemExit(message)
@@ -66,6 +90,24 @@ class Spritesheet(object):
         """
         return [self.image_at(rect, colorkey) for rect in rects]
 
+    def view_strip(self, rect: Tuple[int, int, int, int], image_count: int) -> List[pygame.Surface]:
+        """
+        Wie load_strip, die Bilder sind jedoch Ausschnitte (subsurface) der Spritesheet und keine Kopien.
+        Bilder, die über den Rand der Spritesheet hinausragen, werden kopiert
+        :param rect: Rechteck des ersten Bildes
+        :param image_count: Anzahl der Bilder
+        :return: Liste der Bilder
+        """
+        sheet_rect = self.sheet.get_rect()
+        images = []
+        for x in range(image_count):
+            image_rect = pygame.Rect(rect[0] + rect[2] * x, rect[1], rect[2], rect[3])
+            if sheet_rect.contains(image_rect):
+                images.append(self.sheet.subsurface(image_rect))
+            else:
+                images.append(self.image_at(image_rect))
+        return images
+
     def load_strip(self, rect: Tuple[int, int, int, int], image_count: int, colorkey=None) -> List[pygame.Surface]:
         """
         Loads a strip of images
@@ -93,3 +135,79 @@ def load_sprite(path: str, size: Tuple[int, int]) -> List[List[pygame.Surface]]:
     for i in range(math.floor(spritesheet.sheet.get_height() / size[1])):
         sprite.append(spritesheet.load_strip((0, i * size[1], size[0], size[1]), sheet_width))
     return sprite
+
+
+@dataclass(frozen=True)
+class Animation:
+    frames: Tuple[pygame.Surface, ...]
+
+    def __len__(self):
+        return len(self.frames)
+
+    def frame_at(self, relative_time: float) -> pygame.Surface:
+        """
+        Gibt das Bild zum gegebenen Zeitpunkt der Animation zurück, alle Bilder werden gleich lange angezeigt
+        :param relative_time: Verstrichene Zeit im Verhältnis zur Dauer der Animation (0 bis 1)
+        """
+        index = int(relative_time * len(self.frames))
+        return self.frames[min(max(index, 0), len(self.frames) - 1)]
+
+
+class AnimationManager:
+    cache: Dict[Tuple[str, Tuple[int, int, int, int], int], Animation] = {}
+    sheets: Dict[str, Spritesheet] = {}
+
+    @staticmethod
+    def get_animation(path: str, rect: Tuple[int, int, int, int], frame_count: int) -> Animation:
+        """
+        Gibt die Animation aus einer Bildreihe der Spritesheet zurück. Jede Spritesheet wird nur einmal geladen und
+        jede Bildreihe nur einmal zerlegt, alle Effekte teilen sich dieselben Bilder
+        :param path: Pfad zur Spritesheet
+        :param rect: Rechteck des ersten Bildes
+        :param frame_count: Anzahl der Bilder
+        """
+        key = (path, tuple(rect), frame_count)
+        if key not in AnimationManager.cache:
+            if path not in AnimationManager.sheets:
+                AnimationManager.sheets[path] = Spritesheet(path)
+            frames = AnimationManager.sheets[path].view_strip(rect, frame_count)
+            AnimationManager.cache[key] = Animation(tuple(frames))
+        return AnimationManager.cache[key]
+
+
+class RotationCache:
+    # (Bild, Größe) → gedrehte Varianten des Bildes, eine je Winkelschritt
+    cache: Dict[Tuple[pygame.Surface, Tuple[int, int] | None], List[pygame.Surface | None]] = {}
+
+    # Auflösung der gespeicherten Drehungen in Grad, 2° ergeben 180 Varianten je Bild
+    angle_step: float = 2
+
+    misses: int = 0
+
+    @staticmethod
+    def get_rotated(image: pygame.Surface, angle: float, size: Tuple[int, int] | None = None) -> pygame.Surface:
+        """
+        Gibt das (ggf. zuvor auf size skalierte) Bild um den auf angle_step gerundeten Winkel gedreht zurück.
+        Jede Variante wird erst bei ihrer ersten Verwendung berechnet und von allen Objekten geteilt, welche dasselbe
+        Bild verwenden. Die zurückgegebenen Oberflächen dürfen daher nicht verändert werden
+        :param image: Ursprüngliches Bild, wird als Schlüssel verwendet und darf nicht mehr verändert werden
+        :param angle: Winkel in Grad gegen den Uhrzeigersinn (wie bei pygame.transform.rotate)
+        :param size: Größe, auf welche das Bild vor dem Drehen skaliert wird
+        """
+        key = (image, size)
+        step_count = max(1, round(360 / RotationCache.angle_step))
+        variants = RotationCache.cache.get(key)
+        if variants is None or len(variants) != step_count:
+            variants = RotationCache.cache[key] = [None] * step_count
+
+        index = round(angle / RotationCache.angle_step) % step_count
+        rotated = variants[index]
+        if rotated is None:
+            RotationCache.misses += 1
+            source = image if size is None else pygame.transform.scale(image, size)
+            rotated = variants[index] = pygame.transform.rotate(source, index * 360 / step_count)
+        return rotated
+
+    @staticmethod
+    def clear():
+        RotationCache.cache.clear()
@@ -2,13 +2,19 @@ import abc
 import dataclasses
 import math
 import random
+import weakref
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Tuple, Dict, List
+from enum import Enum
+from typing import Tuple, Dict, List, Callable, Set
 
+import numpy as np
 import pygame
 
-from data.constants import Color, ResEffect
+from data.constants import Color, ResEffect, MapLayer
 from data.lib import sprites
+from data.lib.map_objects import MapSurface
+from data.lib.pools import PoolManager
 from data.lib.vfx_utils import draw_gradient_lines, get_outline
 
 
@@ -29,6 +35,10 @@ class TextureRenderData:
 
 
 class Texture:
+    # Wenn True, hängt das Aussehen zusätzlich von der Richtung ab. Solche Texturen werden nicht im TextureCache
+    # gespeichert
+    directional: bool = False
+
     def __init__(self):
         pass
 
@@ -61,6 +71,8 @@ class RectTexture(Texture):
 
 
 class LineTexture(Texture):
+    directional = True
+
     def __init__(self):
         super().__init__()
 
@@ -142,6 +154,117 @@ class StarTexture(Texture):
                              for i in self.star_points])
 
 
+class TextureCache:
+    # Schlüssel → (Sprite oder None, wenn nichts gezeichnet wird, Versatz des Sprites zur Partikelposition)
+    cache: OrderedDict[tuple, Tuple[pygame.Surface | None, Tuple[int, int]]] = OrderedDict()
+    max_entries: int = 2048
+
+    # Größere Partikel werden direkt gezeichnet, da das Blitten großer Sprites langsamer ist als das Zeichnen
+    max_extent: int = 48
+
+    # Schrittweiten, auf welche Größe (in Pixeln) und Farbe der Partikel für den Schlüssel gerundet werden
+    size_step: float = 0.5
+    color_step: int = 8
+
+    misses: int = 0
+
+    @staticmethod
+    def get_sprite(key: tuple, texture: Texture, data: TextureRenderData) -> Tuple[pygame.Surface | None,
+                                                                                   Tuple[int, int]]:
+        """
+        Gibt das vorab gezeichnete Sprite einer Textur zurück. Beim ersten Zugriff auf einen Schlüssel wird die
+        Textur einmalig mit den gegebenen (bereits gerundeten) Werten gezeichnet. Werden mehr als max_entries
+        Sprites gespeichert, wird das am längsten nicht verwendete verworfen
+        :param key: Gerundete Werte, welche das Aussehen des Partikels bestimmen
+        :param data: Darstellungsdaten; Position und Oberfläche werden ignoriert
+        :return: Sprite und Versatz zur Position des Partikels
+        """
+        entry = TextureCache.cache.get(key)
+        if entry is not None:
+            TextureCache.cache.move_to_end(key)
+            return entry
+
+        TextureCache.misses += 1
+        entry = TextureCache.__rasterize(texture, data)
+        TextureCache.cache[key] = entry
+        if len(TextureCache.cache) > TextureCache.max_entries:
+            TextureCache.cache.popitem(last=False)
+        return entry
+
+    @staticmethod
+    def __rasterize(texture: Texture, data: TextureRenderData) -> Tuple[pygame.Surface | None, Tuple[int, int]]:
+        extent = TextureCache.extent(data.size, data.outline_width if data.outline else 0)
+        surface = pygame.Surface((2 * extent + 1, 2 * extent + 1))
+        colorkey = next(color for color in ((255, 0, 255), (0, 255, 255), (1, 2, 3))
+                        if color not in (tuple(data.color[:3]), tuple(data.outline_color[:3])))
+        surface.fill(colorkey)
+        surface.set_colorkey(colorkey)
+
+        texture.render(TextureRenderData(surface=surface, position=(extent, extent), direction=data.direction,
+                                         color=data.color, size=data.size, outline=data.outline,
+                                         outline_color=data.outline_color, outline_width=data.outline_width))
+
+        bounding_rect = surface.get_bounding_rect()
+        if not bounding_rect.width or not bounding_rect.height:
+            return None, (0, 0)
+        sprite = surface.subsurface(bounding_rect).copy()
+        sprite.set_colorkey(colorkey, pygame.RLEACCEL)
+        return sprite, (bounding_rect.x - extent, bounding_rect.y - extent)
+
+    @staticmethod
+    def extent(size: float, outline_width: float) -> int:
+        """
+        Größter Abstand (in Pixeln) eines gezeichneten Pixels zur Partikelposition
+        """
+        return math.ceil(size + 2 * outline_width) + 2
+
+    @staticmethod
+    def clear():
+        TextureCache.cache.clear()
+
+
+class TextCache:
+    # (Schriftart, Text, gerundete Farbe, Umriss) → fertig gezeichneter Text
+    cache: OrderedDict[tuple, pygame.Surface] = OrderedDict()
+    max_entries: int = 1024
+
+    # Schrittweite, auf welche die Farbkanäle für den Schlüssel gerundet werden
+    color_step: int = 16
+
+    misses: int = 0
+
+    @staticmethod
+    def get_text(font: pygame.font.Font, text: str, color: Tuple[float, float, float],
+                 outline: bool) -> pygame.Surface:
+        """
+        Gibt den (ggf. umrandeten) Text in der auf color_step gerundeten Farbe zurück. Jede Kombination wird nur
+        einmal gezeichnet, werden mehr als max_entries Texte gespeichert, wird der am längsten nicht verwendete
+        verworfen. Die zurückgegebenen Oberflächen werden geteilt und dürfen nicht verändert werden
+        (ausgenommen set_alpha unmittelbar vor dem Blitten)
+        """
+        step = TextCache.color_step
+        color = tuple(min(255, max(0, int(round(channel / step) * step))) for channel in color[:3])
+        key = (font, text, color, outline)
+
+        surface = TextCache.cache.get(key)
+        if surface is not None:
+            TextCache.cache.move_to_end(key)
+            return surface
+
+        TextCache.misses += 1
+        surface = font.render(text, False, color)
+        if outline:
+            surface = get_outline(surface, resize=True)
+        TextCache.cache[key] = surface
+        if len(TextCache.cache) > TextCache.max_entries:
+            TextCache.cache.popitem(last=False)
+        return surface
+
+    @staticmethod
+    def clear():
+        TextCache.cache.clear()
+
+
 @dataclass
 class ParticleData:
     position: Tuple[float, float] = (0, 0)
@@ -182,93 +305,312 @@ class ParticleEmitterData:
     area_emission_direction: int = 0  # 0: in eine zufällige Richtung, 1: in Richtung des Mittelpunktes
 
 
-class Particle:
-    def __init__(self, data: ParticleData):
+class ParticleEmitter:
+    # Zufallsgenerator aller Emitter
+    rng: np.random.Generator = np.random.default_rng()
+
+    def __init__(self, data: ParticleEmitterData):
+        """
+        Erzeugt und simuliert Partikel gemäß der gegebenen Konfiguration. Position, Richtung, Alter, Lebensdauer,
+        Größe und Farbe aller Partikel liegen in vorab angelegten NumPy-Arrays, welche bei Bedarf (bis max_particles)
+        verdoppelt werden. Bewegung, Farb- und Größenverlauf sowie das Entfernen abgelaufener Partikel sind jeweils
+        ein vektorisierter Schritt über alle Partikel.
+        Start- und Endwerte von Farbe, Größe und Geschwindigkeit werden bei jedem Update aus data.particle_data
+        gelesen, Position, Richtung und Lebensdauer beim Erzeugen eines Partikels
+        """
         self.data = data
 
-        self.alive = True
+        # Faktor auf particles_per_second, wird vom VFXManager je nach Qualitätsstufe und Partikelbudget gesetzt
+        self.spawn_factor = 1.
 
-        self.__ctime = 0
+        self.__time_buffer = self.__spawn_interval()
 
-    def update(self, timedelta: float):
-        self.__ctime += timedelta
-        relative_time = self.__ctime / self.data.lifetime
+        self.__count = 0
+        self.__allocate(min(max(self.data.max_particles, 1), 64))
 
-        self.data.color = tuple(
-            self.data.initial_color[i] + relative_time * (self.data.final_color[i] - self.data.initial_color[i])
-            for i in range(3))
+    def __spawn_interval(self) -> float:
+        return 1 / self.data.particles_per_second if self.data.particles_per_second else 0
 
-        self.data.speed = timedelta * (self.data.initial_speed + relative_time *
-                                       (self.data.final_speed - self.data.initial_speed))
+    def __allocate(self, capacity: int):
+        self.__positions = np.zeros((capacity, 2), dtype=np.float64)
+        self.__directions = np.zeros((capacity, 2), dtype=np.float64)
+        self.__ages = np.zeros(capacity, dtype=np.float64)
+        self.__lifetimes = np.ones(capacity, dtype=np.float64)
+        self.__sizes = np.zeros(capacity, dtype=np.float64)
+        self.__colors = np.zeros((capacity, 3), dtype=np.int32)
 
-        self.data.direction = (self.data.direction[0],
-                               self.data.direction[1] + timedelta * (self.data.gravity_multiplier * 0.5))
+    def __grow(self, required: int):
+        capacity = len(self.__ages)
+        if required <= capacity:
+            return
+        while capacity < required:
+            capacity *= 2
+        count = self.__count
+        arrays = (self.__positions, self.__directions, self.__ages, self.__lifetimes, self.__sizes, self.__colors)
+        self.__allocate(capacity)
+        for old, new in zip(arrays, (self.__positions, self.__directions, self.__ages, self.__lifetimes,
+                                     self.__sizes, self.__colors)):
+            new[:count] = old[:count]
+
+    def reset(self):
+        """
+        Entfernt alle Partikel und setzt den Zeitpuffer zurück
+        """
+        self.__time_buffer = self.__spawn_interval()
+        self.__count = 0
+
+    def __spawn(self, timedelta: float):
+        self.__time_buffer += timedelta * self.spawn_factor
+        requested = int(self.__time_buffer * self.data.particles_per_second)
+        if requested <= 0:
+            return
+        self.__time_buffer -= requested / self.data.particles_per_second
+
+        self.__place(min(requested, self.data.max_particles - self.__count))
+
+    def __place(self, amount: int) -> slice:
+        """
+        Legt amount neue Partikel mit dem Alter 0 hinter den vorhandenen an
+        :return: Bereich der neuen Partikel in den Arrays
+        """
+        if amount <= 0:
+            return slice(self.__count, self.__count)
+        self.__grow(self.__count + amount)
+        new = slice(self.__count, self.__count + amount)
+        rng = ParticleEmitter.rng
+
+        if all(isinstance(i, tuple) for i in self.data.position):
+            (left, top), (right, bottom) = self.data.position
+            x = rng.integers(int(left), int(right) + 1, amount)
+            y = rng.integers(int(top), int(bottom) + 1, amount)
+            self.__positions[new, 0] = x
+            self.__positions[new, 1] = y
+            if self.data.area_emission_direction == 1:
+                direction = np.arctan2(left + right / 2 - x, top + bottom / 2 - y)
+                self.__directions[new, 0] = np.sin(direction)
+                self.__directions[new, 1] = np.cos(direction)
+            else:
+                self.__directions[new] = rng.random((amount, 2)) * 2 - 1
+        else:
+            self.__positions[new] = self.data.position
+            start, end = self.data.direction_of_emission
+            direction = np.radians(start + rng.random(amount) * (end - start))
+            self.__directions[new, 0] = np.sin(direction)
+            self.__directions[new, 1] = np.cos(direction)
 
-        self.data.position = (self.data.position[0] + self.data.speed * self.data.direction[0],
-                              self.data.position[1] + self.data.speed * self.data.direction[1])
+        self.__ages[new] = 0
+        self.__lifetimes[new] = self.data.particle_data.lifetime
+        self.__count += amount
+        return new
 
-        self.data.size = self.data.initial_size - relative_time * (self.data.initial_size - self.data.final_size)
+    def update(self, timedelta: float):
+        self.__spawn(timedelta)
 
-        if self.__ctime > self.data.lifetime:
-            self.alive = False
+        count = self.__count
+        if not count:
+            return
+        particle_data = self.data.particle_data
+
+        ages = self.__ages[:count]
+        ages += timedelta
+        relative_time = ages / self.__lifetimes[:count]
+
+        speeds = timedelta * (particle_data.initial_speed + relative_time *
+                              (particle_data.final_speed - particle_data.initial_speed))
+        directions = self.__directions[:count]
+        directions[:, 1] += timedelta * (particle_data.gravity_multiplier * 0.5)
+        self.__positions[:count] += speeds[:, np.newaxis] * directions
+
+        self.__refresh()
+        self.__remove_expired()
+
+    @property
+    def can_fast_forward(self) -> bool:
+        """
+        Partikel ohne Schwerkraft bewegen sich geradlinig, ihr Zustand lässt sich daher für beliebige Zeitspannen
+        direkt berechnen
+        """
+        return self.data.particle_data.gravity_multiplier == 0
+
+    def fast_forward(self, timedelta: float) -> bool:
+        """
+        Versetzt den Emitter in den Zustand, den er nach timedelta Sekunden regelmäßiger Updates hätte: Vorhandene
+        Partikel werden entlang ihrer Richtung verschoben, in der Zwischenzeit erzeugte Partikel mit ihrem passenden
+        Alter angelegt. Anders als ein einzelnes Update mit großem timedelta entsteht dabei kein Schwall gleich alter
+        Partikel
+        :return: False, wenn der Emitter nicht vorgespult werden kann (siehe can_fast_forward)
+        """
+        if not self.can_fast_forward:
+            return False
+        if timedelta <= 0:
+            return True
+
+        count = self.__count
+        if count:
+            start_ages = self.__ages[:count].copy()
+            self.__ages[:count] += timedelta
+            self.__move(slice(0, count), start_ages, self.__ages[:count])
+            self.__remove_expired()
+
+        particles_per_second = self.data.particles_per_second
+        if particles_per_second and self.spawn_factor > 0:
+            self.__time_buffer += timedelta * self.spawn_factor
+            requested = int(self.__time_buffer * particles_per_second)
+            if requested > 0:
+                self.__time_buffer -= requested / particles_per_second
+                # Alter der in der Zwischenzeit erzeugten Partikel, vom ältesten zum jüngsten. Bereits wieder
+                #  abgelaufene Partikel entfallen, bei zu vielen Partikeln bleiben die jüngsten erhalten
+                ages = ((self.__time_buffer + np.arange(requested - 1, -1, -1) / particles_per_second)
+                        / self.spawn_factor)
+                ages = ages[ages <= self.data.particle_data.lifetime]
+                ages = ages[max(0, len(ages) - (self.data.max_particles - self.__count)):]
+                new = self.__place(len(ages))
+                self.__ages[new] = ages
+                self.__move(new, np.zeros(len(ages)), ages)
+
+        if self.__count:
+            self.__refresh()
+        return True
+
+    def __move(self, particles: slice, start_ages: np.ndarray, end_ages: np.ndarray):
+        # Zurückgelegte Strecke bei linear von initial_speed zu final_speed verlaufender Geschwindigkeit
+        particle_data = self.data.particle_data
+        lifetimes = self.__lifetimes[particles]
+        distances = (particle_data.initial_speed * (end_ages - start_ages)
+                     + (particle_data.final_speed - particle_data.initial_speed)
+                     * (end_ages ** 2 - start_ages ** 2) / (2 * lifetimes))
+        self.__positions[particles] += distances[:, np.newaxis] * self.__directions[particles]
+
+    def __refresh(self):
+        # Größe und Farbe folgen dem Alter der Partikel
+        count = self.__count
+        particle_data = self.data.particle_data
+        relative_time = self.__ages[:count] / self.__lifetimes[:count]
+
+        self.__sizes[:count] = particle_data.initial_size - relative_time * (particle_data.initial_size -
+                                                                            particle_data.final_size)
+
+        initial_color = np.array(particle_data.initial_color[:3], dtype=np.float64)
+        final_color = np.array(particle_data.final_color[:3], dtype=np.float64)
+        self.__colors[:count] = np.clip(initial_color + relative_time[:, np.newaxis] * (final_color - initial_color),
+                                        0, 255)
+
+    def __remove_expired(self):
+        # Abgelaufene Partikel werden entfernt, die übrigen rücken unter Beibehaltung ihrer Reihenfolge auf
+        count = self.__count
+        alive = self.__ages[:count] <= self.__lifetimes[:count]
+        if not alive.all():
+            remaining = int(np.count_nonzero(alive))
+            for array in (self.__positions, self.__directions, self.__ages, self.__lifetimes, self.__sizes,
+                          self.__colors):
+                array[:remaining] = array[:count][alive]
+            self.__count = remaining
 
     def render(self, surface: pygame.Surface):
-        texture_render_data = TextureRenderData(surface=surface, color=self.data.color, position=self.data.position,
-                                                size=self.data.size, direction=self.data.direction,
-                                                outline=self.data.outline, outline_color=self.data.outline_color,
-                                                outline_width=self.data.outline_width)
-        self.data.texture.render(texture_render_data)
-
-
-class ParticleEmitter:
-    def __init__(self, data: ParticleEmitterData):
-        self.data = data
-
-        self.__time_buffer = 1 / self.data.particles_per_second
-        self.__particles = []
-
-    def update(self, timedelta: float):
-        self.__time_buffer += timedelta
-        for particle_to_spawn in range(int(self.__time_buffer * self.data.particles_per_second)):
-            if self.data.max_particles > len(self.__particles):
-                if all(isinstance(i, tuple) for i in self.data.position):
-                    self.data.particle_data.position = (
-                        random.randint(self.data.position[0][0], self.data.position[1][0]),
-                        random.randint(self.data.position[0][1], self.data.position[1][1]),
-                    )
-                    if self.data.area_emission_direction == 1:
-                        direction = math.atan2(
-                            (self.data.position[0][0] + self.data.position[1][0] / 2 - self.data.particle_data.position[0]),
-                            (self.data.position[0][1] + self.data.position[1][1] / 2 - self.data.particle_data.position[1]),
-                        )
-                        self.data.particle_data.direction = (math.sin(direction),
-                                                             math.cos(direction))
-                    else:
-                        self.data.particle_data.direction = (random.random() * 2 - 1, random.random() * 2 - 1)
+        """
+        Zeichnet alle Partikel. Kleine Partikel werden als vorab gezeichnete Sprites aus dem TextureCache
+        gesammelt mit einem einzigen Aufruf von fblits ausgegeben, größere Partikel direkt gezeichnet
+        """
+        count = self.__count
+        if not count:
+            return
+        particle_data = self.data.particle_data
+        texture = particle_data.texture
+        outline_width = particle_data.outline_width if particle_data.outline else 0
+        texture_render_data = TextureRenderData(surface=surface, outline=particle_data.outline,
+                                                outline_color=particle_data.outline_color,
+                                                outline_width=particle_data.outline_width)
+
+        if texture.directional:
+            # Richtungsabhängige Texturen (Linien) werden direkt gezeichnet: Linien sind bereits die günstigste
+            # Form und würden mit jeder Richtung einen weiteren Eintrag im TextureCache benötigen
+            self.__render_directly(texture, texture_render_data, 0, count)
+            return
 
-                else:
-                    self.data.particle_data.position = self.data.position
-                    direction = (self.data.direction_of_emission[0] + random.random()
-                                 * (self.data.direction_of_emission[1] - self.data.direction_of_emission[0]))
-                    self.data.particle_data.direction = (math.sin(math.radians(direction)),
-                                                         math.cos(math.radians(direction)))
-                self.__particles.append(Particle(dataclasses.replace(self.data.particle_data)))
-            self.__time_buffer -= 1 / self.data.particles_per_second
-
-        remove_list = []
-        for particle in self.__particles:
-            particle.update(timedelta)
-            if not particle.alive:
-                remove_list.append(particle)
-        for particle in remove_list:
-            self.__particles.remove(particle)
+        # Gerundete Größe und Farbe jedes Partikels werden in eine Zahl gepackt, sodass nur die unterschiedlichen
+        # Schlüssel (wenige pro Frame) einzeln im TextureCache nachgeschlagen werden müssen
+        color_step = TextureCache.color_step
+        size_steps = np.rint(self.__sizes[:count] / TextureCache.size_step).astype(np.int64)
+        colors = np.minimum(np.rint(self.__colors[:count] / color_step) * color_step, 255).astype(np.int64)
+        codes = (size_steps << 24) | (colors[:, 0] << 16) | (colors[:, 1] << 8) | colors[:, 2]
+        unique_codes, inverse = np.unique(codes, return_inverse=True)
+
+        max_size = TextureCache.max_extent - 2 - 2 * outline_width
+        key_prefix = (texture, particle_data.outline, particle_data.outline_color, outline_width)
+        sprites = []
+        offsets = np.zeros((len(unique_codes), 2), dtype=np.int64)
+        for i, code in enumerate(unique_codes.tolist()):
+            size = (code >> 24) * TextureCache.size_step
+            if size > max_size:
+                sprites.append(None)
+                continue
+            color = ((code >> 16) & 255, (code >> 8) & 255, code & 255)
+            texture_render_data.size = size
+            texture_render_data.color = color
+            sprite, offsets[i] = TextureCache.get_sprite((key_prefix, size, *color), texture, texture_render_data)
+            sprites.append(sprite)
+
+        destinations = (self.__positions[:count].astype(np.int64) + offsets[inverse]).tolist()
+        particle_sprites = [sprites[i] for i in inverse.tolist()]
+
+        cached = (size_steps * TextureCache.size_step <= max_size)
+        if cached.all():
+            surface.fblits([(sprite, destination) for sprite, destination in zip(particle_sprites, destinations)
+                            if sprite is not None])
+            return
 
-    def render(self, surface: pygame.Surface):
-        for particle in self.__particles:
-            particle.render(surface)
+        # Die Reihenfolge der Partikel bleibt auch beim Wechsel zwischen Sprites und direktem Zeichnen erhalten
+        boundaries = [0, *(np.flatnonzero(np.diff(cached)) + 1).tolist(), count]
+        for start, end in zip(boundaries, boundaries[1:]):
+            if cached[start]:
+                surface.fblits([(sprite, destination) for sprite, destination
+                                in zip(particle_sprites[start:end], destinations[start:end]) if sprite is not None])
+            else:
+                self.__render_directly(texture, texture_render_data, start, end)
+
+    def __render_directly(self, texture: Texture, texture_render_data: TextureRenderData, start: int, end: int):
+        for position, direction, size, color in zip(self.__positions[start:end].tolist(),
+                                                    self.__directions[start:end].tolist(),
+                                                    self.__sizes[start:end].tolist(),
+                                                    self.__colors[start:end].tolist()):
+            texture_render_data.position = position
+            texture_render_data.direction = direction
+            texture_render_data.size = size
+            texture_render_data.color = color
+            texture.render(texture_render_data)
 
     def particle_count(self):
-        return len(self.__particles)
+        return self.__count
+
+    def get_bounds(self) -> pygame.Rect | None:
+        """
+        Rechteck, welches alle Partikel einschließlich ihrer Größe und Umrandung umfasst, ohne Partikel None
+        """
+        count = self.__count
+        if not count:
+            return None
+        extent = float(self.__sizes[:count].max()) + self.__margin()
+        left, top = self.__positions[:count].min(axis=0).tolist()
+        right, bottom = self.__positions[:count].max(axis=0).tolist()
+        return pygame.Rect(int(left - extent), int(top - extent),
+                           int(right - left + 2 * extent) + 1, int(bottom - top + 2 * extent) + 1)
+
+    def get_particle_rects(self) -> List[pygame.Rect]:
+        """
+        Ein Rechteck je Partikel, welches den Partikel einschließlich seiner Größe und Umrandung umfasst
+        """
+        count = self.__count
+        if not count:
+            return []
+        extents = self.__sizes[:count] + self.__margin()
+        corners = (self.__positions[:count] - extents[:, np.newaxis]).astype(np.int64).tolist()
+        sizes = (2 * extents + 1).astype(np.int64).tolist()
+        return [pygame.Rect(x, y, size, size) for (x, y), size in zip(corners, sizes)]
+
+    def __margin(self) -> float:
+        # Umrandung (Linien ragen bis zur doppelten Breite hinaus) und Rundung
+        particle_data = self.data.particle_data
+        return (2 * particle_data.outline_width if particle_data.outline else 0) + 2
 
 
 @dataclass
@@ -284,21 +626,88 @@ class DefaultEffectData(EffectData):
     parent_size: Tuple[float, float] = (0, 0)
 
 
+class EffectPriority(Enum):
+    # Effekte, welche für das Spielgeschehen oder die Bedienung wichtig sind, werden nie verworfen
+    GAMEPLAY = 0
+    # Rein kosmetische Effekte unterliegen dem Budget des VFXManager und können bereits beim Hinzufügen verworfen
+    #  werden. Sie dürfen daher nach dem Hinzufügen nicht mehr vom Aufrufer verwendet werden
+    COSMETIC = 1
+
+
 class Effect(abc.ABC):
+    priority: EffectPriority = EffectPriority.GAMEPLAY
+    # Ebene der Karte, auf welcher der Effekt von VFXManager.render_layers gezeichnet wird. Effekte ohne Ebene
+    #  werden von ihrem Objekt über VFXManager.render gezeichnet
+    layer: MapLayer | None = None
+
+    # Mindestabstand zwischen zwei Updates in Sekunden, 0: in jedem Frame. Die Zeit dazwischen wird gesammelt und
+    #  beim nächsten Update nachgeholt
+    update_interval: float = 0
+    # Mindestabstand zwischen zwei Updates, solange der Effekt außerhalb des sichtbaren Bereichs liegt (siehe
+    #  get_bounds). None: wie im sichtbaren Bereich
+    offscreen_interval: float | None = None
+
     def __init__(self, data: EffectData):
         self.data = data
         self.done = False
+        # Vom VFXManager gesammelte, noch nicht an update übergebene Zeit
+        self.pending_time = 0.
+
+    def get_emitters(self) -> List[ParticleEmitter]:
+        """
+        Partikel-Emitter des Effekts, deren Erzeugungsrate vom VFXManager begrenzt wird
+        """
+        return []
+
+    def get_position(self) -> Tuple[float, float] | None:
+        """
+        Position des Effekts, über welche sich überlagernde kosmetische Effekte erkannt werden
+        """
+        return None
+
+    def get_bounds(self) -> pygame.Rect | None:
+        """
+        Bereich, in welchem der Effekt zeichnet. Effekte außerhalb des sichtbaren Bereichs werden nicht gezeichnet,
+        Effekte ohne Bereich immer
+        """
+        return None
+
+    def get_dirty_rects(self) -> List[pygame.Rect] | None:
+        """
+        Bereiche, in welche render zeichnet und welche die MapSurface bzw. die GUI daher erneuern muss.
+        None: unbekannt, die ganze Ebene bzw. Oberfläche wird erneuert (Standard: der Bereich aus get_bounds)
+        """
+        bounds = self.get_bounds()
+        return None if bounds is None else [bounds]
+
+    def reset(self, data: EffectData):
+        """
+        Versetzt den Effekt in den Zustand eines neu erzeugten Effekts, damit er vom PoolManager wiederverwendet
+        werden kann. Unterklassen, die wiederverwendet werden sollen, müssen ihren eigenen Zustand zurücksetzen
+        """
+        self.data = data
+        self.done = False
+        self.pending_time = 0.
 
     def update(self, timedelta: float, pos: Tuple[float, float], size: Tuple[float, float]):
         self.data.parent_pos = pos
         self.data.parent_size = size
 
+    def fast_forward(self, timedelta: float, pos: Tuple[float, float], size: Tuple[float, float]) -> bool:
+        """
+        Überspringt eine längere Zeitspanne (z.B. nach einer Unterbrechung), ohne sie schrittweise zu simulieren
+        :return: False, wenn der Effekt dies nicht unterstützt, er wird dann mit einem einzelnen Update nachgeholt
+        """
+        return False
+
     @abc.abstractmethod
     def render(self, surface: pygame.Surface):
         pass
 
 
 class MenuBackgroundEffect(Effect):
+    update_interval = 1 / 30
+
     def __init__(self):
         super().__init__(DefaultEffectData())
 
@@ -331,6 +740,14 @@ class MenuBackgroundEffect(Effect):
         self.emitter.data.position = (pos, (pos[0] + size[0], pos[1] + size[1]))
         self.emitter.update(timedelta)
 
+    def fast_forward(self, timedelta: float, pos: Tuple[float, float], size: Tuple[float, float]) -> bool:
+        super().update(timedelta, pos, size)
+        self.emitter.data.position = (pos, (pos[0] + size[0], pos[1] + size[1]))
+        return self.emitter.fast_forward(timedelta)
+
+    def get_emitters(self) -> List[ParticleEmitter]:
+        return [self.emitter]
+
     def render(self, surface: pygame.Surface):
         self.emitter.render(surface)
 
@@ -369,11 +786,16 @@ class InGameBlendInEffect(Effect):
 
         self.__surface.set_alpha(int(255 - self.__ctime / self.data.duration * 255))
 
+    def get_bounds(self) -> pygame.Rect | None:
+        return self.__surface.get_rect()
+
     def render(self, surface: pygame.Surface):
         surface.blit(self.__surface, (0, 0))
 
 
 class InGameBackgroundEffect(Effect):
+    update_interval = 1 / 30
+
     def __init__(self):
         super().__init__(DefaultEffectData())
 
@@ -405,6 +827,18 @@ class InGameBackgroundEffect(Effect):
         self.emitter.data.position = (pos, (pos[0] + size[0], pos[1] + size[1]))
         self.emitter.update(timedelta)
 
+    def fast_forward(self, timedelta: float, pos: Tuple[float, float], size: Tuple[float, float]) -> bool:
+        super().update(timedelta, pos, size)
+        self.emitter.data.position = (pos, (pos[0] + size[0], pos[1] + size[1]))
+        return self.emitter.fast_forward(timedelta)
+
+    def get_dirty_rects(self) -> List[pygame.Rect] | None:
+        # Die wenigen Partikel sind über die ganze Karte verteilt, ein umfassendes Rechteck wäre fast die ganze Karte
+        return self.emitter.get_particle_rects()
+
+    def get_emitters(self) -> List[ParticleEmitter]:
+        return [self.emitter]
+
     def render(self, surface: pygame.Surface):
         self.emitter.render(surface)
 
@@ -429,6 +863,8 @@ class OverlayFadeOutEffect(Effect):
         surf = pygame.Surface(self.data.overlay.get_size(), pygame.SRCALPHA)
         surf.blit(self.data.overlay, (0, 0))
         self.data.overlay = surf
+        # Bemalter Teil des Overlays, z.B. der Text eines sonst durchsichtigen Overlays in Bildschirmgröße
+        self.__bounding_rect = surf.get_bounding_rect()
 
         self.__surface_center = self.data.overlay.get_size()
         self.__c_time = 0
@@ -447,10 +883,15 @@ class OverlayFadeOutEffect(Effect):
 
         self.data.overlay.set_alpha(int((1 - relative_time) * self.data.start_alpha))
 
+    def __get_position(self) -> Tuple[float, float]:
+        return (self.data.parent_pos[0] + (self.data.parent_size[0] - self.data.overlay.get_width()) / 2,
+                self.data.parent_pos[1] + (self.data.parent_size[1] - self.data.overlay.get_height()) / 2)
+
+    def get_bounds(self) -> pygame.Rect | None:
+        return self.__bounding_rect.move(self.__get_position())
+
     def render(self, surface: pygame.Surface):
-        surface.blit(self.data.overlay,
-                     (self.data.parent_pos[0] + (self.data.parent_size[0] - self.data.overlay.get_width()) / 2,
-                      self.data.parent_pos[1] + (self.data.parent_size[1] - self.data.overlay.get_height()) / 2))
+        surface.blit(self.data.overlay, self.__get_position())
 
 
 @dataclass
@@ -474,18 +915,28 @@ class TextParticleEffectData(EffectData):
     final_speed: float = 0
     gravity_multiplier: float = 0
 
+    # Wenn True, wird der Farbverlauf durch Überblenden des Textes in Start- und Endfarbe dargestellt,
+    #  statt den Text für jede Zwischenfarbe (gerundet, siehe TextCache) zu zeichnen
+    crossfade_colors: bool = False
+
     parent_pos: Tuple[float, float] = (0, 0)
     parent_size: Tuple[float, float] = (0, 0)
 
 
 class TextParticleEffect(Effect):
     data: TextParticleEffectData
+    offscreen_interval = 0.25
 
     def __init__(self, data: TextParticleEffectData):
         super().__init__(data)
-        self.__text_surface = self.data.font.render(self.data.text, False, self.data.initial_color)
-        if self.data.outline:
-            self.__text_surface = get_outline(self.__text_surface, resize=True)
+        self.__text_surface = TextCache.get_text(self.data.font, self.data.text, self.data.initial_color,
+                                                 self.data.outline)
+        self.__final_text_surface = None
+        if self.data.crossfade_colors and self.data.final_color != self.data.initial_color:
+            self.__final_text_surface = TextCache.get_text(self.data.font, self.data.text, self.data.final_color,
+                                                           self.data.outline)
+        self.__alpha = 255
+        self.__relative_time = 0
 
         direction = self.data.direction_of_emission[0] + random.random() * (
                 self.data.direction_of_emission[1] - self.data.direction_of_emission[0])
@@ -506,7 +957,9 @@ class TextParticleEffect(Effect):
         self.__ctime += timedelta
         relative_time = self.__ctime / self.data.lifetime
 
-        self.__text_surface.set_alpha(255 - min(255, int(255 * relative_time)))
+        # Die Oberflächen werden mit anderen Effekten geteilt, die Transparenz wird daher erst beim Zeichnen gesetzt
+        self.__alpha = 255 - min(255, int(255 * relative_time))
+        self.__relative_time = min(1., relative_time)
 
         self.data.color = tuple(
             self.data.initial_color[i] + relative_time * (self.data.final_color[i] - self.data.initial_color[i])
@@ -518,10 +971,10 @@ class TextParticleEffect(Effect):
             max(0, min(255, self.data.color[2])),
         )
 
-        if self.data.color != self.__previous_color:
-            self.__text_surface = self.data.font.render(self.data.text, False, self.data.color)
-            if self.data.outline:
-                self.__text_surface = get_outline(self.__text_surface, resize=True)
+        if self.data.color != self.__previous_color and not self.data.crossfade_colors:
+            self.__text_surface = TextCache.get_text(self.data.font, self.data.text, self.data.color,
+                                                     self.data.outline)
+            self.__previous_color = self.data.color
 
         self.data.speed = timedelta * (self.data.initial_speed + relative_time *
                                        (self.data.final_speed - self.data.initial_speed))
@@ -535,9 +988,23 @@ class TextParticleEffect(Effect):
         if self.__ctime > self.data.lifetime:
             self.done = True
 
+    def get_position(self) -> Tuple[float, float] | None:
+        return self.data.position
+
+    def get_bounds(self) -> pygame.Rect | None:
+        return self.__text_surface.get_rect(topleft=(self.__origin[0] + self.data.position[0],
+                                                     self.__origin[1] + self.data.position[1]))
+
     def render(self, surface: pygame.Surface):
-        surface.blit(self.__text_surface, (self.__origin[0] + self.data.position[0],
-                                           self.__origin[1] + self.data.position[1]))
+        position = (self.__origin[0] + self.data.position[0], self.__origin[1] + self.data.position[1])
+        if self.__final_text_surface is None:
+            self.__text_surface.set_alpha(self.__alpha)
+            surface.blit(self.__text_surface, position)
+            return
+        self.__text_surface.set_alpha(int(self.__alpha * (1 - self.__relative_time)))
+        surface.blit(self.__text_surface, position)
+        self.__final_text_surface.set_alpha(int(self.__alpha * self.__relative_time))
+        surface.blit(self.__final_text_surface, position)
 
 
 @dataclass
@@ -552,17 +1019,15 @@ class EnemyKillEffectData(EffectData):
 
 class EnemyKillEffect(Effect):
     data: EnemyKillEffectData
-
-    explosion_spritesheet: sprites.Spritesheet = None
+    priority = EffectPriority.COSMETIC
+    update_interval = 1 / 30
+    offscreen_interval = 0.25
 
     def __init__(self, data: EnemyKillEffectData):
         super().__init__(data)
 
-        if EnemyKillEffect.explosion_spritesheet is None:
-            EnemyKillEffect.explosion_spritesheet = sprites.Spritesheet(ResEffect.EXPLOSION)
-
-        self.__image = EnemyKillEffect.explosion_spritesheet.image_at((3 * 32, 0, 32, 32))
-        self.__image_num = 0
+        self.__animation = sprites.AnimationManager.get_animation(ResEffect.EXPLOSION, (3 * 32, 0, 32, 32), 5)
+        self.__image = self.__animation.frames[0]
 
         self.__ctime = 0
 
@@ -570,13 +1035,17 @@ class EnemyKillEffect(Effect):
         super().update(timedelta, pos, size)
         self.__ctime += timedelta
 
-        current_image_num = int((self.__ctime / self.data.duration) * 5)
-        if current_image_num != self.__image_num:
-            self.__image = EnemyKillEffect.explosion_spritesheet.image_at((3 * 32 + current_image_num * 32, 0, 32, 32))
+        self.__image = self.__animation.frame_at(self.__ctime / self.data.duration)
 
         if self.__ctime > self.data.duration:
             self.done = True
 
+    def get_position(self) -> Tuple[float, float] | None:
+        return self.data.position
+
+    def get_bounds(self) -> pygame.Rect | None:
+        return self.__image.get_rect(topleft=self.data.position)
+
     def render(self, surface: pygame.Surface):
         surface.blit(self.__image, self.data.position)
 
@@ -593,31 +1062,38 @@ class BulletImpactEffectData(EffectData):
 
 class BulletImpactEffect(Effect):
     data: BulletImpactEffectData
-
-    impact_spritesheet: sprites.Spritesheet = None
+    priority = EffectPriority.COSMETIC
+    update_interval = 1 / 30
+    offscreen_interval = 0.25
 
     def __init__(self, data: BulletImpactEffectData):
         super().__init__(data)
 
-        if BulletImpactEffect.impact_spritesheet is None:
-            BulletImpactEffect.impact_spritesheet = sprites.Spritesheet(ResEffect.BULLET_IMPACT)
+        self.__animation = sprites.AnimationManager.get_animation(ResEffect.BULLET_IMPACT, (0, 0, 16, 16), 3)
+        self.__image = self.__animation.frames[0]
 
-        self.__image = BulletImpactEffect.impact_spritesheet.image_at((0, 0, 16, 16))
-        self.__image_num = 0
+        self.__ctime = 0
 
+    def reset(self, data: BulletImpactEffectData):
+        super().reset(data)
+        self.__image = self.__animation.frames[0]
         self.__ctime = 0
 
     def update(self, timedelta: float, pos: Tuple[float, float], size: Tuple[float, float]):
         super().update(timedelta, pos, size)
         self.__ctime += timedelta
 
-        current_image_num = int((self.__ctime / self.data.duration) * 3)
-        if current_image_num != self.__image_num:
-            self.__image = BulletImpactEffect.impact_spritesheet.image_at((current_image_num * 16, 0, 16, 16))
+        self.__image = self.__animation.frame_at(self.__ctime / self.data.duration)
 
         if self.__ctime > self.data.duration:
             self.done = True
 
+    def get_position(self) -> Tuple[float, float] | None:
+        return self.data.position
+
+    def get_bounds(self) -> pygame.Rect | None:
+        return self.__image.get_rect(topleft=self.data.position)
+
     def render(self, surface: pygame.Surface):
         surface.blit(self.__image, self.data.position)
 
@@ -634,6 +1110,7 @@ class BeamShootEffectData(EffectData):
 
 class BeamShootEffect(Effect):
     data: BeamShootEffectData
+    offscreen_interval = 0.25
 
     def __init__(self, data: BeamShootEffectData):
         super().__init__(data)
@@ -663,6 +1140,14 @@ class BeamShootEffect(Effect):
 
         self.__c_time = 0
 
+    def reset(self, data: BeamShootEffectData):
+        super().reset(data)
+        self.emitter.data.position = (0, 0)
+        self.emitter.data.particles_per_second = 15
+        self.emitter.data.direction_of_emission = (135, 225)
+        self.emitter.reset()
+        self.__c_time = 0
+
     def update(self, timedelta: float, pos: Tuple[float, float], size: Tuple[float, float]):
         super().update(timedelta, pos, size)
 
@@ -677,6 +1162,16 @@ class BeamShootEffect(Effect):
             self.emitter.data.position = pos
         self.emitter.update(timedelta)
 
+    def get_emitters(self) -> List[ParticleEmitter]:
+        return [self.emitter]
+
+    def get_bounds(self) -> pygame.Rect | None:
+        return self.emitter.get_bounds()
+
+    def get_dirty_rects(self) -> List[pygame.Rect] | None:
+        bounds = self.emitter.get_bounds()
+        return [] if bounds is None else [bounds]
+
     def render(self, surface: pygame.Surface):
         self.emitter.render(surface)
 
@@ -711,14 +1206,18 @@ class ButtonHighlightEffect(Effect):
             if highlight_rect["alpha"] <= 0:
                 self.highlight_rects.remove(highlight_rect)
 
+    def __get_rect(self, highlight_rect: dict) -> pygame.Rect:
+        return pygame.Rect(self.data.parent_pos[0] + highlight_rect["pos"].x,
+                           self.data.parent_pos[1] + highlight_rect["pos"].y,
+                           self.data.parent_size[0] + abs(highlight_rect["pos"].x) * 2 + 2,
+                           self.data.parent_size[1] + abs(highlight_rect["pos"].y) * 2 + 2)
+
+    def get_dirty_rects(self) -> List[pygame.Rect] | None:
+        return [self.__get_rect(highlight_rect) for highlight_rect in self.highlight_rects]
+
     def render(self, surface: pygame.Surface):
         for highlight_rect in self.highlight_rects:
-            pygame.draw.rect(surface, (200, 100, 0, highlight_rect["alpha"]),
-                             (self.data.parent_pos[0] + highlight_rect["pos"].x,
-                              self.data.parent_pos[1] + highlight_rect["pos"].y,
-                              self.data.parent_size[0] + abs(highlight_rect["pos"].x) * 2 + 2,
-                              self.data.parent_size[1] + abs(highlight_rect["pos"].y) * 2 + 2),
-                             2, 6)
+            pygame.draw.rect(surface, (200, 100, 0, highlight_rect["alpha"]), self.__get_rect(highlight_rect), 2, 6)
 
 
 @dataclass
@@ -863,6 +1362,20 @@ class GradientLineEffect(Effect):
         self.emitter.update(timedelta)
         return
 
+    def get_emitters(self) -> List[ParticleEmitter]:
+        return [self.emitter]
+
+    def get_dirty_rects(self) -> List[pygame.Rect] | None:
+        rects = self.emitter.get_particle_rects()
+        if self.__points:
+            left = min(point[0] for point in self.__points)
+            top = min(point[1] for point in self.__points)
+            right = max(point[0] for point in self.__points)
+            bottom = max(point[1] for point in self.__points)
+            # Die gedrehten Teilstücke der Linie ragen etwas über die Punkte hinaus
+            rects.append(pygame.Rect(int(left) - 4, int(top) - 4, int(right - left) + 9, int(bottom - top) + 9))
+        return rects
+
     def render(self, surface: pygame.Surface):
         draw_gradient_lines(surface, (255, 255, 255, 0), (255, 255, 255, 255), False,
                             self.__points, 1)
@@ -946,6 +1459,9 @@ class WinCelebrationEffect(Effect):
         for emitter in self.emitters:
             emitter.update(timedelta)
 
+    def get_emitters(self) -> List[ParticleEmitter]:
+        return self.emitters
+
     def render(self, surface: pygame.Surface):
         for emitter in self.emitters:
             emitter.render(surface)
@@ -953,76 +1469,400 @@ class WinCelebrationEffect(Effect):
 
 @dataclass
 class VFXManagedObjectData:
-    identifier: int
-    rendered: bool
+    # Schwache Referenz auf das Objekt, zu welchem die Effekte gehören
+    owner: Callable[[], object | None]
     parent_pos: Tuple[float, float]
     parent_size: Tuple[float, float]
     effects: List[Effect]
+    # Verdeckte Objekte (z.B. hinter einem Menü): Ihre Effekte werden weder aktualisiert noch gezeichnet
+    hidden: bool = False
+
+
+@dataclass(frozen=True)
+class VFXQuality:
+    # Höchstzahl gleichzeitig aktiver kosmetischer Effekte
+    max_effects: int
+    # Höchstzahl kosmetischer Effekte, die pro Frame hinzugefügt werden dürfen
+    max_new_effects: int
+    # Höchstzahl an Partikeln aller Emitter, darüber hinaus werden keine neuen Partikel erzeugt
+    max_particles: int
+    # Faktor auf die Erzeugungsrate aller Emitter
+    spawn_factor: float
+    # Kosmetische Effekte, die näher als dieser Abstand (in Pixeln) an einem aktiven Effekt desselben Typs
+    #  erscheinen würden, werden verworfen
+    merge_distance: float
+
+
+# Qualitätsstufen von der höchsten zur niedrigsten
+VFX_QUALITY_LEVELS = (
+    VFXQuality(max_effects=400, max_new_effects=40, max_particles=4000, spawn_factor=1., merge_distance=0),
+    VFXQuality(max_effects=200, max_new_effects=20, max_particles=2000, spawn_factor=0.75, merge_distance=4),
+    VFXQuality(max_effects=100, max_new_effects=10, max_particles=1000, spawn_factor=0.5, merge_distance=12),
+    VFXQuality(max_effects=40, max_new_effects=4, max_particles=400, spawn_factor=0.25, merge_distance=24),
+)
 
 
-class VFXManager:
-    __effects: Dict[int, VFXManagedObjectData]
+@dataclass
+class VFXStats:
+    # Anzahl der Objekte bzw. Effekte, die derzeit verwaltet werden
+    objects: int = 0
+    effects: int = 0
+    cosmetic_effects: int = 0
+    # Anzahl der Partikel aller Emitter nach dem letzten Update
+    particles: int = 0
+    # Anzahl der kosmetischen Effekte, die wegen des Budgets oder einer Überlagerung verworfen wurden
+    effects_culled: int = 0
+    # Anzahl der insgesamt hinzugefügten bzw. abgelaufenen Effekte
+    effects_added: int = 0
+    effects_finished: int = 0
+    # Anzahl der Objekte, deren Effekte verworfen wurden, weil das Objekt gelöscht oder freigegeben wurde
+    objects_released: int = 0
+    # Anzahl der Effekte, die beim letzten Aufruf von render_layers gezeichnet bzw. als nicht sichtbar übersprungen
+    #  wurden
+    effects_rendered: int = 0
+    effects_offscreen: int = 0
+    # Anzahl der Effekte, die beim letzten Update aktualisiert bzw. zurückgestellt wurden
+    effects_updated: int = 0
+    effects_deferred: int = 0
 
-    def __init__(self):
-        self.__effects = {}
 
-    def __check_obj(self, obj: object):
-        if hash(obj) not in self.__effects:
-            self.clear_effects(obj)
-        return
+class VFXManager:
+    __entries: Dict[int, VFXManagedObjectData]
+    headless: bool
+    stats: VFXStats
+
+    # Index in VFX_QUALITY_LEVELS
+    quality: int
+    # Wenn True, wird die Qualitätsstufe anhand der Frame-Zeit automatisch angepasst
+    auto_quality: bool
+    target_frame_time: float | None
+
+    # Zurückgestellte Zeitspannen ab dieser Länge (in Sekunden) werden mit Effect.fast_forward übersprungen
+    fast_forward_after: float = 0.25
+
+    def __init__(self, *, headless: bool = False, target_fps: float | None = None):
+        """
+        Verwaltet alle Effekte der Objekte einer Szene.
+        Die Objekte werden nur schwach referenziert: Wird ein Objekt gelöscht, werden auch seine Effekte verworfen.
+        Objekte, die weiterleben (z.B. Objekte aus einem Pool), müssen mit release freigegeben werden.
+        Kosmetische Effekte und alle Partikel unterliegen einem Budget, welches durch die Qualitätsstufe festgelegt
+        wird (siehe VFX_QUALITY_LEVELS). Liegt die Frame-Zeit dauerhaft über der angestrebten, wird die Qualität
+        gesenkt, liegt sie länger wieder darunter, wird sie schrittweise angehoben.
+        Effekte werden gemäß Effect.update_interval und Effect.offscreen_interval seltener aktualisiert, Effekte
+        verdeckter Objekte (siehe set_hidden) gar nicht. Die ausgelassene Zeit wird beim nächsten Update nachgeholt
+        :param headless: Wenn True, werden keine Effekte angenommen, aktualisiert oder ausgegeben
+        :param target_fps: Angestrebte Bildrate (z.B. Config.FPS). Ohne Angabe bleibt die Qualitätsstufe fest
+        """
+        self.__entries = {}
+
+        self.headless = headless
+        self.stats = VFXStats()
+
+        self.quality = 0
+        self.auto_quality = target_fps is not None
+        self.target_frame_time = 1 / target_fps if target_fps else None
+        self.__frame_time = self.target_frame_time or 0
+        self.__slow_time = 0
+        self.__fast_time = 0
+        self.__new_effects = 0
+        # Aktive kosmetische Effekte nach Typ, über alle Objekte hinweg, zum Erkennen von Überlagerungen
+        self.__cosmetic_effects: Dict[type, Set[Effect]] = {}
+
+        self.__view_rect: pygame.Rect | None = None
+
+    @property
+    def quality_level(self) -> VFXQuality:
+        return VFX_QUALITY_LEVELS[self.quality]
+
+    def __get_entry(self, obj: object) -> VFXManagedObjectData | None:
+        entry = self.__entries.get(id(obj))
+        if entry is not None and entry.owner() is not obj:
+            # Die id eines gelöschten Objekts wurde neu vergeben
+            self.__discard(id(obj))
+            return None
+        return entry
+
+    def __get_or_create_entry(self, obj: object) -> VFXManagedObjectData:
+        entry = self.__get_entry(obj)
+        if entry is None:
+            key = id(obj)
+            manager = weakref.ref(self)
+
+            def owner_deleted(reference: weakref.ref):
+                vfx_manager = manager()
+                if vfx_manager is not None:
+                    vfx_manager.__discard(key, reference)
+
+            try:
+                owner = weakref.ref(obj, owner_deleted)
+            except TypeError:
+                # Objekte ohne Unterstützung für schwache Referenzen bleiben bis zum Aufruf von release erhalten
+                owner = lambda: obj
+            entry = VFXManagedObjectData(owner, (0, 0), (0, 0), [])
+            self.__entries[key] = entry
+            self.stats.objects = len(self.__entries)
+        return entry
+
+    def __discard(self, key: int, owner: weakref.ref | None = None):
+        entry = self.__entries.get(key)
+        if entry is None or (owner is not None and entry.owner is not owner):
+            return
+        del self.__entries[key]
+        for effect in entry.effects:
+            self.__drop(effect)
+        self.stats.objects = len(self.__entries)
+        self.stats.objects_released += 1
+
+    def add_effect(self, obj: object, effect: Effect, unique: bool = False, priority: EffectPriority | None = None,
+                   layer: MapLayer | None = None):
+        """
+        :param priority: Überschreibt die Priorität des Effekts (Standard: Effect.priority)
+        :param layer: Ebene der Karte, auf welcher der Effekt von render_layers gezeichnet wird (Standard: Effect.layer)
+        """
+        if self.headless:
+            return
+        if priority is not None:
+            effect.priority = priority
+        if layer is not None:
+            effect.layer = layer
+        entry = self.__get_or_create_entry(obj)
+
+        if effect.priority is EffectPriority.COSMETIC:
+            quality = self.quality_level
+            if (self.stats.cosmetic_effects >= quality.max_effects
+                    or self.__new_effects >= quality.max_new_effects
+                    or self.__overlaps(effect, quality.merge_distance)):
+                self.stats.effects_culled += 1
+                PoolManager.release(effect)
+                return
+            self.__new_effects += 1
+            self.stats.cosmetic_effects += 1
+            self.__cosmetic_effects.setdefault(type(effect), set()).add(effect)
 
-    def add_effect(self, obj: object, effect: Effect, unique: bool = False):
-        self.__check_obj(obj)
         if unique:
-            remove_list = []
-            for fx in self.__effects[hash(obj)].effects:
-                if type(fx) == type(effect):
-                    remove_list.append(fx)
-            for fx in remove_list:
-                self.__effects[hash(obj)].effects.remove(fx)
-        self.__effects[hash(obj)].effects.append(effect)
+            self.__remove_effects(entry, lambda fx: type(fx) == type(effect))
+        entry.effects.append(effect)
+        self.stats.effects += 1
+        self.stats.effects_added += 1
+
+    def __overlaps(self, effect: Effect, distance: float) -> bool:
+        # Verglichen wird mit den aktiven kosmetischen Effekten desselben Typs aller Objekte, da z.B. jeder Einschlag
+        #  zu einem eigenen Geschoss gehört
+        if distance <= 0:
+            return False
+        position = effect.get_position()
+        if position is None:
+            return False
+        for other in self.__cosmetic_effects.get(type(effect), ()):
+            other_position = other.get_position()
+            if (other_position is not None
+                    and (other_position[0] - position[0]) ** 2 + (other_position[1] - position[1]) ** 2
+                    < distance ** 2):
+                return True
+        return False
+
+    def __drop(self, effect: Effect):
+        # Effekte aus einem Pool werden dorthin zurückgegeben
+        PoolManager.release(effect)
+        self.stats.effects -= 1
+        if effect.priority is EffectPriority.COSMETIC:
+            self.stats.cosmetic_effects -= 1
+            self.__cosmetic_effects[type(effect)].discard(effect)
 
     def remove_effect(self, obj: object, effect: Effect):
-        self.__check_obj(obj)
-        if effect in self.__effects[hash(obj)]:
-            self.__effects[hash(obj)].effects.remove(effect)
+        entry = self.__get_entry(obj)
+        if entry is not None:
+            self.__remove_effects(entry, lambda fx: fx is effect)
 
     def clear_effects(self, obj: object):
-        if hash(obj) in self.__effects.keys():
-            self.__effects[hash(obj)].effects = []
-        else:
-            self.__effects[hash(obj)] = VFXManagedObjectData(hash(obj), True, (0, 0), (0, 0), [])
+        entry = self.__get_entry(obj)
+        if entry is not None:
+            self.__remove_effects(entry, lambda fx: True)
+
+    def release(self, obj: object):
+        """
+        Verwirft alle Effekte und Daten eines Objekts, z.B. bevor es an einen Pool zurückgegeben wird
+        """
+        if self.__get_entry(obj) is not None:
+            self.__discard(id(obj))
 
     def get_effects(self, obj: object) -> int:
-        self.__check_obj(obj)
-        return len(self.__effects[hash(obj)].effects)
+        if self.headless:
+            return 0
+        entry = self.__get_entry(obj)
+        return 0 if entry is None else len(entry.effects)
+
+    def get_dirty_rects(self, obj: object) -> List[pygame.Rect] | None:
+        """
+        Bereiche, in welche render die Effekte eines Objekts zeichnet (siehe Effect.get_dirty_rects).
+        None, wenn ein Effekt seinen Bereich nicht angeben kann
+        """
+        if self.headless:
+            return []
+        entry = self.__get_entry(obj)
+        if entry is None or entry.hidden:
+            return []
+        rects = []
+        for effect in entry.effects:
+            if effect.layer is not None:
+                continue
+            effect_rects = effect.get_dirty_rects()
+            if effect_rects is None:
+                return None
+            rects += effect_rects
+        return rects
 
     def transform_object(self, obj: object, pos: Tuple[float, float] = None, size: Tuple[float, float] = None):
-        self.__check_obj(obj)
+        if self.headless:
+            return
+        entry = self.__get_or_create_entry(obj)
         if pos:
-            self.__effects[hash(obj)].parent_pos = pos
+            entry.parent_pos = pos
         if size:
-            self.__effects[hash(obj)].parent_size = size
+            entry.parent_size = size
+
+    def set_hidden(self, obj: object, hidden: bool):
+        """
+        Setzt die Effekte eines Objekts aus, solange es verdeckt ist. Beim Aufdecken wird die vergangene Zeit
+        nachgeholt, nach Möglichkeit mit Effect.fast_forward
+        """
+        if self.headless:
+            return
+        self.__get_or_create_entry(obj).hidden = hidden
+
+    def __remove_effects(self, entry: VFXManagedObjectData, condition: Callable[[Effect], bool]):
+        # Verbleibende Effekte rücken in derselben Liste auf, ihre Reihenfolge bleibt erhalten
+        effects = entry.effects
+        kept = 0
+        for effect in effects:
+            if condition(effect):
+                self.__drop(effect)
+            else:
+                effects[kept] = effect
+                kept += 1
+        del effects[kept:]
+
+    def __govern(self, timedelta: float):
+        """
+        Passt die Qualitätsstufe an die geglättete Frame-Zeit an
+        """
+        if not self.auto_quality or self.target_frame_time is None or timedelta <= 0:
+            return
+        self.__frame_time += (timedelta - self.__frame_time) * 0.1
+
+        if self.__frame_time > self.target_frame_time * 1.2:
+            self.__slow_time += timedelta
+            self.__fast_time = 0
+        elif self.__frame_time < self.target_frame_time * 1.05:
+            self.__fast_time += timedelta
+            self.__slow_time = 0
+        else:
+            self.__slow_time = self.__fast_time = 0
+
+        # Gesenkt wird schnell, angehoben nur nach längerer Zeit, damit die Qualität nicht ständig wechselt
+        if self.__slow_time >= 0.5 and self.quality < len(VFX_QUALITY_LEVELS) - 1:
+            self.quality += 1
+            self.__slow_time = 0
+        elif self.__fast_time >= 3 and self.quality > 0:
+            self.quality -= 1
+            self.__fast_time = 0
 
     def update(self, timedelta: float):
-        remove_obj_list = []
-        for obj_hash in self.__effects.keys():
-            remove_vfx_list = []
-            if not self.__effects[obj_hash].rendered:
-                remove_obj_list.append(obj_hash)
-                continue
-            for effect in self.__effects[obj_hash].effects:
-                effect.update(timedelta, self.__effects[obj_hash].parent_pos, self.__effects[obj_hash].parent_size)
+        if self.headless:
+            return
+        self.__govern(timedelta)
+        self.__new_effects = 0
+
+        quality = self.quality_level
+        spawn_factor = quality.spawn_factor if self.stats.particles < quality.max_particles else 0.
+
+        particles = 0
+        updated = deferred = 0
+        for entry in list(self.__entries.values()):
+            effects = entry.effects
+            kept = 0
+            for effect in effects:
+                emitters = effect.get_emitters()
+                for emitter in emitters:
+                    emitter.spawn_factor = spawn_factor
+                effect.pending_time += timedelta
+                if not entry.hidden and self.__is_due(effect):
+                    self.__step(effect, entry)
+                    updated += 1
+                else:
+                    deferred += 1
                 if effect.done:
-                    remove_vfx_list.append(effect)
-            for effect in remove_vfx_list:
-                self.__effects[obj_hash].effects.remove(effect)
-
-        for obj_hash in remove_obj_list:
-            del self.__effects[obj_hash]
+                    self.__drop(effect)
+                    self.stats.effects_finished += 1
+                    continue
+                effects[kept] = effect
+                kept += 1
+                for emitter in emitters:
+                    particles += emitter.particle_count()
+            del effects[kept:]
+        self.stats.particles = particles
+        self.stats.effects_updated = updated
+        self.stats.effects_deferred = deferred
+
+    def __is_due(self, effect: Effect) -> bool:
+        interval = effect.update_interval
+        if effect.offscreen_interval is not None and effect.layer is not None and self.__view_rect is not None:
+            bounds = effect.get_bounds()
+            if bounds is not None and not self.__view_rect.colliderect(bounds):
+                interval = max(interval, effect.offscreen_interval)
+        # Kleine Toleranz, damit z.B. zwei Frames zu je 1/60 s ein Intervall von 1/30 s erreichen
+        return effect.pending_time >= interval - 1e-6
+
+    def __step(self, effect: Effect, entry: VFXManagedObjectData):
+        timedelta, effect.pending_time = effect.pending_time, 0.
+        if (timedelta < self.fast_forward_after
+                or not effect.fast_forward(timedelta, entry.parent_pos, entry.parent_size)):
+            effect.update(timedelta, entry.parent_pos, entry.parent_size)
 
     def render(self, obj: object, surface: pygame.Surface):
-        self.__check_obj(obj)
-        for effect in self.__effects[hash(obj)].effects:
-            effect.render(surface)
-        self.__effects[hash(obj)].rendered = True
+        """
+        Zeichnet die Effekte eines Objekts, welche keiner Ebene der Karte zugeordnet sind (siehe render_layers)
+        """
+        entry = self.__get_entry(obj)
+        if entry is None or entry.hidden:
+            return
+        for effect in entry.effects:
+            if effect.layer is None:
+                effect.render(surface)
+
+    def render_layers(self, map_surface: MapSurface, view_rect: pygame.Rect | None = None):
+        """
+        Zeichnet alle Effekte, welche einer Ebene der Karte zugeordnet sind, in einem Durchgang: Die Effekte werden
+        nach Ebenen gesammelt und jede Ebene wird einmal in aufsteigender Reihenfolge gezeichnet. Innerhalb einer Ebene
+        bleibt die Reihenfolge des Hinzufügens erhalten
+        :param view_rect: Sichtbarer Bereich der Karte, Effekte außerhalb dieses Bereichs werden übersprungen
+        """
+        if self.headless:
+            return
+        # Der sichtbare Bereich bestimmt auch, welche Effekte beim nächsten Update als außerhalb gelten
+        self.__view_rect = view_rect
+        layers: Dict[MapLayer, List[Effect]] = {}
+        offscreen = 0
+        for entry in self.__entries.values():
+            if entry.hidden:
+                continue
+            for effect in entry.effects:
+                if effect.layer is None:
+                    continue
+                if view_rect is not None:
+                    bounds = effect.get_bounds()
+                    if bounds is not None and not view_rect.colliderect(bounds):
+                        offscreen += 1
+                        continue
+                effects = layers.get(effect.layer)
+                if effects is None:
+                    effects = layers[effect.layer] = []
+                effects.append(effect)
+
+        rendered = 0
+        for layer in sorted(layers, key=lambda map_layer: map_layer.value):
+            for effect in layers[layer]:
+                map_surface.draw(layer, effect.render, effect.get_dirty_rects())
+            rendered += len(layers[layer])
+        self.stats.effects_rendered = rendered
+        self.stats.effects_offscreen = offscreen
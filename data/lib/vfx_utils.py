@@ -1,6 +1,8 @@
 import math
+from collections import OrderedDict
 from typing import Tuple, Any
 
+import numpy as np
 import pygame
 
 
@@ -40,32 +42,98 @@ def get_outline(surface: pygame.Surface, outline_color: Tuple[int, int, int] = (
 def vertical(size: Tuple[int, int], start_color: Tuple[int, int, int, int], end_color: Tuple[int, int, int, int]):
     """
     Draws a vertical linear gradient filling the entire surface. Returns a
-    surface filled with the gradient (numeric is only 2-3 times faster).
+    surface filled with the gradient.
+    Die Farben aller Zeilen werden mit NumPy in einem Schritt berechnet und per surfarray übertragen
     """
     height = int(size[1])
-    surface = pygame.Surface((1, height)).convert_alpha()
     dd = 1.0 / height
-    sr, sg, sb, sa = start_color
-    er, eg, eb, ea = (int(i) for i in end_color)
-    rm = (er - sr) * dd
-    gm = (eg - sg) * dd
-    bm = (eb - sb) * dd
-    am = (ea - sa) * dd
-    for y in range(height):
-        try:
-            surface.set_at((0, y),
-                           (int(sr + rm * y),
-                            int(sg + gm * y),
-                            int(sb + bm * y),
-                            int(sa + am * y))
-                           )
-        except ValueError:
-            continue
+    start = np.array(start_color[:4], dtype=np.float64)
+    end = np.array([int(i) for i in end_color[:4]], dtype=np.float64)
+    rows = np.arange(height, dtype=np.float64)[:, np.newaxis]
+    colors = np.clip((start + (end - start) * dd * rows).astype(np.int64), 0, 255).astype(np.uint8)
+
+    surface = pygame.Surface((1, height), pygame.SRCALPHA)
+    pixels = pygame.surfarray.pixels3d(surface)
+    pixels[0] = colors[:, :3]
+    del pixels
+    alpha = pygame.surfarray.pixels_alpha(surface)
+    alpha[0] = colors[:, 3]
+    del alpha
     return pygame.transform.scale(surface, size)
 
 
+class GradientCache:
+    # (Länge, Startfarbe, Endfarbe, Breite) → senkrechter Farbverlauf
+    strips: OrderedDict[tuple, pygame.Surface] = OrderedDict()
+    # (Länge, Startfarbe, Endfarbe, Breite, Winkel) → gedrehter Farbverlauf
+    segments: OrderedDict[tuple, pygame.Surface] = OrderedDict()
+    max_entries: int = 512
+
+    # Schrittweiten, auf welche Farbkanäle und Winkel (in Grad) für die Schlüssel gerundet werden
+    color_step: int = 8
+    angle_step: float = 1
+
+    @staticmethod
+    def quantize_color(color: Tuple[float, ...]) -> Tuple[int, ...]:
+        step = GradientCache.color_step
+        return tuple(min(255, max(0, int(round(channel / step) * step))) for channel in color)
+
+    @staticmethod
+    def quantize_angle(angle: float) -> float:
+        return round(angle / GradientCache.angle_step) * GradientCache.angle_step % 360
+
+    @staticmethod
+    def get_strip(length: int, start_color: Tuple[int, ...], end_color: Tuple[int, ...],
+                  width: int) -> pygame.Surface:
+        """
+        Gibt einen senkrechten Farbverlauf zurück, die Farben müssen bereits gerundet sein (siehe quantize_color)
+        """
+        key = (length, start_color, end_color, width)
+        strip = GradientCache.__get(GradientCache.strips, key)
+        if strip is None:
+            strip = vertical((width, length), start_color, end_color)
+            GradientCache.__put(GradientCache.strips, key, strip)
+        return strip
+
+    @staticmethod
+    def get_segment(length: int, start_color: Tuple[int, ...], end_color: Tuple[int, ...], width: int,
+                    angle: float) -> pygame.Surface:
+        """
+        Gibt einen um den (gerundeten) Winkel gedrehten Farbverlauf zurück
+        """
+        key = (length, start_color, end_color, width, angle)
+        segment = GradientCache.__get(GradientCache.segments, key)
+        if segment is None:
+            segment = pygame.transform.rotate(GradientCache.get_strip(length, start_color, end_color, width), angle)
+            GradientCache.__put(GradientCache.segments, key, segment)
+        return segment
+
+    @staticmethod
+    def __get(cache: OrderedDict, key: tuple) -> pygame.Surface | None:
+        surface = cache.get(key)
+        if surface is not None:
+            cache.move_to_end(key)
+        return surface
+
+    @staticmethod
+    def __put(cache: OrderedDict, key: tuple, surface: pygame.Surface):
+        cache[key] = surface
+        if len(cache) > GradientCache.max_entries:
+            cache.popitem(last=False)
+
+    @staticmethod
+    def clear():
+        GradientCache.strips.clear()
+        GradientCache.segments.clear()
+
+
 def draw_gradient_lines(surface: pygame.Surface, start_color: Any, end_color: Any, closed: bool, points: list,
                         width: int = 1):
+    """
+    Zeichnet einen Linienzug mit einem Farbverlauf über seine gesamte Länge. Die gedrehten Teilstücke werden
+    nach gerundeter Länge, Farbe und Winkel im GradientCache gespeichert, sodass wiederkehrende Teilstücke nur noch
+    geblittet werden müssen
+    """
     if closed:
         points.append(points[0])
     path_length = 0
@@ -73,40 +141,35 @@ def draw_gradient_lines(surface: pygame.Surface, start_color: Any, end_color: An
         if pos < len(points) - 1:
             path_length += ((point[0] - points[pos + 1][0]) ** 2 + (point[1] - points[pos + 1][1]) ** 2) ** 0.5
 
+    sr, sg, sb, sa = start_color
+    er, eg, eb, ea = end_color
     walked_path_length = 0
+    blit_sequence = []
     for pos, point in enumerate(points):
         if pos < len(points) - 1:
             line_length = ((point[0] - points[pos + 1][0]) ** 2 + (point[1] - points[pos + 1][1]) ** 2) ** 0.5
 
-            sr, sg, sb, sa = start_color
-            er, eg, eb, ea = end_color
-            cr = sr + (er - sr) * walked_path_length / (path_length or 0.01)
-            cg = sg + (eg - sg) * walked_path_length / (path_length or 0.01)
-            cb = sb + (eb - sb) * walked_path_length / (path_length or 0.01)
-            ca = sa + (ea - sa) * walked_path_length / (path_length or 0.01)
-            line_start_color = (cr, cg, cb, ca)
+            progress = walked_path_length / (path_length or 0.01)
+            line_start_color = GradientCache.quantize_color((sr + (er - sr) * progress, sg + (eg - sg) * progress,
+                                                             sb + (eb - sb) * progress, sa + (ea - sa) * progress))
 
             walked_path_length += line_length
 
-            sr, sg, sb, sa = start_color
-            er, eg, eb, ea = end_color
-            cr = sr + (er - sr) * walked_path_length / (path_length or 0.01)
-            cg = sg + (eg - sg) * walked_path_length / (path_length or 0.01)
-            cb = sb + (eb - sb) * walked_path_length / (path_length or 0.01)
-            ca = sa + (ea - sa) * walked_path_length / (path_length or 0.01)
-            line_end_color = (cr, cg, cb, ca)
-
-            line = vertical((width, int(line_length) or 1), line_start_color, line_end_color)
+            progress = walked_path_length / (path_length or 0.01)
+            line_end_color = GradientCache.quantize_color((sr + (er - sr) * progress, sg + (eg - sg) * progress,
+                                                           sb + (eb - sb) * progress, sa + (ea - sa) * progress))
 
             y_diff = (points[pos + 1][1] - point[1])
             angle = math.degrees(math.atan((points[pos + 1][0] - point[0]) / (y_diff or 0.01)))
             if y_diff < 0:
                 angle += 180
-            line = pygame.transform.rotate(line, angle)
+            angle = GradientCache.quantize_angle(angle)
+
+            line = GradientCache.get_segment(int(line_length) or 1, line_start_color, line_end_color, width, angle)
 
             pivot = point
             offset = pygame.math.Vector2(line_length / 2 * math.sin(math.radians(angle)),
                                          line_length / 2 * math.cos(math.radians(angle)))
             rect = line.get_rect(center=(pivot + offset))
-            position = rect.topleft
-            surface.blit(line, position)
+            blit_sequence.append((line, rect.topleft))
+    surface.fblits(blit_sequence)
@@ -0,0 +1,152 @@
+import json
+import math
+from dataclasses import dataclass
+from typing import Dict, Any, Tuple, List, Iterator
+
+import numpy as np
+
+
+class WaveFormatError(ValueError):
+    pass
+
+
+@dataclass
+class CompiledWave:
+    # Aufsteigend sortierte Zeitpunkte (in Sekunden seit Beginn der Welle), zu welchen ein Gegner erscheint
+    spawn_times: np.ndarray
+    # Level und Pfad des jeweiligen Gegners
+    levels: np.ndarray
+    paths: np.ndarray
+
+    def __len__(self):
+        return len(self.spawn_times)
+
+
+class WaveCursor:
+    wave: CompiledWave
+    position: int
+
+    def __init__(self, wave: CompiledWave):
+        """
+        Durchläuft die Zeitleiste einer Welle und gibt bei jedem Aufruf von advance nur die Gegner zurück,
+        welche seit dem letzten Aufruf fällig geworden sind
+        """
+        self.wave = wave
+        self.position = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.position >= len(self.wave)
+
+    def advance(self, wave_time: float) -> Iterator[Tuple[int, int]]:
+        """
+        :param wave_time: Seit Beginn der Welle verstrichene Zeit in Sekunden
+        :return: (Level, Pfad) aller fälligen Gegner in der Reihenfolge ihres Erscheinens
+        """
+        end = int(self.wave.spawn_times.searchsorted(wave_time, side="right"))
+        if end <= self.position:
+            return iter(())
+        start, self.position = self.position, end
+        return zip(self.wave.levels[start:end].tolist(), self.wave.paths[start:end].tolist())
+
+
+class WaveTimeline:
+    waves: Dict[int, CompiledWave]
+    last_wave: int
+
+    def __init__(self, waves: Dict[int, CompiledWave]):
+        """
+        Vorab berechnete Zeitleisten aller Wellen, siehe compile
+        """
+        self.waves = waves
+        self.last_wave = max(waves.keys(), default=0)
+
+    def __contains__(self, wave: int):
+        return wave in self.waves
+
+    def __getitem__(self, wave: int) -> CompiledWave:
+        return self.waves[wave]
+
+    @staticmethod
+    def load(path: str, *, level_count: int | None = None) -> "WaveTimeline":
+        with open(path) as file:
+            try:
+                wave_info = json.load(file)
+            except json.JSONDecodeError as error:
+                raise WaveFormatError(f"{path}: {error}") from error
+        return WaveTimeline.compile(wave_info, level_count=level_count, source=path)
+
+    @staticmethod
+    def compile(wave_info: Dict[str, Any], *, level_count: int | None = None,
+                source: str = "waves") -> "WaveTimeline":
+        """
+        Wandelt die Wellen-Beschreibung (Format von waves.json) einmalig in sortierte Zeitleisten um.
+        Format: {Welle: {Startzeitpunkt: {Dauer: {Level: Anzahl}}}}. Die Gegner eines Eintrags erscheinen
+        gleichmäßig verteilt über die Dauer, der k-te Gegner zum Zeitpunkt Start + k * Dauer / Anzahl.
+        Alle Gegner erscheinen auf dem ersten Pfad der Karte
+        :param level_count: Anzahl der Gegner-Level, größere Level werden als Fehler gemeldet
+        :param source: Name der Quelle für Fehlermeldungen
+        :raises WaveFormatError: Wenn die Beschreibung ungültige Schlüssel oder Werte enthält
+        """
+        if not isinstance(wave_info, dict):
+            raise WaveFormatError(f"{source}: expected an object of waves")
+
+        waves = {}
+        for wave_key, pulses in wave_info.items():
+            wave = WaveTimeline.__parse_number(wave_key, int, f"{source}: wave {wave_key!r}")
+            if wave < 1:
+                raise WaveFormatError(f"{source}: wave {wave_key!r} must be at least 1")
+            location = f"{source}: wave {wave}"
+
+            events: List[Tuple[float, int, int]] = []
+            for start_key, durations in WaveTimeline.__items(pulses, location).items():
+                start = WaveTimeline.__parse_number(start_key, float, f"{location}, start {start_key!r}")
+                if start < 0:
+                    raise WaveFormatError(f"{location}: start {start_key!r} must not be negative")
+
+                for duration_key, enemies in WaveTimeline.__items(durations, f"{location}, start {start_key}").items():
+                    pulse_location = f"{location}, start {start_key}, duration {duration_key!r}"
+                    duration = WaveTimeline.__parse_number(duration_key, float, pulse_location)
+                    if duration < 0:
+                        raise WaveFormatError(f"{pulse_location}: duration must not be negative")
+
+                    for level_key, count_value in WaveTimeline.__items(enemies, pulse_location).items():
+                        level = WaveTimeline.__parse_number(level_key, int, f"{pulse_location}, level {level_key!r}")
+                        if level < 0 or (level_count is not None and level >= level_count):
+                            raise WaveFormatError(f"{pulse_location}: unknown enemy level {level_key!r}")
+                        count = WaveTimeline.__parse_number(count_value, int,
+                                                            f"{pulse_location}, level {level_key}: count")
+                        if count < 0:
+                            raise WaveFormatError(f"{pulse_location}, level {level_key}: count must not be negative")
+
+                        for k in range(1, count + 1):
+                            events.append((start + k * duration / count, level, 0))
+
+            events.sort(key=lambda event: event[0])
+            waves[wave] = CompiledWave(
+                spawn_times=np.array([event[0] for event in events], dtype=np.float64),
+                levels=np.array([event[1] for event in events], dtype=np.int32),
+                paths=np.array([event[2] for event in events], dtype=np.int32),
+            )
+
+        missing = [wave for wave in range(1, max(waves.keys(), default=0) + 1) if wave not in waves]
+        if missing:
+            raise WaveFormatError(f"{source}: waves {missing} are missing")
+
+        return WaveTimeline(waves)
+
+    @staticmethod
+    def __items(value: Any, location: str) -> Dict[str, Any]:
+        if not isinstance(value, dict):
+            raise WaveFormatError(f"{location}: expected an object, got {value!r}")
+        return value
+
+    @staticmethod
+    def __parse_number(value: Any, number_type: type, location: str) -> Any:
+        try:
+            number = number_type(value)
+        except (TypeError, ValueError):
+            raise WaveFormatError(f"{location}: {value!r} is not a valid {number_type.__name__}") from None
+        if number_type is float and not math.isfinite(number):
+            raise WaveFormatError(f"{location}: {value!r} is not finite")
+        return number
@@ -1,17 +1,25 @@
-import json
+import math
 from dataclasses import dataclass
-from typing import List, Dict
+from typing import List, Dict, Tuple
 
+import numpy as np
 import pygame
 
 from config import Config
 from data.lib.camera import Camera
-from data.constants import TurretType, Resources, FontManager, Font
+from data.constants import TurretType, Resources, FontManager, Font, MapLayer
 from data.entities import PreviewBlueTurret, PreviewRedTurret, DefaultEnemy
 from data.gui import GUI
-from data.lib.entity_objects import Enemy, DefenseEntity, PreviewTurret
+from data.lib.entity_objects import EnemyStore, DefenseEntity, PreviewTurret
+from data.lib.events import GameEventBus, GameEventType, GameEventBatch
 from data.lib.map import Map
-from data.lib.vfx import VFXManager, EnemyKillEffect, EnemyKillEffectData, TextParticleEffect, TextParticleEffectData
+from data.lib.waves import WaveTimeline, WaveCursor
+from data.lib.vfx import VFXManager, EffectPriority, EnemyKillEffect, EnemyKillEffectData, TextParticleEffect, TextParticleEffectData
+
+
+# Münzen, die ein besiegter Gegner einbringt, und Leben, die ein durchgelaufener Gegner kostet, je Level
+KILL_REWARDS = np.array([1, 2, 5, 10], dtype=np.int64)
+LEAK_PENALTIES = np.array([5, 10, 25, 50], dtype=np.int64)
 
 
 @dataclass
@@ -22,13 +30,15 @@ class TurretInfo:
 
 class GameData:
     config: Config
-    screen: pygame.Surface
+    screen: pygame.Surface | None
+    headless: bool
 
     map: Map
-    gui: GUI
-    camera: Camera
+    gui: GUI | None
+    camera: Camera | None
 
-    enemies: List[Enemy]
+    events: GameEventBus
+    enemies: EnemyStore
     defenses: List[DefenseEntity]
     pause: bool
     lock: bool
@@ -38,18 +48,29 @@ class GameData:
     selected_turret: DefenseEntity | None
 
     game_speed_index: int
+    tick_timedelta: float
 
     real_timedelta: float
     real_ingame_time: float
     effective_timedelta: float
     effective_ingame_time: float
 
-    def __init__(self, screen: pygame.Surface, config: Config):
+    def __init__(self, screen: pygame.Surface | None, config: Config,
+                 *, headless: bool = False):
+        """
+        Beinhaltet den gesamten Zustand einer laufenden Spielrunde
+        :param screen: Bildschirm, auf welchem das Spiel ausgegeben wird. Im Headless-Modus wird er nicht benötigt
+        :param headless: Wenn True, werden weder GUI noch Kamera, Karten-Oberflächen oder Effekte erzeugt.
+                         update() simuliert dann nur noch die Spiellogik und fragt keine Mauseingaben ab.
+                         handle_events() und render() dürfen in diesem Modus nicht aufgerufen werden
+        """
         self.config = config
 
         self.screen = screen
+        self.headless = headless
 
-        self.enemies: List[Enemy] = []
+        self.events = GameEventBus()
+        self.enemies = EnemyStore(event_bus=self.events)
         self.defenses: List[DefenseEntity] = []
         self.pause = False
         self.lock = False
@@ -75,6 +96,9 @@ class GameData:
         self.__game_speed_options = self.config.SPEED_OPTIONS
         self.game_speed_index = 0
 
+        self.tick_timedelta = 1 / self.config.TICK_RATE
+        self.__tick_accumulator = 0
+
         self.real_timedelta = 0
         self.real_ingame_time = 0
         self.effective_timedelta = 0
@@ -90,19 +114,27 @@ class GameData:
         self.wave_time_passed = 0
         self.wave_active = False
 
-        with open("data/waves.json") as file:
-            self.wave_info = json.load(file)
-
-        self.wave_control_info = {}
+        self.waves = WaveTimeline.load("data/waves.json", level_count=len(KILL_REWARDS))
+        self.wave_cursor: WaveCursor | None = None
 
         self.game_won = False
 
-        self.vfx_manager = VFXManager()
+        self.vfx_manager = VFXManager(headless=self.headless, target_fps=self.config.FPS)
 
-        self.map = Map(Resources.MAP, self.vfx_manager)
-        self.gui = GUI(self)
-        self.gui.resize(self.screen.get_size())
-        self.camera = Camera(self.map.map_surface.surface, initial_offset=(-self.gui.shop.box.get_width(), 0))
+        self.map = Map(Resources.MAP, self.vfx_manager, headless=self.headless,
+                       draw_list=self.config.MAP_DRAW_LIST)
+
+        self.events.subscribe(GameEventType.KILL, self.__on_kills)
+        self.events.subscribe(GameEventType.LEAK, self.__on_leaks)
+        if not self.headless:
+            self.events.subscribe(GameEventType.DAMAGE_FLUSH, self.__on_damage_flushes)
+        if self.headless:
+            self.gui = None
+            self.camera = None
+        else:
+            self.gui = GUI(self)
+            self.gui.resize(self.screen.get_size())
+            self.camera = Camera(self.map.map_surface.surface, initial_offset=(-self.gui.shop.box.get_width(), 0))
 
     @property
     def game_speed(self):
@@ -115,7 +147,8 @@ class GameData:
     @quit.setter
     def quit(self, value: bool):
         if value:
-            self.enemies = []
+            self.events.clear()
+            self.enemies = EnemyStore(event_bus=self.events)
             self.defenses = []
         self._quit = value
 
@@ -128,7 +161,13 @@ class GameData:
         oder mit einem Objekt kollidiert.
         """
         preview_turret.rect.center = self.camera.canvas.translate_vector(pygame.mouse.get_pos())
+        self.check_turret_collision(preview_turret)
+        return
 
+    def check_turret_collision(self, preview_turret: PreviewTurret):
+        """
+        Berechnet, ob ein Vorschau-Turm an seiner derzeitigen Position platziert werden kann
+        """
         preview_turret.colliding = self.coins < self.turret_info[preview_turret.turret_type].cost
         while not preview_turret.colliding:
             for zone in self.map.construction_zones:
@@ -144,6 +183,24 @@ class GameData:
             break
         return
 
+    def place_turret(self, turret_type: TurretType, position: Tuple[float, float]) -> bool:
+        """
+        Platziert einen Turm ohne Mauseingabe an der gegebenen Kartenposition, z.B. in der Headless-Simulation
+        :param turret_type: Typ des Turmes
+        :param position: Mittelpunkt des Turmes auf der Karte
+        :return: True, wenn der Turm platziert und bezahlt wurde
+        """
+        preview_turret = self.turret_info[turret_type].preview
+        preview_turret.rect.center = position
+        self.check_turret_collision(preview_turret)
+
+        defenses = len(self.defenses)
+        preview_turret.place(self.enemies, self.vfx_manager)
+        if len(self.defenses) > defenses:
+            self.coins -= self.turret_info[turret_type].cost
+            return True
+        return False
+
     def unselect_defenses(self):
         if self.selected_turret:
             self.selected_turret.overlay = False
@@ -197,110 +254,126 @@ class GameData:
         self.camera.update()
 
     def update(self, timedelta: float):
+        """
+        Lässt die Spiellogik in festen Zeitschritten (Ticks) laufen und aktualisiert GUI und Effekte.
+        Höhere Spielgeschwindigkeiten führen mehr Ticks pro Frame aus, statt die Ticks zu verlängern,
+        damit Gegner und Geschosse auch bei hohen Geschwindigkeiten genau simuliert werden
+        :param timedelta: Zeit in Sekunden, die seit dem letzten Frame verstrichen ist
+        """
         self.real_timedelta = timedelta
         self.real_ingame_time += self.real_timedelta
 
-        # Durch die einfache Multiplikation der verstrichenen Zeit mit der derzeitigen Spielgeschwindigkeit gibt es bei
-        # hohen Geschwindigkeiten zwar weniger virtuelle Frames, dafür wird jedoch weniger Rechenleistung benötigt als
-        # bei mehrfachem Aufrufen der update-Funktion
-        self.effective_timedelta = self.real_timedelta * self.game_speed * (not self.pause)
-        self.effective_ingame_time += self.effective_timedelta
-
         if not self.pause:
-            if self.wave_active:
-                self.wave_time_passed += self.effective_timedelta
-                if self.wave_info[str(self.wave)] == self.wave_control_info:
-                    if not self.wave == max([int(i) for i in self.wave_info.keys()]):
-                        self.wave_active = False
-                        self.wave_control_info = {}
-                        self.wave_time_passed = 0
-                    elif not self.enemies:
-                        self.game_won = True
-                        print("YOU WIN")
-                else:
-                    for wave_pulse in self.wave_info[str(self.wave)].keys():
-                        if self.wave_time_passed < float(wave_pulse):
-                            continue
-                        for pulse_duration in self.wave_info[str(self.wave)][wave_pulse]:
-                            for enemy_type in self.wave_info[str(self.wave)][wave_pulse][pulse_duration]:
-                                enemies_to_spawn = int(
-                                    int(self.wave_info[str(self.wave)][wave_pulse][pulse_duration][enemy_type])
-                                    * min(1., ((self.wave_time_passed - float(wave_pulse)) / float(pulse_duration)))
-                                )
-                                try:
-                                    if int(self.wave_control_info[wave_pulse][pulse_duration][enemy_type]) < enemies_to_spawn:
-                                        for i in range(enemies_to_spawn - int(self.wave_control_info[wave_pulse][pulse_duration][enemy_type])):
-                                            path = self.map.paths[0]
-                                            new_enemy = DefaultEnemy(path[0], self.config.ENEMY_SPEED,
-                                                                     path=path, enemy_list=self.enemies,
-                                                                     live_points=int(enemy_type) * 10 + 10,
-                                                                     level=int(enemy_type))
-
-                                            @new_enemy.on_kill
-                                            def _():
-                                                coin_gain = {0: 1, 1: 2, 2: 5, 3: 10}[new_enemy.level]
-                                                self.coins += coin_gain
-                                                self.vfx_manager.add_effect(
-                                                    self.map, EnemyKillEffect(
-                                                        EnemyKillEffectData(0.33, new_enemy.position)
-                                                    )
-                                                )
-
-                                            @new_enemy.on_success
-                                            def _():
-                                                self.lives -= {0: 5, 1: 10, 2: 25, 3: 50}[new_enemy.level]
-
-                                            @new_enemy.on_unbuffering_damage
-                                            def _():
-                                                total_dmg = new_enemy.damage_buffer
-                                                relative_dmg = min(1., total_dmg / new_enemy.max_live_points)
-                                                text_color = (255, 0 + int((1 - relative_dmg) * 255), 0)
-                                                self.vfx_manager.add_effect(self.map,
-                                                                            TextParticleEffect(TextParticleEffectData(
-                                                                                font=FontManager.get_font(
-                                                                                    Font.PIXEL, 10),
-                                                                                text=str(round(total_dmg, 1)),
-                                                                                initial_color=text_color,
-                                                                                final_color=text_color,
-                                                                                position=new_enemy.position,
-                                                                                initial_speed=15,
-                                                                            )))
-
-                                        self.wave_control_info[wave_pulse][pulse_duration][enemy_type] = str(enemies_to_spawn)
-                                except KeyError:
-                                    if wave_pulse not in self.wave_control_info:
-                                        self.wave_control_info[wave_pulse] = {}
-                                    if pulse_duration not in self.wave_control_info[wave_pulse]:
-                                        self.wave_control_info[wave_pulse][pulse_duration] = {}
-                                    if enemy_type not in self.wave_control_info[wave_pulse][pulse_duration]:
-                                        self.wave_control_info[wave_pulse][pulse_duration][enemy_type] = str(0)
-            else:
-                if self.start_next_wave:
-                    self.wave += 1
-                    if not str(self.wave) in self.wave_info:
-                        self.wave -= 1
-                    self.wave_active = True
-                    self.start_next_wave = False
+            self.__tick_accumulator += self.real_timedelta * self.game_speed
 
-            if self.lives <= 0:
-                print("GAME OVER")
+            ticks = int(self.__tick_accumulator / self.tick_timedelta)
+            self.__tick_accumulator -= ticks * self.tick_timedelta
 
-            self.update_entities()
+            # Kann das Spiel nicht mithalten, werden überzählige Ticks verworfen, anstatt sie in den folgenden Frames
+            # nachzuholen, da diese dadurch nur noch langsamer würden
+            max_ticks = math.ceil(self.config.MAX_CATCH_UP_TICKS * self.game_speed)
+            if ticks > max_ticks:
+                ticks = max_ticks
+                self.__tick_accumulator = 0
 
-        self.update_ui()
+            for _ in range(ticks):
+                self.tick()
+
+        if not self.headless:
+            self.update_ui()
 
         self.vfx_manager.update(self.real_timedelta)
 
+    def tick(self):
+        """
+        Simuliert einen festen Zeitschritt der Spiellogik (Wellen, Gegner und Türme)
+        """
+        self.effective_timedelta = self.tick_timedelta
+        self.effective_ingame_time += self.effective_timedelta
+
+        if self.wave_active:
+            self.wave_time_passed += self.effective_timedelta
+            if self.wave_cursor is None or self.wave_cursor.finished:
+                if not self.wave == self.waves.last_wave:
+                    self.wave_active = False
+                    self.wave_time_passed = 0
+                elif not self.enemies:
+                    self.game_won = True
+                    print("YOU WIN")
+            else:
+                for level, path_index in self.wave_cursor.advance(self.wave_time_passed):
+                    self.spawn_enemy(level, path_index)
+        else:
+            if self.start_next_wave:
+                self.wave += 1
+                if self.wave in self.waves:
+                    self.wave_cursor = WaveCursor(self.waves[self.wave])
+                else:
+                    self.wave -= 1
+                self.wave_active = True
+                self.start_next_wave = False
+
+        if self.lives <= 0:
+            print("GAME OVER")
+
+        self.update_entities()
+
+    def spawn_enemy(self, level: int, path_index: int = 0):
+        """
+        Erzeugt einen Gegner am Anfang des gegebenen Pfades
+        """
+        path = self.map.paths[path_index]
+        DefaultEnemy(path[0], self.config.ENEMY_SPEED,
+                     path=path, enemy_list=self.enemies,
+                     live_points=level * 10 + 10,
+                     level=level)
+
+    def __on_kills(self, kills: GameEventBatch):
+        self.coins += int(KILL_REWARDS[kills.levels].sum())
+        if self.headless:
+            return
+        for position in zip(kills.x.tolist(), kills.y.tolist()):
+            self.vfx_manager.add_effect(self.map, EnemyKillEffect(EnemyKillEffectData(0.33, position)),
+                                        layer=MapLayer.VFX)
+
+    def __on_leaks(self, leaks: GameEventBatch):
+        self.lives -= int(LEAK_PENALTIES[leaks.levels].sum())
+
+    def __on_damage_flushes(self, flushes: GameEventBatch):
+        relative_dmg = np.minimum(1., flushes.amounts / flushes.max_live_points)
+        green = ((1 - relative_dmg) * 255).astype(np.int32)
+        font = FontManager.get_font(Font.PIXEL, 10)
+        for total_dmg, g, x, y in zip(flushes.amounts.tolist(), green.tolist(),
+                                      flushes.x.tolist(), flushes.y.tolist()):
+            text_color = (255, g, 0)
+            self.vfx_manager.add_effect(self.map,
+                                        TextParticleEffect(TextParticleEffectData(
+                                            font=font,
+                                            text=str(round(total_dmg, 1)),
+                                            initial_color=text_color,
+                                            final_color=text_color,
+                                            position=(x, y),
+                                            initial_speed=15,
+                                        )),
+                                        priority=EffectPriority.COSMETIC, layer=MapLayer.VFX)
+
     def update_entities(self):
-        for enemy in self.enemies:
-            enemy.update(self.effective_timedelta)
+        self.enemies.update(self.effective_timedelta)
 
         for defense in self.defenses:
             defense.update(self.effective_timedelta)
 
+        # Im Laufe des Ticks entfernte Gegner werden erst jetzt endgültig entfernt
+        self.enemies.flush()
+
+        # Belohnungen, Abzüge und Effekte aller Ereignisse des Ticks werden gesammelt verarbeitet
+        self.events.drain()
+
     def update_ui(self):
         if self.turret_preview:
-            self.turret_info[self.turret_preview].preview.update(self.effective_timedelta)
+            # Die Vorschau gehört zur GUI und folgt der Zeit des Frames, nicht der eines Ticks, der in diesem Frame
+            #  womöglich gar nicht ausgeführt wurde
+            self.turret_info[self.turret_preview].preview.update(0 if self.pause else self.real_timedelta)
 
         self.gui.update(self.click, pygame.mouse.get_pos(), self.camera.moving)
 
@@ -312,7 +385,7 @@ class GameData:
 
         self.render_entities()
 
-        self.map.render()
+        self.map.render(self.camera.get_visible_rect())
 
         if self.turret_preview:
             self.turret_info[self.turret_preview].preview.render(self.camera.overlay.surface)
@@ -325,8 +398,7 @@ class GameData:
         return
 
     def render_entities(self):
-        for enemy in self.enemies:
-            enemy.render(self.map.map_surface)
+        self.enemies.render(self.map.map_surface)
 
         for defense in self.defenses:
             defense.render(self.map.map_surface)
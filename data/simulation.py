@@ -0,0 +1,116 @@
+import argparse
+import time
+from dataclasses import dataclass
+from typing import List, Tuple
+
+from config import Config
+from data.constants import TurretType
+from data.lib.pools import PoolManager
+from data.scene_game import GameData
+
+
+@dataclass
+class SimulationResult:
+    game_won: bool
+    wave: int
+    lives: float
+    coins: int
+    turrets: int
+    ticks: int
+    simulated_time: float
+    real_time: float
+
+
+class Simulation:
+    game_data: GameData
+    turret_plan: List[Tuple[TurretType, Tuple[float, float]]]
+    ticks: int
+
+    def __init__(self, config: Config,
+                 *, tick_rate: float | None = None,
+                 turret_plan: List[Tuple[TurretType, Tuple[float, float]]] | None = None,
+                 coins: int | None = None):
+        """
+        Lässt eine Spielrunde ohne Bildschirm, GUI und Kamera so schnell ablaufen, wie es der Prozessor zulässt.
+        Gedacht für Balancing-Durchläufe, Dauertests und Benchmarks.
+        :param tick_rate: Ticks pro simulierter Sekunde (Standard: Config.TICK_RATE)
+        :param turret_plan: Türme, welche der Reihe nach platziert werden, sobald genügend Münzen vorhanden sind.
+                            Standardmäßig wird abwechselnd auf jeder Bauzone der Karte ein Turm geplant
+        :param coins: Münzen zu Beginn der Runde (Standard: wie im normalen Spiel)
+        """
+        self.game_data = GameData(None, config, headless=True)
+        if tick_rate is not None:
+            self.game_data.tick_timedelta = 1 / tick_rate
+        if coins is not None:
+            self.game_data.coins = coins
+
+        self.turret_plan = list(turret_plan) if turret_plan is not None else self.default_turret_plan()
+
+        self.ticks = 0
+
+    def default_turret_plan(self) -> List[Tuple[TurretType, Tuple[float, float]]]:
+        turret_types = (TurretType.BLUE, TurretType.RED)
+        return [(turret_types[p % len(turret_types)], zone.center)
+                for p, zone in enumerate(self.game_data.map.construction_zones)]
+
+    def __place_planned_turrets(self):
+        while self.turret_plan:
+            turret_type, position = self.turret_plan[0]
+            if self.game_data.coins < self.game_data.turret_info[turret_type].cost:
+                return
+            self.game_data.place_turret(turret_type, position)
+            # Türme, die an ihrer geplanten Position kollidieren, werden übersprungen
+            self.turret_plan.pop(0)
+
+    @property
+    def finished(self) -> bool:
+        return self.game_data.game_won or self.game_data.lives <= 0
+
+    def step(self):
+        """
+        Platziert ggf. geplante Türme, startet ggf. die nächste Welle und simuliert einen Tick
+        """
+        self.__place_planned_turrets()
+
+        if not (self.game_data.wave_active or self.game_data.start_next_wave):
+            self.game_data.start_next_wave = True
+
+        self.game_data.tick()
+        self.ticks += 1
+
+    def run(self, max_simulated_time: float | None = None) -> SimulationResult:
+        """
+        Simuliert, bis die Runde gewonnen oder verloren ist bzw. die maximale Spielzeit verstrichen ist
+        :param max_simulated_time: Maximale simulierte Spielzeit in Sekunden
+        :return: Ergebnis der Simulation
+        """
+        start_time = time.perf_counter()
+        while not self.finished:
+            if max_simulated_time is not None and self.game_data.effective_ingame_time >= max_simulated_time:
+                break
+            self.step()
+
+        return SimulationResult(
+            game_won=self.game_data.game_won,
+            wave=self.game_data.wave,
+            lives=self.game_data.lives,
+            coins=self.game_data.coins,
+            turrets=len(self.game_data.defenses),
+            ticks=self.ticks,
+            simulated_time=self.game_data.effective_ingame_time,
+            real_time=time.perf_counter() - start_time,
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs a headless towerdefense campaign")
+    parser.add_argument("--tick-rate", type=float, default=None, help="ticks per simulated second")
+    parser.add_argument("--max-time", type=float, default=None, help="maximum simulated seconds")
+    parser.add_argument("--coins", type=int, default=None, help="coins at the start of the game")
+    parser.add_argument("--pool-stats", action="store_true", help="print object pool statistics after the run")
+    args = parser.parse_args()
+
+    print(Simulation(Config(), tick_rate=args.tick_rate, coins=args.coins).run(args.max_time))
+    if args.pool_stats:
+        for name, stats in PoolManager.get_stats().items():
+            print(f"{name}: {stats}")